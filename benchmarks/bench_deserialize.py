@@ -0,0 +1,82 @@
+"""
+CPU time and peak memory of deserializing the largest response fixtures from the
+decoded text of a response against its raw bytes, and of the raw JSON (Raw.JSON)
+skipping validation.
+
+    python benchmarks/bench_deserialize.py
+"""
+
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+from pydantic import BaseModel
+
+from riot_api.types.dto import MatchDTO, TimelineDTO
+
+ROUNDS = 20
+RESPONSES = Path(__file__).parent.parent / "tests" / "responses"
+FIXTURES = {
+    "MatchDTO": (MatchDTO, "get_match_by_match_id.json"),
+    "TimelineDTO": (TimelineDTO, "get_match_timeline.json"),
+}
+
+
+def from_text(res: httpx.Response, model: type[BaseModel]) -> BaseModel:
+    return model.model_validate_json(res.text)
+
+
+def from_bytes(res: httpx.Response, model: type[BaseModel]) -> BaseModel:
+    return model.model_validate_json(res.content)
+
+
+def raw_json(res: httpx.Response, model: type[BaseModel]) -> dict:
+    return json.loads(res.content)
+
+
+def response(body: bytes) -> httpx.Response:
+    # a new response each time, it caches its text
+    return httpx.Response(
+        200, content=body, headers={"content-type": "application/json"}
+    )
+
+
+def cpu_time(deserialize, model: type[BaseModel], body: bytes) -> float:
+    times = []
+    for _ in range(ROUNDS):
+        res = response(body)
+        start = time.process_time()
+        deserialize(res, model)
+        times.append(time.process_time() - start)
+    return sorted(times)[len(times) // 2] * 1e3
+
+
+def peak_memory(deserialize, model: type[BaseModel], body: bytes) -> float:
+    res = response(body)
+    tracemalloc.start()
+    deserialize(res, model)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    print("median CPU ms, peak MiB above the response body")
+    for name, (model, filename) in FIXTURES.items():
+        body = (RESPONSES / filename).read_bytes()
+        print(f"{name} ({len(body) / 2**20:.2f} MiB)")
+        for label, deserialize in (
+            ("text", from_text),
+            ("bytes", from_bytes),
+            ("raw", raw_json),
+        ):
+            print(
+                f"  {label:5}: {cpu_time(deserialize, model, body):8.2f} ms"
+                f" {peak_memory(deserialize, model, body):8.2f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
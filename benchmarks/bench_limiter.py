@@ -0,0 +1,114 @@
+"""
+Per-request rate limiter overhead with 10k concurrent tasks.
+
+    python benchmarks/bench_limiter.py
+"""
+
+import asyncio
+import time
+
+import httpx
+from limits.aio.storage import MemoryStorage as LimitsMemoryStorage
+from limits.aio.strategies import FixedWindowRateLimiter
+from limits.limits import RateLimitItemPerSecond
+from pydantic import BaseModel
+
+from riot_api import Client, RateLimitClient
+from riot_api.limiter import Limiter, Window
+from riot_api.rate_limit_client import reset_rate_limited_client
+from riot_api.types.request import RouteRegion
+
+TASKS = 10_000
+PUUID = "l51rA9uBuXO1Zokld038OVu0aRhDKA2NcE5J5Ng2LmMxzZ2gJArIa5v_UaiEmHSDdSyKsbiiawWX_w"
+
+# large enough that nothing is ever rejected, only the bookkeeping is measured
+ENDPOINT_LIMIT = RateLimitItemPerSecond(10 * TASKS, 10)
+ROUTE_LIMITS = [
+    RateLimitItemPerSecond(10 * TASKS, 1),
+    RateLimitItemPerSecond(10 * TASKS, 120),
+]
+
+
+class DummyModel(BaseModel):
+    value: int
+
+
+async def run_tasks(func) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(func() for _ in range(TASKS)))
+    return (time.perf_counter() - start) / TASKS * 1e6
+
+
+async def bench_empty_task() -> float:
+    async def noop():
+        pass
+
+    return await run_tasks(noop)
+
+
+async def bench_limits_three_hits() -> float:
+    limiter = FixedWindowRateLimiter(LimitsMemoryStorage())
+
+    async def acquire():
+        await limiter.hit(ENDPOINT_LIMIT, "ASIA", "get_account_by_puuid")
+        for limit in ROUTE_LIMITS:
+            await limiter.hit(limit, "ASIA", "route")
+
+    return await run_tasks(acquire)
+
+
+async def bench_limiter_acquire() -> float:
+    limiter = Limiter()
+    windows = [Window(ENDPOINT_LIMIT, ("ASIA", "get_account_by_puuid"))] + [
+        Window(limit, ("ASIA", "route")) for limit in ROUTE_LIMITS
+    ]
+
+    async def acquire():
+        await limiter.acquire(windows)
+
+    return await run_tasks(acquire)
+
+
+def mock_session() -> httpx.AsyncClient:
+    response = httpx.Response(
+        200,
+        json={"value": 123},
+        headers={
+            "X-App-Rate-Limit": f"{10 * TASKS}:1,{10 * TASKS}:120",
+            "X-Method-Rate-Limit": f"{10 * TASKS}:10",
+        },
+    )
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda _: response))
+
+
+async def bench_client(client: Client) -> float:
+    Client._sessions[str(RouteRegion.ASIA)] = mock_session()
+
+    # learn the limits before measuring
+    await client.get_account_by_puuid(RouteRegion.ASIA, PUUID, DummyModel)
+
+    async def request():
+        await client.get_account_by_puuid(RouteRegion.ASIA, PUUID, DummyModel)
+
+    try:
+        return await run_tasks(request)
+    finally:
+        await Client.close_session()
+
+
+async def main():
+    print(f"{TASKS} concurrent tasks, microseconds per request")
+    print(f"empty task                : {await bench_empty_task():8.2f}")
+    print(f"limits, 3 separate hits   : {await bench_limits_three_hits():8.2f}")
+    print(f"Limiter.acquire, 3 windows: {await bench_limiter_acquire():8.2f}")
+
+    reset_rate_limited_client()
+    plain = await bench_client(Client("api-key"))
+    limited = await bench_client(RateLimitClient("api-key"))
+    print(f"Client request            : {plain:8.2f}")
+    print(f"RateLimitClient request   : {limited:8.2f}")
+    print(f"limiter overhead          : {limited - plain:8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+Requests per second of connection pool configurations against a local mock server
+speaking HTTP/1.1 and HTTP/2 (cleartext, prior knowledge).
+
+    python benchmarks/bench_pool.py
+"""
+
+import asyncio
+import json
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+
+from riot_api import Client
+from riot_api.types.request import PoolConfig, RouteRegion
+
+REQUESTS = 5_000
+CONCURRENCY = 200
+PUUID = "l51rA9uBuXO1Zokld038OVu0aRhDKA2NcE5J5Ng2LmMxzZ2gJArIa5v_UaiEmHSDdSyKsbiiawWX_w"
+BODY = json.dumps({"puuid": PUUID, "gameName": "summer", "tagLine": "pado"}).encode()
+PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+CONFIGS = {
+    "HTTP/1.1, 10 connections": PoolConfig(
+        max_connections=10, max_keepalive_connections=10, http2=False
+    ),
+    "HTTP/1.1, 100 connections": PoolConfig(
+        max_connections=100, max_keepalive_connections=100, http2=False
+    ),
+    "HTTP/2, 1 connection": PoolConfig(max_connections=1, http1=False),
+    "HTTP/2, 50 streams": PoolConfig(
+        max_connections=1, http1=False, max_concurrent_streams=50
+    ),
+    "HTTP/2, 10 connections": PoolConfig(max_connections=10, http1=False),
+}
+
+
+async def serve_http1(
+    first: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+):
+    response = (
+        b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+        + f"content-length: {len(BODY)}\r\n\r\n".encode()
+        + BODY
+    )
+    buffer = first
+    while True:
+        while b"\r\n\r\n" not in buffer:
+            data = await reader.read(65536)
+            if not data:
+                return
+            buffer += data
+        _, buffer = buffer.split(b"\r\n\r\n", 1)
+        writer.write(response)
+        await writer.drain()
+
+
+async def serve_http2(
+    first: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+):
+    connection = h2.connection.H2Connection(
+        h2.config.H2Configuration(client_side=False)
+    )
+    connection.initiate_connection()
+    data = first
+    while data:
+        for event in connection.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                connection.send_headers(
+                    event.stream_id,
+                    [
+                        (":status", "200"),
+                        ("content-type", "application/json"),
+                        ("content-length", str(len(BODY))),
+                    ],
+                )
+                connection.send_data(event.stream_id, BODY, end_stream=True)
+        writer.write(connection.data_to_send())
+        await writer.drain()
+        data = await reader.read(65536)
+
+
+async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        first = await reader.readexactly(len(PREFACE))
+        if first == PREFACE:
+            await serve_http2(first, reader, writer)
+        else:
+            await serve_http1(first, reader, writer)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def bench(config: PoolConfig) -> float:
+    Client.configure_pools(routes={RouteRegion.ASIA: config})
+    client = Client("api-key")
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def request():
+        async with semaphore:
+            await client.get_account_by_puuid(RouteRegion.ASIA, PUUID)
+
+    # open the connections before measuring
+    await asyncio.gather(*(request() for _ in range(CONCURRENCY)))
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+
+    await Client.close_session()
+    return REQUESTS / elapsed
+
+
+async def main():
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    Client.origin = f"http://127.0.0.1:{port}"
+
+    print(f"{REQUESTS} requests, {CONCURRENCY} concurrent, requests per second")
+    async with server:
+        for name, config in CONFIGS.items():
+            print(f"{name:26}: {await bench(config):8.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Lookup latency of a MatchStore holding many matches.
+
+    python benchmarks/bench_store.py [entries]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+from riot_api.store import MatchStore
+
+ENTRIES = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+LOOKUPS = 10_000
+CONCURRENCY = 4
+BODY = (
+    (Path(__file__).parent.parent / "tests" / "responses")
+    .joinpath("get_match_by_match_id.json")
+    .read_bytes()
+)
+
+
+def endpoint(i: int) -> str:
+    return f"/lol/match/v5/matches/KR_{i}"
+
+
+def fill(store: MatchStore) -> None:
+    # a small body, the index is what is measured
+    body = zlib.compress(b'{"metadata": {}}')
+    connection = store.connect()
+    connection.execute("BEGIN")
+    connection.executemany(
+        "INSERT INTO response (endpoint, body) VALUES (?, ?)",
+        ((endpoint(i), body) for i in range(ENTRIES)),
+    )
+    connection.execute("COMMIT")
+
+
+async def lookups(store: MatchStore, keys: list[str]) -> list[float]:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    times = []
+
+    async def lookup(key: str):
+        async with semaphore:
+            start = time.perf_counter()
+            await store.get(key)
+            times.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(lookup(key) for key in keys))
+    return sorted(times)
+
+
+def percentiles(times: list[float]) -> str:
+    p50 = times[len(times) // 2] * 1e3
+    p99 = times[int(len(times) * 0.99)] * 1e3
+    return f"p50 {p50:.3f} ms, p99 {p99:.3f} ms"
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        store = MatchStore(Path(directory) / "matches.db")
+        start = time.perf_counter()
+        fill(store)
+        print(f"{ENTRIES} entries stored in {time.perf_counter() - start:.1f} s")
+
+        keys = [endpoint(random.randrange(ENTRIES)) for _ in range(LOOKUPS)]
+        print(f"small bodies : {percentiles(await lookups(store, keys))}")
+
+        # a real match, compressed and decompressed
+        await store.put(endpoint(0), BODY)
+        keys = [endpoint(0)] * LOOKUPS
+        print(f"MatchDTO body: {percentiles(await lookups(store, keys))}")
+        keys = [endpoint(ENTRIES + i) for i in range(LOOKUPS)]
+        print(f"misses       : {percentiles(await lookups(store, keys))}")
+        store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
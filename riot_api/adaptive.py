@@ -0,0 +1,102 @@
+"""
+Adapting the discovered rate limits to the load the API can actually take.
+"""
+
+import math
+import time
+from typing import Optional
+
+import httpx
+from limits.limits import RateLimitItem
+
+from riot_api.exceptions import RateLimitError
+
+
+class AIMDController:
+    """
+    Scales the limits of each (route, limit_key) by additive increase, multiplicative
+    decrease, like TCP congestion control.
+
+    A 429 of the service, or without X-Rate-Limit-Type, means the service behind an
+    endpoint is overloaded whatever our budget says: the factor of that endpoint is
+    multiplied by decrease. A timeout may be the whole region, so it lowers the route
+    as well. Every success adds increase back until the full limit is reached again.
+    Decreases of a key are at least cooldown seconds apart, so the requests in flight
+    when the API starts throttling count as one signal.
+    """
+
+    def __init__(
+        self,
+        decrease: float = 0.5,
+        increase: float = 0.02,
+        min_factor: float = 0.05,
+        cooldown: float = 1.0,
+    ):
+        """
+        Parameters:
+            decrease (float): Defaults to 0.5. Factor applied on overload.
+            increase (float): Defaults to 0.02. Factor added back per success.
+            min_factor (float): Defaults to 0.05. Lowest fraction of the limits used.
+            cooldown (float): Defaults to 1. Least seconds between two decreases of a key.
+        """
+        assert 0 < decrease < 1, "Decrease must be a fraction"
+        assert 0 < min_factor <= 1, "Min factor must be a fraction"
+        self.decrease = decrease
+        self.increase = increase
+        self.min_factor = min_factor
+        self.cooldown = cooldown
+        # keys below their full limits only
+        self.factors: dict[tuple[str, str], float] = {}
+        self.decreased: dict[tuple[str, str], float] = {}
+
+    def factor(self, keys: tuple[str, str]) -> float:
+        return self.factors.get(keys, 1.0)
+
+    def scale(
+        self, keys: tuple[str, str], limits: list[RateLimitItem]
+    ) -> list[RateLimitItem]:
+        factor = self.factors.get(keys)
+        if factor is None:
+            return limits
+
+        # fixed windows stay one below the limit, never scale a window shut
+        return [
+            type(limit)(
+                max(min(limit.amount, 2), math.floor(limit.amount * factor)),
+                limit.multiples,
+                limit.namespace,
+            )
+            for limit in limits
+        ]
+
+    def overloaded(self, keys: tuple[str, str], error: BaseException) -> bool:
+        if isinstance(error, httpx.TimeoutException):
+            return True
+        if isinstance(error, RateLimitError) and keys[1] != "route":
+            limit_type = error.headers.get("X-Rate-Limit-Type", "service")
+            return limit_type.lower() == "service"
+        return False
+
+    def observe(
+        self, keys: tuple[str, str], error: Optional[BaseException] = None
+    ) -> None:
+        """record the outcome of a request, None for a success"""
+        if error is None:
+            factor = self.factors.get(keys)
+            if factor is None:
+                return
+            factor += self.increase
+            # sums of increase may stop just short of 1
+            if factor >= 1 - 1e-9:
+                del self.factors[keys]
+            else:
+                self.factors[keys] = factor
+            return
+
+        if not self.overloaded(keys, error):
+            return
+        now = time.monotonic()
+        if now - self.decreased.get(keys, -math.inf) < self.cooldown:
+            return
+        self.decreased[keys] = now
+        self.factors[keys] = max(self.min_factor, self.factor(keys) * self.decrease)
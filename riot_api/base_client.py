@@ -1,51 +1,478 @@
-from typing import TypeVar, Tuple
+import asyncio
+import functools
+import json
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Optional,
+    TypeVar,
+    Tuple,
+    cast,
+)
 
 import httpx
 from pydantic import BaseModel
 
-from riot_api.types.request import HttpRequest
+from riot_api.types.request import (
+    HttpMethod,
+    HttpRequest,
+    PoolConfig,
+    Raw,
+    RoutePlatform,
+    RouteRegion,
+)
+from riot_api.cache import CachedHeaders, ResponseCache
 from riot_api.error_handler import check_status_code
+from riot_api.exceptions import NotFoundError, RiotAPIError
+from riot_api.hedge import HedgePolicy, endpoint_template, hedge_reserve
+from riot_api.metrics import Metrics
+from riot_api.retry import RetryPolicy
+from riot_api.store import MatchStore
 
 T = TypeVar("T", bound=BaseModel)
+K = TypeVar("K")
+R = TypeVar("R")
+FlightKey = tuple[str, str, str, tuple[tuple[str, Any], ...]]
+
+
+class Flight:
+    """An upstream request and the number of callers still waiting for it."""
+
+    def __init__(self, task: asyncio.Task[Tuple[httpx.Response, httpx.Headers]]):
+        self.task = task
+        self.waiters = 0
 
 
 class BaseClient:
-    _shared_session: httpx.AsyncClient | None = None
+    # connection pools by host, shared by every client of the process
+    _sessions: dict[str, httpx.AsyncClient] = {}
+    _streams: dict[str, asyncio.Semaphore] = {}
+    pool_config: PoolConfig = PoolConfig()
+    route_pool_configs: dict[RouteRegion | RoutePlatform, PoolConfig] = {}
+    # where requests go, e.g. a proxy or a local mock server instead of the route host
+    origin: str = "https://{route}"
+    _warmup_task: Optional[asyncio.Task] = None
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        retry_policy: Optional[RetryPolicy] = None,
+        raw: Optional[Raw] = None,
+        coalesce: bool = False,
+        cache: Optional[ResponseCache] = None,
+        store: Optional[MatchStore] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+    ):
         self.api_key = api_key
-        self.session = httpx.AsyncClient()
+        # no retries unless asked for, clients given the same policy share its budget
+        self.retry_policy = retry_policy
+        # overrides the response model of every call
+        self.raw = raw
+        self.coalesce = coalesce
+        # clients given the same cache share its responses
+        self.cache = cache
+        self.store = store
+        # no hedging unless asked for, clients given the same policy share its budget
+        self.hedge_policy = hedge_policy
+        # requests beaten by their hedge, left to finish
+        self.stragglers: set[asyncio.Task] = set()
+        self.flights: dict[FlightKey, Flight] = {}
+        self.metrics = Metrics()
+
+    @classmethod
+    def configure_pools(
+        cls,
+        default: Optional[PoolConfig] = None,
+        routes: Optional[dict[RouteRegion | RoutePlatform, PoolConfig]] = None,
+    ) -> None:
+        """
+        Set the connection pool of every host, or of the hosts of some routes. Applies
+        to pools opened from now on, close_session() to reopen the current ones.
+        """
+        if default is not None:
+            BaseClient.pool_config = default
+        if routes is not None:
+            BaseClient.route_pool_configs = dict(routes)
+
+    @classmethod
+    def get_session(cls, route: RouteRegion | RoutePlatform) -> httpx.AsyncClient:
+        host = str(route)
+        session = cls._sessions.get(host)
+        if session is None or session.is_closed:
+            config = cls.route_pool_configs.get(route, cls.pool_config)
+            session = cls._sessions[host] = httpx.AsyncClient(
+                http1=config.http1, http2=config.http2, limits=config.limits()
+            )
+            if config.max_concurrent_streams is None:
+                cls._streams.pop(host, None)
+            else:
+                cls._streams[host] = asyncio.Semaphore(config.max_concurrent_streams)
+        return session
+
+    @classmethod
+    async def warmup(
+        cls,
+        routes: Optional[Iterable[RouteRegion | RoutePlatform]] = None,
+        connections: int = 1,
+        interval: Optional[float] = None,
+        timeout: float = 3.0,
+    ) -> list[RouteRegion | RoutePlatform]:
+        """
+        Open connections to the hosts of routes ahead of the first requests, so those do
+        not pay for DNS, TCP and TLS. Returns the routes that could not be reached.
+
+        Parameters:
+            routes (Optional[Iterable[RouteRegion | RoutePlatform]]): Defaults to every
+                region and platform.
+            connections (int): Defaults to 1. Connections per host, one is enough for
+                HTTP/2 while HTTP/1.1 needs one per concurrent request.
+            interval (Optional[float]): Defaults to None. If set, keeps warming the
+                hosts every interval seconds in the background until close_session(),
+                which must be shorter than the keepalive expiry of the pools to keep
+                idle connections open.
+            timeout (float): Defaults to 3. Seconds to wait for each host.
+        """
+        routes = list(routes) if routes is not None else [*RouteRegion, *RoutePlatform]
+        failed = await cls.warm(routes, connections, timeout)
+
+        if interval is not None:
+            if BaseClient._warmup_task is not None:
+                BaseClient._warmup_task.cancel()
+            BaseClient._warmup_task = asyncio.create_task(
+                cls.keep_warm(routes, connections, interval, timeout)
+            )
+        return failed
+
+    @classmethod
+    async def warm(
+        cls,
+        routes: list[RouteRegion | RoutePlatform],
+        connections: int,
+        timeout: float,
+    ) -> list[RouteRegion | RoutePlatform]:
+        async def connect(route: RouteRegion | RoutePlatform) -> bool:
+            # unauthenticated, it only opens the connection and is not rate limited
+            url = cls.origin.format(route=route) + "/"
+            try:
+                await cls.get_session(route).head(url, timeout=timeout)
+            except httpx.HTTPError:
+                return False
+            return True
+
+        async def connect_all(route: RouteRegion | RoutePlatform) -> bool:
+            connected = await asyncio.gather(
+                *(connect(route) for _ in range(connections))
+            )
+            return all(connected)
+
+        connected = await asyncio.gather(*(connect_all(route) for route in routes))
+        return [route for route, ok in zip(routes, connected) if not ok]
 
     @classmethod
-    def get_session(cls) -> httpx.AsyncClient:
-        if cls._shared_session is None or cls._shared_session.is_closed:
-            cls._shared_session = httpx.AsyncClient(http2=True)
-        return cls._shared_session
+    async def keep_warm(
+        cls,
+        routes: list[RouteRegion | RoutePlatform],
+        connections: int,
+        interval: float,
+        timeout: float,
+    ) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await cls.warm(routes, connections, timeout)
 
     @classmethod
     async def close_session(cls) -> None:
-        if cls._shared_session and not cls._shared_session.is_closed:
-            await cls._shared_session.aclose()
-            cls._shared_session = None
+        if BaseClient._warmup_task is not None:
+            BaseClient._warmup_task.cancel()
+            BaseClient._warmup_task = None
+
+        sessions = list(cls._sessions.values())
+        cls._sessions.clear()
+        cls._streams.clear()
+        await asyncio.gather(
+            *(session.aclose() for session in sessions if not session.is_closed)
+        )
+
+    async def capacity(
+        self, route: RouteRegion | RoutePlatform, limit_key: str
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Requests of an endpoint that can start right away and seconds until more can,
+        None if only the concurrency asked for bounds them.
+        """
+        return None
+
+    async def as_completed(
+        self,
+        route: RouteRegion | RoutePlatform,
+        limit_key: str,
+        keys: Iterable[K],
+        fetch: Callable[[K], Awaitable[R]],
+        concurrency: int,
+    ) -> AsyncIterator[Tuple[K, R | Exception]]:
+        """
+        Fetch every key, yielding (key, result) as they complete, the exception raised
+        for a key as its result.
+
+        At most concurrency keys are in flight, fewer while the endpoint has no
+        capacity, and new ones only start as the consumer takes results, so a slow
+        consumer slows the requests down rather than piling results up. Keys are
+        read lazily. Closing the iterator (e.g. contextlib.aclosing) cancels the
+        requests in flight.
+        """
+        assert concurrency > 0, "Concurrency must be a positive integer"
+        remaining_keys = iter(keys)
+        exhausted = False
+        tasks: dict[asyncio.Task[R], K] = {}
+        try:
+            while True:
+                room = concurrency - len(tasks)
+                capacity = await self.capacity(route, limit_key) if room else None
+                if capacity is not None:
+                    available, reset_in = capacity
+                    if available <= 0 and not tasks and not exhausted:
+                        # the windows are full, wait for them instead of failing
+                        await asyncio.sleep(reset_in)
+                        continue
+                    room = min(room, available)
 
-    def deserialize(self, res: httpx.Response, response_model: type[T]) -> T:
-        return response_model.model_validate_json(res.text)
+                while room > 0 and not exhausted:
+                    try:
+                        key = next(remaining_keys)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    tasks[asyncio.create_task(fetch(key))] = key
+                    room -= 1
+
+                if not tasks:
+                    return
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    key = tasks.pop(task)
+                    error = task.exception()
+                    if error is not None and not isinstance(error, Exception):
+                        raise error
+                    yield key, task.result() if error is None else error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def deserialize(
+        self, res: httpx.Response, response_model: type[T] | Raw | None
+    ) -> T | Any:
+        raw = self.raw if self.raw is not None else response_model
+        if raw is None or raw is Raw.BYTES:
+            return res.content
+        if raw is Raw.JSON:
+            return json.loads(res.content)
+        # straight from the bytes, decoding the body to str first would copy it
+        return response_model.model_validate_json(res.content)
 
     async def send_request(self, req: HttpRequest) -> Tuple[BaseModel, httpx.Headers]:
-        session = self.get_session()
+        self.metrics.requests += 1
+        local = await self.lookup(req) if req.method is HttpMethod.GET else None
+        if local is not None:
+            res, headers = local
+        elif self.coalesce and req.method is HttpMethod.GET:
+            res, headers = await self.join(req)
+        else:
+            res, headers = await self.fetch(req)
+        # per caller, a coalesced response may be wanted as different models
+        return self.deserialize(res, req.response_model), headers
+
+    async def join(self, req: HttpRequest) -> Tuple[httpx.Response, httpx.Headers]:
+        """
+        Wait for the identical request in flight, or send it. The request is cancelled
+        only once every caller waiting for it is.
+        """
+        key = (
+            req.method.value,
+            str(req.route),
+            req.endpoint,
+            tuple(sorted(req.params.items())),
+        )
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = self.flights[key] = Flight(asyncio.create_task(self.fetch(req)))
+            flight.task.add_done_callback(lambda _: self.land(key, flight))
+        else:
+            self.metrics.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # new callers send their own request rather than join a cancelled one
+                self.land(key, flight)
+                flight.task.cancel()
+
+    def land(self, key: FlightKey, flight: Flight) -> None:
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+
+    async def lookup(
+        self, req: HttpRequest
+    ) -> Optional[Tuple[httpx.Response, CachedHeaders]]:
+        """the response kept by the cache or the store, no request is sent for it"""
+        if self.cache is not None:
+            try:
+                cached = self.cache.get(req)
+            except NotFoundError:
+                self.metrics.not_found_hits += 1
+                raise
+            if cached is not None:
+                self.metrics.cache_hits += 1
+                if cached[1].stale:
+                    self.metrics.stale_hits += 1
+                    self.revalidate(req)
+                return cached
+
+        if self.store is not None and self.store.accepts(req.endpoint):
+            stored = await self.store.get(req.endpoint)
+            if stored is not None:
+                self.metrics.store_hits += 1
+                if self.cache is not None:
+                    self.cache.put(req, stored[0])
+                return stored
+        return None
+
+    def revalidate(self, req: HttpRequest) -> None:
+        """refresh a stale cached response in the background, once per key"""
+        cache = cast(ResponseCache, self.cache)
+        key = cache.key(req)
+        if key in cache.refreshes:
+            return
+        task = cache.refreshes[key] = asyncio.create_task(self.refresh(req))
+        task.add_done_callback(lambda _: cache.refreshes.pop(key, None))
+
+    async def refresh(self, req: HttpRequest) -> None:
+        cache = cast(ResponseCache, self.cache)
+        try:
+            await self.fetch(req)
+        except NotFoundError:
+            # remembered by fetch in place of the stale response
+            pass
+        except Exception:
+            cache.refresh_failed(req)
+
+    async def fetch(self, req: HttpRequest) -> Tuple[httpx.Response, httpx.Headers]:
+        """send the request and keep its response, once per coalesced request"""
+        try:
+            res, headers = await self.retry(req)
+        except NotFoundError as e:
+            if req.method is HttpMethod.GET and self.cache is not None:
+                self.cache.put_not_found(req, e)
+            raise
+        if req.method is HttpMethod.GET:
+            if self.cache is not None:
+                self.cache.put(req, res)
+            if self.store is not None and self.store.accepts(req.endpoint):
+                await self.store.put(req.endpoint, res.content)
+        return res, headers
+
+    async def retry(self, req: HttpRequest) -> Tuple[httpx.Response, httpx.Headers]:
+        """send the request, retrying it according to the retry policy"""
+        policy = self.retry_policy
+        if policy is None:
+            return await self.attempt(req)
+
+        policy.budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                return await self.attempt(req)
+            except (RiotAPIError, httpx.TransportError) as e:
+                delay = policy.delay(attempt, e)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def attempt(self, req: HttpRequest) -> Tuple[httpx.Response, httpx.Headers]:
+        """send the request once, hedged according to the hedge policy"""
+        policy = self.hedge_policy
+        if policy is None or req.method is not HttpMethod.GET:
+            return await self.send(req)
+
+        policy.budget.deposit()
+        key = (str(req.route), endpoint_template(req.endpoint))
+        delay = policy.delay(key)
+        start = time.monotonic()
+        primary = asyncio.create_task(self.send(req))
+        tasks = {primary}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and policy.budget.withdraw():
+                    self.metrics.hedges += 1
+                    tasks.add(asyncio.create_task(self.send_hedge(req, policy.reserve)))
+
+            # the first response wins, failures of a hedge (e.g. no spare tokens) only
+            # count if the first attempt fails as well
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.metrics.hedge_wins += 1
+                        policy.observe(key, time.monotonic() - start)
+                        # the other one was sent and counts against the limits,
+                        # cancelling it would hand its tokens back
+                        for straggler in pending:
+                            self.stragglers.add(straggler)
+                            straggler.add_done_callback(self.land_straggler)
+                        return task.result()
+            return primary.result()
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def land_straggler(self, task: asyncio.Task) -> None:
+        self.stragglers.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def send_hedge(
+        self, req: HttpRequest, reserve: float
+    ) -> Tuple[httpx.Response, httpx.Headers]:
+        # set in the context of the hedge task only
+        hedge_reserve.set(reserve)
+        return await self.send(req)
+
+    async def send(self, req: HttpRequest) -> Tuple[httpx.Response, httpx.Headers]:
+        """send the request once"""
+        session = self.get_session(req.route)
 
         # complete URL
-        url = f"https://{req.route}{req.endpoint}"
+        url = self.origin.format(route=req.route) + req.endpoint
         # authentication
         req.headers["X-Riot-Token"] = self.api_key
 
-        res = await session.request(
+        request = functools.partial(
+            session.request,
             method=req.method.value,
             url=url,
             params=req.params,
             headers=req.headers,
             timeout=req.timeout,
         )
+        streams = self._streams.get(str(req.route))
+        if streams is None:
+            res = await request()
+        else:
+            async with streams:
+                res = await request()
         check_status_code(res)
 
-        return self.deserialize(res, req.response_model), res.headers
+        return res, res.headers
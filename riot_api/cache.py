@@ -0,0 +1,224 @@
+"""
+Responses kept in memory, so data that does not change is not fetched again.
+"""
+
+import asyncio
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+
+import httpx
+
+from riot_api.exceptions import NotFoundError
+from riot_api.types.request import Account_v1, HttpRequest, League_v4, Match_v5
+
+# seconds an endpoint stays cached, None for ever, endpoints left out are not cached
+DEFAULT_TTLS: dict[str, Optional[float]] = {
+    # a finished match never changes
+    Match_v5.match_by_matchId: None,
+    Match_v5.match_timeline: None,
+    Account_v1.account_by_puuid: 3600,
+    Account_v1.account_by_riot_id: 3600,
+    Account_v1.account_region: 3600,
+    League_v4.league_entry_by_tier: 60,
+    League_v4.league_by_leagueId: 60,
+    League_v4.challenger_league_by_queue: 60,
+    League_v4.grandmaster_league_by_queue: 60,
+    League_v4.master_league_by_queue: 60,
+}
+
+# seconds past their TTL the ladders are still served while being refreshed
+DEFAULT_STALE_TTLS: dict[str, float] = {
+    League_v4.challenger_league_by_queue: 600,
+    League_v4.grandmaster_league_by_queue: 600,
+    League_v4.master_league_by_queue: 600,
+}
+
+CacheKey = tuple[str, str, tuple[tuple[str, Any], ...]]
+
+
+class CachedHeaders(httpx.Headers):
+    """Headers of a response served from a ResponseCache or MatchStore, not sent."""
+
+    # past its TTL, served while a newer response is fetched in the background
+    stale: bool = False
+
+
+class Entry(NamedTuple):
+    content: bytes
+    headers: httpx.Headers
+    expires: float
+    # served stale until then, expires for entries never served stale
+    stale_until: float
+    size: int
+    # a 404 remembered, raised again instead of returning content
+    error: Optional[NotFoundError] = None
+
+
+def compile_template(template: str) -> re.Pattern[str]:
+    """match the endpoints formatted from a template like "/matches/{matchId}" """
+    parts = re.split(r"\{[^}]+\}", template)
+    return re.compile("[^/]+".join(re.escape(part) for part in parts))
+
+
+def headers_size(headers: httpx.Headers) -> int:
+    return sum(len(name) + len(value) for name, value in headers.raw)
+
+
+class ResponseCache:
+    """
+    Bodies of successful GET responses by route, endpoint and params, kept as the
+    bytes received so calls asking for different response models share them.
+
+    The time to live of each endpoint template is looked up in ttls, e.g.
+    {League_v4.challenger_league_by_queue: 300}, over DEFAULT_TTLS. Once the bodies
+    and headers take more than max_bytes, the least recently used are evicted.
+
+    404s of any GET endpoint are remembered as well, for not_found_ttl seconds or
+    those of its template in not_found_ttls, and raised again without a request.
+
+    Past their TTL, responses of the templates in stale_ttls (over DEFAULT_STALE_TTLS,
+    the ladders) are still served for as many seconds while the client fetches a
+    newer one in the background, one per key at a time. While those refreshes fail,
+    the stale response is served for error_grace seconds after each failure.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 2**20,
+        ttls: Optional[dict[str, Optional[float]]] = None,
+        not_found_ttl: float = 60.0,
+        not_found_ttls: Optional[dict[str, float]] = None,
+        stale_ttls: Optional[dict[str, float]] = None,
+        error_grace: float = 300.0,
+    ):
+        """
+        Parameters:
+            max_bytes (int): Defaults to 256 MiB. Total size of the cached responses.
+            ttls (Optional[dict[str, Optional[float]]]): Defaults to None. Seconds
+                each endpoint template stays cached, None for ever and 0 to not cache
+                it, merged over DEFAULT_TTLS.
+            not_found_ttl (float): Defaults to 60. Seconds a 404 is remembered, 0 to
+                not remember them.
+            not_found_ttls (Optional[dict[str, float]]): Defaults to None. Seconds a
+                404 of each endpoint template is remembered, over not_found_ttl.
+            stale_ttls (Optional[dict[str, float]]): Defaults to None. Seconds each
+                endpoint template is served stale past its TTL, merged over
+                DEFAULT_STALE_TTLS.
+            error_grace (float): Defaults to 300. Seconds a stale response is still
+                served after a refresh failed, even past its stale TTL.
+        """
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.patterns = [
+            (compile_template(template), ttl) for template, ttl in self.ttls.items()
+        ]
+        self.not_found_ttl = not_found_ttl
+        self.not_found_patterns = [
+            (compile_template(template), ttl)
+            for template, ttl in (not_found_ttls or {}).items()
+        ]
+        self.stale_ttls = {**DEFAULT_STALE_TTLS, **(stale_ttls or {})}
+        self.stale_patterns = [
+            (compile_template(template), ttl)
+            for template, ttl in self.stale_ttls.items()
+        ]
+        self.error_grace = error_grace
+        self.entries: OrderedDict[CacheKey, Entry] = OrderedDict()
+        self.size = 0
+        # background refreshes of stale entries, shared by the clients of the cache
+        self.refreshes: dict[CacheKey, asyncio.Task[Any]] = {}
+
+    def ttl(self, endpoint: str) -> Optional[float]:
+        for pattern, ttl in self.patterns:
+            if pattern.fullmatch(endpoint):
+                return math.inf if ttl is None else ttl
+        return None
+
+    def ttl_not_found(self, endpoint: str) -> float:
+        for pattern, ttl in self.not_found_patterns:
+            if pattern.fullmatch(endpoint):
+                return ttl
+        return self.not_found_ttl
+
+    def ttl_stale(self, endpoint: str) -> float:
+        for pattern, ttl in self.stale_patterns:
+            if pattern.fullmatch(endpoint):
+                return ttl
+        return 0.0
+
+    def key(self, req: HttpRequest) -> CacheKey:
+        return str(req.route), req.endpoint, tuple(sorted(req.params.items()))
+
+    def get(self, req: HttpRequest) -> Optional[tuple[httpx.Response, CachedHeaders]]:
+        """the cached response, raises NotFoundError for a remembered 404"""
+        key = self.key(req)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if entry.stale_until <= now:
+            self.pop(key)
+            return None
+
+        self.entries.move_to_end(key)
+        if entry.error is not None:
+            error = entry.error
+            raise NotFoundError(
+                error.status_code, CachedHeaders(entry.headers), error.body, error.msg
+            )
+        res = httpx.Response(200, content=entry.content, headers=entry.headers)
+        headers = CachedHeaders(entry.headers)
+        headers.stale = entry.expires <= now
+        return res, headers
+
+    def put(self, req: HttpRequest, res: httpx.Response) -> None:
+        ttl = self.ttl(req.endpoint)
+        if not ttl:
+            return
+
+        expires = time.monotonic() + ttl
+        stale_until = expires + self.ttl_stale(req.endpoint)
+        size = len(res.content) + headers_size(res.headers)
+        entry = Entry(res.content, res.headers, expires, stale_until, size)
+        self.add(self.key(req), entry)
+
+    def put_not_found(self, req: HttpRequest, error: NotFoundError) -> None:
+        ttl = self.ttl_not_found(req.endpoint)
+        if not ttl:
+            return
+
+        expires = time.monotonic() + ttl
+        size = len(error.msg) + headers_size(error.headers)
+        entry = Entry(b"", error.headers, expires, expires, size, error)
+        self.add(self.key(req), entry)
+
+    def refresh_failed(self, req: HttpRequest) -> None:
+        """keep serving the stale response for error_grace seconds"""
+        key = self.key(req)
+        entry = self.entries.get(key)
+        if entry is None or entry.error is not None:
+            return
+        stale_until = max(entry.stale_until, time.monotonic() + self.error_grace)
+        self.entries[key] = entry._replace(stale_until=stale_until)
+
+    def add(self, key: CacheKey, entry: Entry) -> None:
+        self.pop(key)
+        if entry.size > self.max_bytes:
+            return
+        self.entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def pop(self, key: CacheKey) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.size = 0
@@ -1,10 +1,31 @@
-from typing import Union, Optional, TypeVar, Type, cast, Tuple
+import asyncio
+import time
+from typing import (
+    AsyncIterator,
+    Iterable,
+    Union,
+    Optional,
+    TypeVar,
+    Type,
+    cast,
+    Tuple,
+)
 
 from pydantic import BaseModel
 import httpx
 
 from riot_api.base_client import BaseClient
-from riot_api.types.request import RoutePlatform, RouteRegion, HttpMethod, HttpRequest
+from riot_api.cache import ResponseCache
+from riot_api.hedge import HedgePolicy
+from riot_api.retry import RetryPolicy
+from riot_api.store import MatchStore
+from riot_api.types.request import (
+    RoutePlatform,
+    RouteRegion,
+    HttpMethod,
+    HttpRequest,
+    Raw,
+)
 from riot_api.types.request import (
     RankedTier,
     RankedDivision,
@@ -25,11 +46,45 @@ from riot_api.types.dto import (
 
 
 T = TypeVar("T", bound=BaseModel)
+# most match IDs get_match_ids_by_puuid returns at once
+MATCH_IDS_PAGE = 100
 
 
 class Client(BaseClient):
-    def __init__(self, api_key):
-        super().__init__(api_key)
+    def __init__(
+        self,
+        api_key,
+        retry_policy: Optional[RetryPolicy] = None,
+        raw: Optional[Raw] = None,
+        coalesce: bool = False,
+        cache: Optional[ResponseCache] = None,
+        store: Optional[MatchStore] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+    ):
+        """
+        Parameters:
+            api_key (str): Riot API key.
+            retry_policy (Optional[RetryPolicy]): Defaults to None, no retries.
+            raw (Optional[Raw]): Defaults to None. If set, every call returns the body
+                unvalidated, as bytes (Raw.BYTES) or parsed JSON (Raw.JSON), whatever
+                its response_model. A single call does the same with
+                response_model=Raw.BYTES (or None) or Raw.JSON.
+            coalesce (bool): Defaults to False. If set, concurrent GET requests of
+                the same route, endpoint and params share one upstream request, its
+                response fanned out to every caller (see metrics.coalesced).
+            cache (Optional[ResponseCache]): Defaults to None. Serves GET requests
+                from the responses it holds, without sending them (see
+                metrics.cache_hits).
+            store (Optional[MatchStore]): Defaults to None. Looks matches and
+                timelines up on disk before sending any request, and stores those
+                downloaded (see metrics.store_hits).
+            hedge_policy (Optional[HedgePolicy]): Defaults to None, no hedging. Sends
+                a copy of GET requests slower than usual and takes the first response
+                (see metrics.hedges).
+        """
+        super().__init__(
+            api_key, retry_policy, raw, coalesce, cache, store, hedge_policy
+        )
 
     # Account endpoints
     async def get_account_by_riot_id(
@@ -37,7 +92,7 @@ class Client(BaseClient):
         region: RouteRegion,
         game_name: str,
         tag_line: str,
-        response_model: Type[T] = AccountDTO,
+        response_model: Type[T] | Raw | None = AccountDTO,
         timeout=3,
     ) -> Tuple[T, httpx.Headers]:
         formatted_endpoint = Account_v1.account_by_riot_id.value.format(
@@ -57,7 +112,7 @@ class Client(BaseClient):
         self,
         region: RouteRegion,
         puuid: str,
-        response_model: Type[T] = AccountDTO,
+        response_model: Type[T] | Raw | None = AccountDTO,
         timeout=3,
     ) -> Tuple[T, httpx.Headers]:
         formatted_endpoint = Account_v1.account_by_puuid.value.format(puuid=puuid)
@@ -76,7 +131,7 @@ class Client(BaseClient):
         region: RouteRegion,
         game: str,
         puuid: str,
-        response_model: Type[T] = AccountRegionDTO,
+        response_model: Type[T] | Raw | None = AccountRegionDTO,
         timeout=3,
     ) -> Tuple[T, httpx.Headers]:
         formatted_endpoint = Account_v1.account_region.value.format(
@@ -103,7 +158,7 @@ class Client(BaseClient):
         type: Optional[str] = None,
         start: Optional[int] = None,
         count: Optional[int] = None,
-        response_model: Type[T] = MatchIdListDTO,
+        response_model: Type[T] | Raw | None = MatchIdListDTO,
         timeout=3,
     ) -> Tuple[T, httpx.Headers]:
         """
@@ -158,11 +213,88 @@ class Client(BaseClient):
         res, headers = await self.send_request(req)
         return cast(T, res), headers
 
+    async def iter_match_ids_by_puuid(
+        self,
+        region: RouteRegion,
+        puuid: str,
+        startTime: Optional[int] = None,
+        endTime: Optional[int] = None,
+        queue: Optional[int] = None,
+        type: Optional[str] = None,
+        windows: int = 1,
+        timeout=3,
+    ) -> AsyncIterator[str]:
+        """
+        Every match ID of a PUUID, newest first, paging through get_match_ids_by_puuid
+        100 at a time. The next page is requested while the current one is consumed,
+        and the first page shorter than 100 is the last.
+
+        Parameters:
+            region (RouteRegion): Regional route.
+            puuid (str): Player UUID.
+            startTime, endTime, queue, type: Filters, see get_match_ids_by_puuid.
+            windows (int): Defaults to 1. Splits startTime to endTime (defaults to now)
+                into that many sub-windows whose pages are requested concurrently, so
+                a long history is not one request after another. Needs startTime.
+
+        Returns:
+            An async iterator of match IDs, each once even when a match played while
+            paging shifts the pages.
+        """
+        assert windows > 0, "Windows must be a positive integer"
+        if windows == 1:
+            ranges = [(startTime, endTime)]
+        else:
+            assert startTime is not None, "Splitting in windows needs a startTime"
+            end = endTime if endTime is not None else int(time.time())
+            bounds = [
+                startTime + (end - startTime) * i // windows
+                for i in range(windows + 1)
+            ]
+            # newest first like the pages, windows share their bounds
+            ranges = [(bounds[i], bounds[i + 1]) for i in reversed(range(windows))]
+
+        def fetch(start_time, end_time, start: int) -> asyncio.Task:
+            return asyncio.ensure_future(
+                self.get_match_ids_by_puuid(
+                    region,
+                    puuid,
+                    start_time,
+                    end_time,
+                    queue,
+                    type,
+                    start,
+                    MATCH_IDS_PAGE,
+                    Raw.JSON,
+                    timeout,
+                )
+            )
+
+        pages = [fetch(start_time, end_time, 0) for start_time, end_time in ranges]
+        seen: set[str] = set()
+        try:
+            for i, (start_time, end_time) in enumerate(ranges):
+                start = 0
+                last = False
+                while not last:
+                    match_ids, _ = await pages[i]
+                    start += len(match_ids)
+                    last = len(match_ids) < MATCH_IDS_PAGE
+                    if not last:
+                        pages[i] = fetch(start_time, end_time, start)
+                    for match_id in match_ids:
+                        if match_id not in seen:
+                            seen.add(match_id)
+                            yield match_id
+        finally:
+            for page in pages:
+                page.cancel()
+
     async def get_match_by_match_id(
         self,
         region: RouteRegion,
         match_id: str,
-        response_model: Type[T] = MatchDTO,
+        response_model: Type[T] | Raw | None = MatchDTO,
         timeout=3,
     ) -> Tuple[T, httpx.Headers]:
         formatted_endpoint = Match_v5.match_by_matchId.value.format(matchId=match_id)
@@ -180,7 +312,7 @@ class Client(BaseClient):
         self,
         region: RouteRegion,
         match_id: str,
-        response_model: Type[T] = TimelineDTO,
+        response_model: Type[T] | Raw | None = TimelineDTO,
         timeout=3,
     ) -> Tuple[T, httpx.Headers]:
         formatted_endpoint = Match_v5.match_timeline.value.format(matchId=match_id)
@@ -194,6 +326,61 @@ class Client(BaseClient):
         res, headers = await self.send_request(req)
         return cast(T, res), headers
 
+    async def get_matches(
+        self,
+        region: RouteRegion,
+        match_ids: Iterable[str],
+        concurrency: int = 20,
+        response_model: Type[T] | Raw | None = MatchDTO,
+        timeout=3,
+    ) -> AsyncIterator[Tuple[str, T | Exception]]:
+        """
+        Fetch many matches, yielding (match_id, match) in completion order.
+
+        Parameters:
+            region (RouteRegion): Regional route.
+            match_ids (Iterable[str]): Read lazily, e.g. a generator.
+            concurrency (int): Defaults to 20. Most requests in flight, fewer while the
+                rate limits have no room left (RateLimitClient).
+
+        Returns:
+            An async iterator of (match_id, match), or (match_id, exception) for the
+            matches that failed, which do not stop the others. See
+            BaseClient.as_completed.
+        """
+
+        async def fetch(match_id: str) -> T:
+            match, _ = await self.get_match_by_match_id(
+                region, match_id, response_model, timeout
+            )
+            return match
+
+        async for item in self.as_completed(
+            region, "get_match_by_match_id", match_ids, fetch, concurrency
+        ):
+            yield item
+
+    async def get_timelines(
+        self,
+        region: RouteRegion,
+        match_ids: Iterable[str],
+        concurrency: int = 20,
+        response_model: Type[T] | Raw | None = TimelineDTO,
+        timeout=3,
+    ) -> AsyncIterator[Tuple[str, T | Exception]]:
+        """Fetch many match timelines, like get_matches."""
+
+        async def fetch(match_id: str) -> T:
+            timeline, _ = await self.get_match_timeline(
+                region, match_id, response_model, timeout
+            )
+            return timeline
+
+        async for item in self.as_completed(
+            region, "get_match_timeline", match_ids, fetch, concurrency
+        ):
+            yield item
+
     # League endpoints
     async def get_league_entries_by_tier(
         self,
@@ -202,7 +389,7 @@ class Client(BaseClient):
         tier: RankedTier,
         division: RankedDivision,
         page: int = 1,
-        response_model: Type[T] = LeagueEntryListDTO,
+        response_model: Type[T] | Raw | None = LeagueEntryListDTO,
         timeout=3,
     ) -> Tuple[T, httpx.Headers]:
         formatted_endpoint = League_v4.league_entry_by_tier.value.format(
@@ -223,7 +410,7 @@ class Client(BaseClient):
         self,
         platform: RoutePlatform,
         league_id: str,
-        response_model: Type[T] = LeagueListDTO,
+        response_model: Type[T] | Raw | None = LeagueListDTO,
         timeout=3,
     ) -> Tuple[T, httpx.Headers]:
         formatted_endpoint = League_v4.league_by_leagueId.value.format(
@@ -243,7 +430,7 @@ class Client(BaseClient):
         self,
         platform: RoutePlatform,
         queue: RankedQueue,
-        response_model: Type[T] = LeagueListDTO,
+        response_model: Type[T] | Raw | None = LeagueListDTO,
         timeout=10,
     ) -> Tuple[T, httpx.Headers]:
         formatted_endpoint = League_v4.challenger_league_by_queue.value.format(
@@ -263,7 +450,7 @@ class Client(BaseClient):
         self,
         platform: RoutePlatform,
         queue: RankedQueue,
-        response_model: Type[T] = LeagueListDTO,
+        response_model: Type[T] | Raw | None = LeagueListDTO,
         timeout=10,
     ) -> Tuple[T, httpx.Headers]:
         formatted_endpoint = League_v4.grandmaster_league_by_queue.value.format(
@@ -283,7 +470,7 @@ class Client(BaseClient):
         self,
         platform: RoutePlatform,
         queue: RankedQueue,
-        response_model: Type[T] = LeagueListDTO,
+        response_model: Type[T] | Raw | None = LeagueListDTO,
         timeout=10,
     ) -> Tuple[T, httpx.Headers]:
         formatted_endpoint = League_v4.master_league_by_queue.value.format(
@@ -0,0 +1,270 @@
+"""
+Snowball crawls: players to their matches, and matches to the players in them.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Awaitable, Callable, Iterable, Iterator, Optional
+
+from riot_api.client import Client
+from riot_api.rate_limit_client import RateLimitExceeded
+from riot_api.types.dto import MatchDTO
+from riot_api.types.request import RankedQueue, RankedTier, RoutePlatform, RouteRegion
+
+MatchSink = Callable[[RouteRegion, MatchDTO], Awaitable[None]]
+
+
+class BloomFilter:
+    """
+    Keys seen so far in constant memory. A key never added may be taken for a seen one
+    with a probability of error_rate once capacity keys were added, never the reverse.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        assert 0 < error_rate < 1, "Error rate must be a fraction"
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, key: str) -> Iterator[int]:
+        # double hashing, the bits of every hash from a single digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> bool:
+        """add a key, False if it was seen already"""
+        added = False
+        for position in self.positions(key):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        return added
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[position // 8] & (1 << position % 8)
+            for position in self.positions(key)
+        )
+
+
+class Frontier:
+    """
+    Items to crawl, highest priority first and in order of push for equal ones. Past
+    maxsize the lowest priorities are dropped, a quarter at a time so the trimming is
+    amortized over the pushes.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.heap: list[tuple[float, int, Any]] = []
+        self.order = itertools.count()
+        self.dropped = 0
+
+    def push(self, priority: float, item: Any) -> None:
+        heapq.heappush(self.heap, (-priority, next(self.order), item))
+        if len(self.heap) > self.maxsize:
+            keep = self.maxsize * 3 // 4
+            self.dropped += len(self.heap) - keep
+            # a sorted list is a heap
+            self.heap = heapq.nsmallest(keep, self.heap)
+
+    def pop(self) -> tuple[float, Any]:
+        priority, _, item = heapq.heappop(self.heap)
+        return -priority, item
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+@dataclass
+class CrawlStats:
+    # players whose matches were listed
+    players: int = 0
+    # matches fetched and passed to the sinks
+    matches: int = 0
+    # players and matches that failed, skipped
+    errors: int = 0
+    # players and matches dropped from full frontiers
+    dropped: int = 0
+
+    def snapshot(self) -> dict[str, int]:
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+
+class GraphCrawler:
+    """
+    Crawls from the players of the apex ladders to their matches, passes every match to
+    the sinks, then crawls the players of those matches, and so on.
+
+    Each region has its own frontiers and pool of workers. Workers fetch matches before
+    listing more players, so the frontiers stay small, and with RateLimitClient only
+    take work while the endpoint has room in its windows (see BaseClient.capacity), so
+    enough workers keep a region at its full budget without RateLimitExceeded. Players
+    are crawled most recent first, by the end of the match they were found in.
+
+    Memory is constant: the frontiers are bounded and dropping their oldest leads once
+    full, and seen players and matches are kept in Bloom filters, which may skip a few
+    never seen.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        sinks: Iterable[MatchSink],
+        platforms: Iterable[RoutePlatform] = (RoutePlatform.KR,),
+        tiers: Iterable[RankedTier] = (RankedTier.CHALLENGER,),
+        queue: Optional[int] = 420,
+        count: int = 20,
+        max_age: Optional[float] = None,
+        max_matches: Optional[int] = None,
+        workers: int = 20,
+        frontier_size: int = 100_000,
+        capacity: int = 10_000_000,
+    ):
+        """
+        Parameters:
+            client (Client): Any Client or RateLimitClient.
+            sinks (Iterable[MatchSink]): Awaited with the region and MatchDTO of every
+                match crawled, one after another.
+            platforms (Iterable[RoutePlatform]): Defaults to KR. Platforms of the seeds,
+                their regions are crawled.
+            tiers (Iterable[RankedTier]): Defaults to CHALLENGER. Apex ladders of the
+                solo queue seeding the crawl, any of CHALLENGER, GRANDMASTER, MASTER.
+            queue (Optional[int]): Defaults to 420, ranked solo. Only matches of this
+                queue are crawled, None for every queue.
+            count (int): Defaults to 20. Most recent matches listed per player.
+            max_age (Optional[float]): Defaults to None. Only matches played in the
+                last max_age seconds are crawled.
+            max_matches (Optional[int]): Defaults to None, until the frontiers are
+                empty. Matches to crawl before stopping, those in flight still finish.
+            workers (int): Defaults to 20. Workers per region.
+            frontier_size (int): Defaults to 100000. Players and matches waiting per
+                region, each.
+            capacity (int): Defaults to 10000000. Players and matches seen, each,
+                before the Bloom filters exceed their error rate.
+        """
+        self.client = client
+        self.sinks = list(sinks)
+        self.platforms = list(platforms)
+        self.tiers = list(tiers)
+        self.queue = queue
+        self.count = count
+        self.max_age = max_age
+        self.max_matches = max_matches
+        self.workers = workers
+        self.stats = CrawlStats()
+        self.seen_players = BloomFilter(capacity)
+        self.seen_matches = BloomFilter(capacity)
+        regions = {platform.to_region() for platform in self.platforms}
+        self.players = {region: Frontier(frontier_size) for region in regions}
+        self.matches = {region: Frontier(frontier_size) for region in regions}
+        self.busy = {region: 0 for region in regions}
+        self.condition = asyncio.Condition()
+
+    async def crawl(self) -> CrawlStats:
+        await self.seed()
+        await asyncio.gather(
+            *(self.work(region) for region in self.players for _ in range(self.workers))
+        )
+        self.stats.dropped = sum(
+            frontier.dropped
+            for frontier in itertools.chain(
+                self.players.values(), self.matches.values()
+            )
+        )
+        return self.stats
+
+    async def seed(self) -> None:
+        get_league = {
+            RankedTier.CHALLENGER: self.client.get_challenger_league,
+            RankedTier.GRANDMASTER: self.client.get_grandmaster_league,
+            RankedTier.MASTER: self.client.get_master_league,
+        }
+        now = time.time()
+        for platform in self.platforms:
+            for tier in self.tiers:
+                league, _ = await get_league[tier](
+                    platform, RankedQueue.RANKED_SOLO_5x5
+                )
+                for entry in league.entries:
+                    if self.seen_players.add(entry.puuid):
+                        self.players[platform.to_region()].push(now, entry.puuid)
+
+    def done(self) -> bool:
+        return self.max_matches is not None and self.stats.matches >= self.max_matches
+
+    async def work(self, region: RouteRegion) -> None:
+        while True:
+            async with self.condition:
+                while (
+                    not self.done()
+                    and not self.matches[region]
+                    and not self.players[region]
+                    and self.busy[region]
+                ):
+                    await self.condition.wait()
+                if self.done() or not (self.matches[region] or self.players[region]):
+                    # nothing left that another worker could add to
+                    self.condition.notify_all()
+                    return
+                frontier = self.matches[region] or self.players[region]
+                priority, item = frontier.pop()
+                self.busy[region] += 1
+
+            try:
+                if frontier is self.matches[region]:
+                    await self.crawl_match(region, item)
+                else:
+                    await self.crawl_player(region, priority, item)
+            except RateLimitExceeded as e:
+                # taken by another client meanwhile, back in line after the reset
+                frontier.push(priority, item)
+                await asyncio.sleep(e.retry_after)
+            except Exception:
+                self.stats.errors += 1
+            finally:
+                async with self.condition:
+                    self.busy[region] -= 1
+                    self.condition.notify_all()
+
+    async def wait_capacity(self, region: RouteRegion, limit_key: str) -> None:
+        while True:
+            capacity = await self.client.capacity(region, limit_key)
+            if capacity is None or capacity[0] > 0:
+                return
+            await asyncio.sleep(capacity[1])
+
+    async def crawl_player(self, region: RouteRegion, priority: float, puuid: str):
+        await self.wait_capacity(region, "get_match_ids_by_puuid")
+        start_time = None
+        if self.max_age is not None:
+            start_time = int(time.time() - self.max_age)
+        match_ids, _ = await self.client.get_match_ids_by_puuid(
+            region, puuid, startTime=start_time, queue=self.queue, count=self.count
+        )
+        self.stats.players += 1
+        for match_id in match_ids.root:
+            if self.seen_matches.add(match_id):
+                # newest first within a player, who was found as recently as priority
+                self.matches[region].push(priority, match_id)
+
+    async def crawl_match(self, region: RouteRegion, match_id: str):
+        await self.wait_capacity(region, "get_match_by_match_id")
+        match, _ = await self.client.get_match_by_match_id(region, match_id)
+        self.stats.matches += 1
+        for sink in self.sinks:
+            await sink(region, match)
+
+        ended = match.info.gameEndTimestamp.timestamp()
+        for puuid in match.metadata.participants:
+            if self.seen_players.add(puuid):
+                self.players[region].push(ended, puuid)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 import httpx
 from riot_api.exceptions import (
     RiotAPIError,
@@ -18,18 +20,34 @@ ERROR_MAP = {
 }
 
 
+def parse_retry_after(headers: httpx.Headers) -> Optional[int]:
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        # an HTTP date, not sent by the Riot API
+        return None
+
+
 def check_status_code(res: httpx.Response) -> None:
     if res.status_code < 400:
         return
 
     status_code = res.status_code
     headers = res.headers
-    body = res.json()
+    try:
+        body = res.json()
+    except ValueError:
+        # e.g. an HTML page of a gateway in front of the API
+        body = {}
     msg = body.get("status", {}).get("message", res.text.strip())
     cls = ERROR_MAP.get(res.status_code, RiotAPIError)
 
     if res.status_code == 429:
-        retry_after: int = int(res.headers["retry-after"])
+        # missing when the service itself is rate limited
+        retry_after = parse_retry_after(headers)
         raise cls(status_code, headers, body, msg, retry_after)
 
     elif 500 <= res.status_code < 600:
@@ -1,3 +1,5 @@
+from typing import Optional
+
 import httpx
 
 
@@ -46,7 +48,7 @@ class RateLimitError(RiotAPIError):
         headers: httpx.Headers,
         body: dict,
         msg: str,
-        retry_after: int,
+        retry_after: Optional[int],
     ):
         super().__init__(status_code, headers, body, msg)
         self.retry_after = retry_after
@@ -0,0 +1,86 @@
+"""
+Hedging requests slower than usual, trading a little spare capacity for tail latency.
+"""
+
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+
+from riot_api.cache import compile_template
+from riot_api.retry import RetryBudget
+from riot_api.types.request import Account_v1, League_v4, Match_v5
+
+# fraction of every window a hedge must leave untouched, set in the task sending it
+hedge_reserve: ContextVar[float] = ContextVar("hedge_reserve", default=0.0)
+
+TEMPLATES = [
+    (compile_template(template), str(template))
+    for endpoints in (Account_v1, Match_v5, League_v4)
+    for template in endpoints
+]
+
+
+def endpoint_template(endpoint: str) -> str:
+    """the template an endpoint was formatted from, so ids share their latencies"""
+    for pattern, template in TEMPLATES:
+        if pattern.fullmatch(endpoint):
+            return template
+    return endpoint
+
+
+class HedgePolicy:
+    """
+    Sends a copy of a GET that has not answered within a percentile of the recent
+    latencies of its route and endpoint, and takes whichever response comes first.
+
+    Hedges are capped to a fraction of the requests by a RetryBudget. With
+    RateLimitClient they take tokens like any request but never the last reserve of
+    a window, so they only use spare capacity; a hedge over that is dropped, never
+    queued nor raised.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_delay: float = 0.01,
+        samples: int = 200,
+        min_samples: int = 20,
+        reserve: float = 0.5,
+        budget: Optional[RetryBudget] = None,
+    ):
+        """
+        Parameters:
+            percentile (float): Defaults to 0.95. Latency percentile after which a
+                request is hedged.
+            min_delay (float): Defaults to 0.01. Least seconds before any hedge.
+            samples (int): Defaults to 200. Latencies kept per route and endpoint.
+            min_samples (int): Defaults to 20. Latencies needed before hedging.
+            reserve (float): Defaults to 0.5. Fraction of every rate limit window
+                hedges leave to first attempts.
+            budget (Optional[RetryBudget]): Defaults to RetryBudget(ratio=0.05), at
+                most one hedge for twenty requests once the burst is spent.
+        """
+        assert 0 < percentile < 1, "Percentile must be a fraction"
+        assert 0 <= reserve < 1, "Reserve must be a fraction"
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.samples = samples
+        self.min_samples = min_samples
+        self.reserve = reserve
+        self.budget = budget if budget is not None else RetryBudget(ratio=0.05)
+        self.latencies: dict[tuple[str, str], deque[float]] = {}
+
+    def delay(self, key: tuple[str, str]) -> Optional[float]:
+        """seconds to wait before hedging, None while too few latencies are known"""
+        latencies = self.latencies.get(key)
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile))
+        return max(self.min_delay, ordered[index])
+
+    def observe(self, key: tuple[str, str], latency: float) -> None:
+        latencies = self.latencies.get(key)
+        if latencies is None:
+            latencies = self.latencies[key] = deque(maxlen=self.samples)
+        latencies.append(latency)
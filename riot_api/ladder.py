@@ -0,0 +1,147 @@
+"""
+Snapshots of the whole ranked ladder, every queue, tier and division of many platforms.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Iterable, NamedTuple, Optional
+
+from riot_api.client import Client
+from riot_api.types.dto.league_dto import LeagueEntryDTO
+from riot_api.types.request import (
+    RankedDivision,
+    RankedQueue,
+    RankedTier,
+    RoutePlatform,
+)
+
+# ladders of a single league each, every other tier is paged by division
+APEX_TIERS = (RankedTier.CHALLENGER, RankedTier.GRANDMASTER, RankedTier.MASTER)
+DIVISION_TIERS = tuple(tier for tier in RankedTier if tier not in APEX_TIERS)
+
+Sink = Callable[[RoutePlatform, list[LeagueEntryDTO]], Awaitable[None]]
+
+
+class Division(NamedTuple):
+    platform: RoutePlatform
+    queue: RankedQueue
+    tier: RankedTier
+    # None for the apex tiers
+    division: Optional[RankedDivision] = None
+
+
+class LadderCrawler:
+    """
+    Crawls get_league_entries_by_tier for every queue, tier, division and page, and the
+    challenger, grandmaster and master leagues, passing each page of LeagueEntryDTO to
+    a sink as it arrives.
+
+    Platforms are crawled side by side, each through BaseClient.as_completed, so every
+    platform is bounded by its own concurrency and, with RateLimitClient, by the room
+    left in its own windows. The pages of a division are requested one after another:
+    every full page has the same size, so the first shorter page is the last and only a
+    division ending on a full page costs an empty one.
+
+    A page is handed to the sink before the next page of its division is requested,
+    so at most concurrency pages per platform are held, however slow the sink is.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        platforms: Iterable[RoutePlatform] = tuple(RoutePlatform),
+        queues: Iterable[RankedQueue] = (
+            RankedQueue.RANKED_SOLO_5x5,
+            RankedQueue.RANKED_FLEX_SR,
+        ),
+        concurrency: int = 10,
+    ):
+        """
+        Parameters:
+            client (Client): Any Client or RateLimitClient.
+            platforms (Iterable[RoutePlatform]): Defaults to every platform.
+            queues (Iterable[RankedQueue]): Defaults to solo and flex.
+            concurrency (int): Defaults to 10. Most divisions crawled at once on each
+                platform.
+        """
+        self.client = client
+        self.platforms = list(platforms)
+        self.queues = list(queues)
+        self.concurrency = concurrency
+        # entries of a full page, learned from the largest page seen
+        self.page_size = 0
+
+    def divisions(self, platform: RoutePlatform) -> list[Division]:
+        return [
+            Division(platform, queue, tier)
+            for queue in self.queues
+            for tier in APEX_TIERS
+        ] + [
+            Division(platform, queue, tier, division)
+            for queue in self.queues
+            for tier in DIVISION_TIERS
+            for division in RankedDivision
+        ]
+
+    async def crawl(self, sink: Sink) -> dict[Division, int | Exception]:
+        """
+        Crawl every platform, returning the entries passed to the sink for each
+        division, or the exception that stopped it. The sink may be awaited for several
+        divisions at once.
+        """
+        results: dict[Division, int | Exception] = {}
+
+        async def crawl_platform(platform: RoutePlatform) -> None:
+            async for division, result in self.client.as_completed(
+                platform,
+                "get_league_entries_by_tier",
+                self.divisions(platform),
+                lambda division: self.crawl_division(division, sink),
+                self.concurrency,
+            ):
+                results[division] = result
+
+        await asyncio.gather(*(crawl_platform(platform) for platform in self.platforms))
+        return results
+
+    async def crawl_division(self, division: Division, sink: Sink) -> int:
+        if division.division is None:
+            entries = await self.apex_entries(division)
+            await sink(division.platform, entries)
+            return len(entries)
+
+        crawled = 0
+        page = 1
+        while True:
+            entries, _ = await self.client.get_league_entries_by_tier(
+                division.platform,
+                division.queue,
+                division.tier,
+                division.division,
+                page,
+            )
+            entries = entries.root
+            if entries:
+                await sink(division.platform, entries)
+                crawled += len(entries)
+            self.page_size = max(self.page_size, len(entries))
+            # until a full page is seen, only an empty one is surely the last
+            if not entries or len(entries) < self.page_size:
+                return crawled
+            page += 1
+
+    async def apex_entries(self, division: Division) -> list[LeagueEntryDTO]:
+        get_league = {
+            RankedTier.CHALLENGER: self.client.get_challenger_league,
+            RankedTier.GRANDMASTER: self.client.get_grandmaster_league,
+            RankedTier.MASTER: self.client.get_master_league,
+        }[division.tier]
+        league, _ = await get_league(division.platform, division.queue)
+        return [
+            LeagueEntryDTO(
+                leagueId=league.leagueId,
+                queueType=league.queue,
+                tier=league.tier,
+                **dict(entry),
+            )
+            for entry in league.entries
+        ]
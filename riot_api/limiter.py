@@ -0,0 +1,829 @@
+"""
+Rate limit windows used by RateLimitClient.
+
+A Limiter applies a strategy to window states kept in a storage. Every window
+of a request is acquired in a single storage transaction, all of them or none.
+MemoryStorage serves one process, SQLiteStorage the processes of one host and
+RedisStorage any number of hosts sharing an API key.
+"""
+
+import asyncio
+import functools
+import json
+import math
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Literal, NamedTuple, Optional, Sequence, TypeVar
+
+from limits.limits import RateLimitItem
+from limits.util import WindowStats
+
+R = TypeVar("R")
+State = tuple[float, ...]
+Update = Callable[[list[Optional[State]]], tuple[list[Optional[State]], R]]
+Op = Literal["acquire", "refund", "sync", "stats"]
+
+
+class Window(NamedTuple):
+    limit: RateLimitItem
+    keys: tuple[str, ...]
+    cost: int = 1
+    # fraction of the window this request must leave untouched
+    reserve: float = 0.0
+
+    @property
+    def reserved(self) -> float:
+        return self.reserve * self.limit.amount
+
+    @property
+    def key(self) -> str:
+        return f"{':'.join(self.keys)}:{self.limit.get_expiry()}"
+
+
+class Storage(ABC):
+    # whether execute awaits anything, i.e. whether it can be cancelled half way
+    suspends = True
+
+    @abstractmethod
+    async def execute(
+        self,
+        strategy: "Strategy",
+        op: Op,
+        windows: Sequence[Window],
+        count: int = 0,
+    ) -> Any:
+        """apply an operation of the strategy to the windows atomically, see apply"""
+        raise NotImplementedError
+
+
+class TransactionalStorage(Storage):
+    """Storage applying the strategy in Python, within a transaction over the keys."""
+
+    async def execute(
+        self,
+        strategy: "Strategy",
+        op: Op,
+        windows: Sequence[Window],
+        count: int = 0,
+    ) -> Any:
+        def update(states: list[Optional[State]]):
+            return apply(strategy, op, windows, count, states, time.time())
+
+        keys = [window.key for window in windows]
+        return await self.transact(keys, update, readonly=op == "stats")
+
+    @abstractmethod
+    async def transact(
+        self, keys: Sequence[str], update: Update[R], readonly: bool = False
+    ) -> R:
+        """read the states of keys, then write back the states returned by update atomically"""
+        raise NotImplementedError
+
+
+class MemoryStorage(TransactionalStorage):
+    suspends = False
+
+    def __init__(self):
+        self.states: dict[str, State] = {}
+
+    async def transact(
+        self, keys: Sequence[str], update: Update[R], readonly: bool = False
+    ) -> R:
+        # nothing awaits in between, so the event loop cannot interleave another update
+        new_states, result = update([self.states.get(key) for key in keys])
+        for key, state in zip(keys, new_states):
+            if state is None:
+                self.states.pop(key, None)
+            else:
+                self.states[key] = state
+        return result
+
+
+def encode_state(state: State) -> str:
+    return json.dumps(state)
+
+
+def decode_state(value: Optional[str | bytes]) -> Optional[State]:
+    if value is None:
+        return None
+    return tuple(json.loads(value))
+
+
+class SQLiteStorage(TransactionalStorage):
+    """
+    Window states in a SQLite database, shared by the processes of a host using the same file.
+
+    BEGIN IMMEDIATE takes the write lock before reading, so transactions of different
+    processes never interleave. Read-only transactions start deferred and, in WAL mode,
+    never wait for the writers.
+    """
+
+    def __init__(self, path: str | os.PathLike, timeout: float = 10.0):
+        self.path = path
+        self.timeout = timeout
+        self.connection: Optional[sqlite3.Connection] = None
+        # sqlite3 blocks, run every transaction on one worker thread
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit (key TEXT PRIMARY KEY, state TEXT NOT NULL)"
+            )
+            self.connection = connection
+        return self.connection
+
+    def _transact(self, keys: list[str], update: Update[R], readonly: bool) -> R:
+        connection = self.connect()
+        connection.execute("BEGIN" if readonly else "BEGIN IMMEDIATE")
+        try:
+            placeholders = ",".join("?" * len(keys))
+            rows = dict(
+                connection.execute(
+                    f"SELECT key, state FROM rate_limit WHERE key IN ({placeholders})",
+                    keys,
+                )
+            )
+            states = [decode_state(rows.get(key)) for key in keys]
+            new_states, result = update(states)
+
+            for key, state, new_state in zip(keys, states, new_states):
+                if new_state == state:
+                    continue
+                if new_state is None:
+                    connection.execute("DELETE FROM rate_limit WHERE key = ?", (key,))
+                else:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO rate_limit (key, state) VALUES (?, ?)",
+                        (key, encode_state(new_state)),
+                    )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return result
+
+    async def transact(
+        self, keys: Sequence[str], update: Update[R], readonly: bool = False
+    ) -> R:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self._transact, list(keys), update, readonly
+        )
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class RedisStorage(Storage):
+    """
+    Window states in Redis, or any server speaking its protocol, shared across hosts.
+
+    Every operation is a single Lua script run atomically on the server, reading the
+    clock of the server so hosts with skewed clocks agree on the windows. Strategies
+    used with it need a Lua implementation (see Strategy.lua).
+    """
+
+    def __init__(self, client: Any, prefix: str = "riot_api:", expire: int = 86400):
+        """
+        Parameters:
+            client (redis.asyncio.Redis | str): Redis client or URL.
+            prefix (str): Defaults to "riot_api:". Prefix of every key.
+            expire (int): Defaults to one day. Seconds before an untouched window is
+                dropped, must be longer than the longest window.
+        """
+        try:
+            import redis.asyncio
+        except ImportError as e:
+            raise ImportError(
+                "RedisStorage requires redis, install riot-api-async[redis]"
+            ) from e
+
+        if isinstance(client, str):
+            client = redis.asyncio.from_url(client)
+        self.client = client
+        self.prefix = prefix
+        self.expire = expire
+        self.scripts: dict[type["Strategy"], Any] = {}
+
+    def script(self, strategy: "Strategy") -> Any:
+        cls = type(strategy)
+        script = self.scripts.get(cls)
+        if script is None:
+            if strategy.lua is None:
+                raise TypeError(f"{cls.__name__} has no Lua implementation")
+            script = self.scripts[cls] = self.client.register_script(
+                REDIS_SCRIPT.replace("-- strategy", strategy.lua)
+            )
+        return script
+
+    async def execute(
+        self,
+        strategy: "Strategy",
+        op: Op,
+        windows: Sequence[Window],
+        count: int = 0,
+    ) -> Any:
+        args = [
+            op,
+            json.dumps(strategy.params()),
+            json.dumps(
+                [
+                    [w.limit.amount, w.limit.get_expiry(), w.cost, w.reserved]
+                    for w in windows
+                ]
+            ),
+            count,
+            self.expire,
+        ]
+        keys = [self.prefix + window.key for window in windows]
+        result = json.loads(await self.script(strategy)(keys=keys, args=args))
+        if op == "stats":
+            return WindowStats(*result)
+        return result
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+# KEYS: window keys, ARGV: op, strategy params, windows as [amount, expiry, cost,
+# reserved], count, expire. Strategies define local acquire, refund, sync and stats over
+# windows w as {amount, expiry, cost, reserved}, returning false for no state.
+REDIS_SCRIPT = """
+local op = ARGV[1]
+local params = cjson.decode(ARGV[2])
+local windows = cjson.decode(ARGV[3])
+local count = tonumber(ARGV[4])
+local expire = tonumber(ARGV[5])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+-- strategy
+
+local states = {}
+for i, key in ipairs(KEYS) do
+    local value = redis.call('GET', key)
+    states[i] = value and cjson.decode(value) or false
+    local w = windows[i]
+    windows[i] = {amount = w[1], expiry = w[2], cost = w[3], reserved = w[4]}
+end
+
+local function save(new_states)
+    for i, key in ipairs(KEYS) do
+        if new_states[i] then
+            redis.call('SET', key, cjson.encode(new_states[i]), 'EX', expire)
+        else
+            redis.call('DEL', key)
+        end
+    end
+end
+
+if op == 'acquire' then
+    local new_states = {}
+    for i, w in ipairs(windows) do
+        new_states[i] = acquire(states[i], w, now)
+        if not new_states[i] then
+            return tostring(i - 1)
+        end
+    end
+    save(new_states)
+elseif op == 'refund' then
+    local new_states = {}
+    for i, w in ipairs(windows) do
+        new_states[i] = refund(states[i], w, now)
+    end
+    save(new_states)
+elseif op == 'sync' then
+    save({sync(states[1], windows[1], count, now)})
+elseif op == 'stats' then
+    return cjson.encode(stats(states[1], windows[1], now))
+end
+return 'null'
+"""
+
+
+class Strategy(ABC):
+    # the same functions in Lua for RedisStorage, over states as arrays, windows w as
+    # {amount, expiry, cost, reserved} and the values of params() as params
+    lua: Optional[str] = None
+
+    def params(self) -> dict[str, Any]:
+        return {}
+
+    @abstractmethod
+    def acquire(
+        self,
+        state: Optional[State],
+        limit: RateLimitItem,
+        cost: int,
+        now: float,
+        reserved: float = 0,
+    ) -> Optional[State]:
+        """state with cost taken, or None if the window has no room besides the reserved requests"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def refund(
+        self, state: Optional[State], limit: RateLimitItem, cost: int, now: float
+    ) -> Optional[State]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def sync(
+        self, state: Optional[State], limit: RateLimitItem, count: int, now: float
+    ) -> Optional[State]:
+        """state counting at least count hits"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(
+        self,
+        state: Optional[State],
+        limit: RateLimitItem,
+        now: float,
+        reserved: float = 0,
+    ) -> WindowStats:
+        raise NotImplementedError
+
+
+class FixedWindow(Strategy):
+    """
+    Counts hits until a fixed period after the first hit of the window.
+
+    Riot's windows do not start exactly when ours do, so up to twice the limit can pass
+    across a window edge; margin keeps that many requests below the limit of each window.
+    """
+
+    def __init__(self, margin: int = 1):
+        self.margin = margin
+
+    def params(self) -> dict[str, Any]:
+        return {"margin": self.margin}
+
+    lua = """
+    local function fresh(s, w, now)
+        if not s or s[2] <= now then return {0, now + w.expiry} end
+        return s
+    end
+
+    local function acquire(s, w, now)
+        s = fresh(s, w, now)
+        if s[1] + w.cost > w.amount - params.margin - w.reserved then return false end
+        return {s[1] + w.cost, s[2]}
+    end
+
+    local function refund(s, w, now)
+        if not s or s[2] <= now then return false end
+        return {math.max(0, s[1] - w.cost), s[2]}
+    end
+
+    local function sync(s, w, count, now)
+        s = fresh(s, w, now)
+        if count <= s[1] then return s end
+        return {count, s[2]}
+    end
+
+    local function stats(s, w, now)
+        local amount = w.amount - params.margin - w.reserved
+        if not s or s[2] <= now then return {now, math.max(0, math.floor(amount))} end
+        return {s[2], math.max(0, math.floor(amount - s[1]))}
+    end
+    """
+
+    # state: (count, reset time)
+    def acquire(
+        self,
+        state: Optional[State],
+        limit: RateLimitItem,
+        cost: int,
+        now: float,
+        reserved: float = 0,
+    ) -> Optional[State]:
+        if state is None or state[1] <= now:
+            state = (0, now + limit.get_expiry())
+
+        count, reset_time = state
+        if count + cost > limit.amount - self.margin - reserved:
+            return None
+        return (count + cost, reset_time)
+
+    def refund(
+        self, state: Optional[State], limit: RateLimitItem, cost: int, now: float
+    ) -> Optional[State]:
+        if state is None or state[1] <= now:
+            return None
+
+        count, reset_time = state
+        return (max(0, count - cost), reset_time)
+
+    def sync(
+        self, state: Optional[State], limit: RateLimitItem, count: int, now: float
+    ) -> Optional[State]:
+        if state is None or state[1] <= now:
+            state = (0, now + limit.get_expiry())
+
+        current, reset_time = state
+        if count <= current:
+            return state
+        return (count, reset_time)
+
+    def stats(
+        self,
+        state: Optional[State],
+        limit: RateLimitItem,
+        now: float,
+        reserved: float = 0,
+    ) -> WindowStats:
+        amount = limit.amount - self.margin - reserved
+        if state is None or state[1] <= now:
+            return WindowStats(now, max(0, math.floor(amount)))
+
+        count, reset_time = state
+        return WindowStats(reset_time, max(0, math.floor(amount - count)))
+
+
+class SlidingWindowCounter(Strategy):
+    """
+    Counts hits in sub-buckets of the period, each counted until a full period after
+    its end, so no rolling period ever holds more than the limit and no margin is needed.
+
+    A hit is counted up to one bucket longer than it has to be, which leaves at most
+    1 / buckets of the limit unused; more buckets waste less but make larger states.
+    """
+
+    def __init__(self, buckets: int = 10):
+        assert buckets > 0, "Buckets must be a positive integer"
+        self.buckets = buckets
+
+    def params(self) -> dict[str, Any]:
+        return {"buckets": self.buckets}
+
+    lua = """
+    local function shift(s, w, now)
+        local n = params.buckets
+        local index = math.floor(now / (w.expiry / n))
+        local shifted = {index}
+        if not s or s[1] + n < index then
+            for i = 1, n + 1 do shifted[i + 1] = 0 end
+            return shifted
+        end
+        local by = math.max(0, index - s[1])
+        if by == 0 then return s end
+        for i = 2 + by, n + 2 do shifted[#shifted + 1] = s[i] end
+        for i = 1, by do shifted[#shifted + 1] = 0 end
+        return shifted
+    end
+
+    local function total(s)
+        local sum = 0
+        for i = 2, #s do sum = sum + s[i] end
+        return sum
+    end
+
+    local function acquire(s, w, now)
+        s = shift(s, w, now)
+        if total(s) + w.cost > w.amount - w.reserved then return false end
+        s[#s] = s[#s] + w.cost
+        return s
+    end
+
+    local function refund(s, w, now)
+        s = shift(s, w, now)
+        local cost = w.cost
+        for i = #s, 2, -1 do
+            local taken = math.min(cost, s[i])
+            s[i] = s[i] - taken
+            cost = cost - taken
+        end
+        return s
+    end
+
+    local function sync(s, w, count, now)
+        s = shift(s, w, now)
+        local missing = count - total(s)
+        if missing > 0 then s[#s] = s[#s] + missing end
+        return s
+    end
+
+    local function stats(s, w, now)
+        s = shift(s, w, now)
+        local n = params.buckets
+        local amount = w.amount - w.reserved
+        local count = total(s)
+        local remaining = math.max(0, math.floor(amount - count))
+        if remaining > 0 then return {now, remaining} end
+        local width = w.expiry / n
+        local oldest = s[1] - n
+        for i = 2, #s do
+            count = count - s[i]
+            if count + 1 <= amount then return {(oldest + i - 1 + n) * width, 0} end
+        end
+        return {(s[1] + 1 + n) * width, 0}
+    end
+    """
+
+    # state: (index of the newest bucket, count of every live bucket oldest first)
+    def _shift(self, state: Optional[State], limit: RateLimitItem, now: float) -> State:
+        index = math.floor(now / (limit.get_expiry() / self.buckets))
+        if state is None or state[0] + self.buckets < index:
+            return (index, *[0] * (self.buckets + 1))
+
+        shift = max(0, int(index - state[0]))
+        if not shift:
+            return state
+        return (index, *state[1 + shift :], *[0] * shift)
+
+    def acquire(
+        self,
+        state: Optional[State],
+        limit: RateLimitItem,
+        cost: int,
+        now: float,
+        reserved: float = 0,
+    ) -> Optional[State]:
+        state = self._shift(state, limit, now)
+        if sum(state[1:]) + cost > limit.amount - reserved:
+            return None
+        return (*state[:-1], state[-1] + cost)
+
+    def refund(
+        self, state: Optional[State], limit: RateLimitItem, cost: int, now: float
+    ) -> Optional[State]:
+        index, *counts = self._shift(state, limit, now)
+        # hand back the newest hits first
+        for i in reversed(range(len(counts))):
+            taken = min(cost, counts[i])
+            counts[i] -= taken
+            cost -= taken
+        return (index, *counts)
+
+    def sync(
+        self, state: Optional[State], limit: RateLimitItem, count: int, now: float
+    ) -> Optional[State]:
+        state = self._shift(state, limit, now)
+        missing = count - sum(state[1:])
+        if missing <= 0:
+            return state
+        return (*state[:-1], state[-1] + missing)
+
+    def stats(
+        self,
+        state: Optional[State],
+        limit: RateLimitItem,
+        now: float,
+        reserved: float = 0,
+    ) -> WindowStats:
+        index, *counts = self._shift(state, limit, now)
+        amount = limit.amount - reserved
+        count = sum(counts)
+        remaining = max(0, math.floor(amount - count))
+        if remaining > 0:
+            return WindowStats(now, remaining)
+
+        # the oldest buckets expire one by one, find when one request fits again
+        width = limit.get_expiry() / self.buckets
+        oldest = index - self.buckets
+        for i, bucket in enumerate(counts):
+            count -= bucket
+            if count + 1 <= amount:
+                return WindowStats((oldest + i + 1 + self.buckets) * width, 0)
+        return WindowStats((index + 1 + self.buckets) * width, 0)
+
+
+class GCRA(Strategy):
+    """
+    Generic cell rate algorithm, a leaky bucket that spaces requests evenly.
+
+    Each request moves a theoretical arrival time (TAT) one emission interval ahead and
+    a request fits while the TAT is at most the burst tolerance ahead of now. The interval
+    is chosen so that no period holds more than the limit, which with burst=1 is the full
+    limit spread evenly over the period.
+    """
+
+    def __init__(self, burst: int = 1):
+        assert burst > 0, "Burst must be a positive integer"
+        self.burst = burst
+
+    def params(self) -> dict[str, Any]:
+        return {"burst": self.burst}
+
+    lua = """
+    local function interval(w)
+        local burst = math.min(params.burst, w.amount)
+        local emission = w.expiry / (w.amount - burst + 1)
+        return emission, (burst - 1) * emission
+    end
+
+    local function acquire(s, w, now)
+        local emission, tolerance = interval(w)
+        s = s or {now, 0, now}
+        local tat, count, reset = math.max(s[1], now), s[2], s[3]
+        if tat + (w.cost - 1) * emission - now > tolerance - w.reserved * emission + 1e-9 then
+            return false
+        end
+        if reset <= now then count, reset = 0, now + w.expiry end
+        return {tat + w.cost * emission, count + w.cost, reset}
+    end
+
+    local function refund(s, w, now)
+        if not s then return false end
+        local emission = interval(w)
+        return {math.max(now, s[1] - w.cost * emission), math.max(0, s[2] - w.cost), s[3]}
+    end
+
+    local function sync(s, w, count, now)
+        local emission = interval(w)
+        s = s or {now, 0, now}
+        local tat, current, reset = s[1], s[2], s[3]
+        if reset <= now then current, reset = 0, now + w.expiry end
+        if count <= current then return {tat, current, reset} end
+        return {math.max(tat, now) + (count - current) * emission, count, reset}
+    end
+
+    local function stats(s, w, now)
+        local emission, tolerance = interval(w)
+        tolerance = tolerance - w.reserved * emission
+        local tat = s and math.max(s[1], now) or now
+        local remaining = math.max(0, math.floor((now + tolerance - tat) / emission) + 1)
+        return {math.max(now, tat - tolerance), remaining}
+    end
+    """
+
+    def _interval(self, limit: RateLimitItem) -> tuple[float, float]:
+        """emission interval and burst tolerance"""
+        burst = min(self.burst, limit.amount)
+        interval = limit.get_expiry() / (limit.amount - burst + 1)
+        return interval, (burst - 1) * interval
+
+    # state: (TAT, count, reset time), count and reset time track a fixed window for sync
+    def acquire(
+        self,
+        state: Optional[State],
+        limit: RateLimitItem,
+        cost: int,
+        now: float,
+        reserved: float = 0,
+    ) -> Optional[State]:
+        interval, tolerance = self._interval(limit)
+        tat, count, reset_time = state or (now, 0, now)
+
+        tat = max(tat, now)
+        # allow for float error, requests sent right on schedule must fit
+        if tat + (cost - 1) * interval - now > tolerance - reserved * interval + 1e-9:
+            return None
+
+        if reset_time <= now:
+            count, reset_time = 0, now + limit.get_expiry()
+        return (tat + cost * interval, count + cost, reset_time)
+
+    def refund(
+        self, state: Optional[State], limit: RateLimitItem, cost: int, now: float
+    ) -> Optional[State]:
+        if state is None:
+            return None
+
+        interval, _ = self._interval(limit)
+        tat, count, reset_time = state
+        return (max(now, tat - cost * interval), max(0, count - cost), reset_time)
+
+    def sync(
+        self, state: Optional[State], limit: RateLimitItem, count: int, now: float
+    ) -> Optional[State]:
+        interval, _ = self._interval(limit)
+        tat, current, reset_time = state or (now, 0, now)
+        if reset_time <= now:
+            current, reset_time = 0, now + limit.get_expiry()
+        if count <= current:
+            return (tat, current, reset_time)
+
+        # requests of other clients push our schedule back
+        return (max(tat, now) + (count - current) * interval, count, reset_time)
+
+    def stats(
+        self,
+        state: Optional[State],
+        limit: RateLimitItem,
+        now: float,
+        reserved: float = 0,
+    ) -> WindowStats:
+        interval, tolerance = self._interval(limit)
+        tolerance -= reserved * interval
+        tat = max(state[0], now) if state else now
+        remaining = max(0, math.floor((now + tolerance - tat) / interval) + 1)
+        return WindowStats(max(now, tat - tolerance), remaining)
+
+
+def apply(
+    strategy: Strategy,
+    op: Op,
+    windows: Sequence[Window],
+    count: int,
+    states: list[Optional[State]],
+    now: float,
+) -> tuple[list[Optional[State]], Any]:
+    """
+    New states and result of an operation over the windows:
+
+    - acquire: take every window or none of them, the index of the first window
+      without room or None
+    - refund: hand the cost of every window back
+    - sync: raise the single window to count hits
+    - stats: WindowStats of the single window
+    """
+    if op == "acquire":
+        new_states = []
+        for i, (window, state) in enumerate(zip(windows, states)):
+            new_state = strategy.acquire(
+                state, window.limit, window.cost, now, window.reserved
+            )
+            if new_state is None:
+                return states, i
+            new_states.append(new_state)
+        return new_states, None
+    if op == "refund":
+        new_states = [
+            strategy.refund(state, window.limit, window.cost, now)
+            for window, state in zip(windows, states)
+        ]
+        return new_states, None
+    if op == "sync":
+        return [strategy.sync(states[0], windows[0].limit, count, now)], None
+    if op == "stats":
+        return states, strategy.stats(
+            states[0], windows[0].limit, now, windows[0].reserved
+        )
+    raise ValueError(f"Unknown operation {op}")
+
+
+class Limiter:
+    def __init__(
+        self,
+        storage: Optional[Storage] = None,
+        strategy: Optional[Strategy] = None,
+        reserve: float = 0.0,
+    ):
+        """
+        Parameters:
+            storage (Optional[Storage]): Defaults to MemoryStorage().
+            strategy (Optional[Strategy]): Defaults to FixedWindow().
+            reserve (float): Defaults to 0. Fraction of every window left to
+                INTERACTIVE requests of the RateLimitClients using this limiter.
+        """
+        assert 0 <= reserve < 1, "Reserve must be a fraction of the window"
+        self.storage = storage or MemoryStorage()
+        self.strategy = strategy or FixedWindow()
+        self.reserve = reserve
+        # refunds of abandoned acquires, referenced until done
+        self.background: set[asyncio.Future] = set()
+
+    async def acquire(self, windows: Sequence[Window]) -> Optional[Window]:
+        """take every window or none of them, returns the first window without room"""
+        execution = self.storage.execute(self.strategy, "acquire", windows)
+        if not self.storage.suspends:
+            index = await execution
+        else:
+            # an operation cancelled while in flight may still commit, so it runs on
+            # its own and the tokens are handed back if the caller is gone when it does
+            transaction = asyncio.ensure_future(execution)
+            try:
+                index = await asyncio.shield(transaction)
+            except asyncio.CancelledError:
+                transaction.add_done_callback(
+                    functools.partial(self._refund_abandoned, windows)
+                )
+                raise
+        return None if index is None else windows[index]
+
+    def _refund_abandoned(
+        self, windows: Sequence[Window], transaction: asyncio.Future
+    ) -> None:
+        if transaction.cancelled() or transaction.exception() is not None:
+            return
+        if transaction.result() is None:
+            refund = asyncio.ensure_future(self.refund(windows))
+            self.background.add(refund)
+            refund.add_done_callback(self.background.discard)
+
+    async def refund(self, windows: Sequence[Window]) -> None:
+        # the caller gives the tokens up, even if it is cancelled meanwhile
+        await asyncio.shield(self.storage.execute(self.strategy, "refund", windows))
+
+    async def sync(self, window: Window, count: int) -> None:
+        """raise the window to the count reported by the server"""
+        await self.storage.execute(self.strategy, "sync", [window], count)
+
+    async def window_stats(self, window: Window) -> WindowStats:
+        return await self.storage.execute(self.strategy, "stats", [window])
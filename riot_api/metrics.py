@@ -0,0 +1,28 @@
+"""
+Counters of what a client did with the requests asked of it.
+"""
+
+from dataclasses import dataclass, fields
+
+
+@dataclass
+class Metrics:
+    # calls of send_request
+    requests: int = 0
+    # requests served by an identical request already in flight
+    coalesced: int = 0
+    # requests served by the response cache
+    cache_hits: int = 0
+    # cache hits past their TTL, refreshed in the background
+    stale_hits: int = 0
+    # requests failed by a 404 the response cache remembers
+    not_found_hits: int = 0
+    # requests served by the match store
+    store_hits: int = 0
+    # copies of requests slower than usual, unless the limiter had no spare tokens,
+    # and the copies answering first
+    hedges: int = 0
+    hedge_wins: int = 0
+
+    def snapshot(self) -> dict[str, int]:
+        return {field.name: getattr(self, field.name) for field in fields(self)}
@@ -0,0 +1,73 @@
+"""
+Rate limits kept between runs, so new processes start without discovery probes.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from limits.limits import RateLimitItem, RateLimitItemPerSecond
+
+from riot_api.types.request import RateLimit
+
+Limits = dict[tuple[str, str], list[RateLimit]]
+
+
+def to_limit_item(rate_limit: RateLimit) -> RateLimitItem:
+    return RateLimitItemPerSecond(
+        rate_limit.max_rate, rate_limit.time_period, "RIOT_API"
+    )
+
+
+def to_rate_limit(item: RateLimitItem) -> RateLimit:
+    return RateLimit(item.amount, item.multiples)
+
+
+class LimitProfile:
+    """
+    Rate limits of one API key type (e.g. development, personal, production) in a JSON
+    file holding any number of key types:
+
+        {"production": {"EUROPE:route": [[500, 10], [30000, 600]], ...}, ...}
+
+    Saving merges into the file and replaces it atomically, so processes sharing it
+    never read it half written.
+    """
+
+    def __init__(self, path: str | os.PathLike, key_type: str = "default"):
+        self.path = Path(path)
+        self.key_type = key_type
+
+    def read(self) -> dict[str, dict[str, list[list[int]]]]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+
+    def load(self) -> Limits:
+        section = self.read().get(self.key_type, {})
+        return {
+            tuple(key.split(":", 1)): [RateLimit(*window) for window in windows]
+            for key, windows in section.items()
+        }
+
+    def save(self, limits: Limits) -> None:
+        """store the limits of the given keys, keeping the others"""
+        profiles = self.read()
+        section = profiles.setdefault(self.key_type, {})
+        for keys, rate_limits in limits.items():
+            section[":".join(keys)] = [
+                [rate_limit.max_rate, rate_limit.time_period]
+                for rate_limit in rate_limits
+            ]
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(profiles, file, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
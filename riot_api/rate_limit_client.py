@@ -12,6 +12,7 @@ from typing import (
 import asyncio
 import functools
 import time
+from contextvars import ContextVar
 from datetime import datetime, timezone
 
 
@@ -19,22 +20,37 @@ import httpx
 from pydantic import BaseModel
 from limits.limits import RateLimitItem, RateLimitItemPerSecond
 from limits.util import WindowStats
-from limits.aio.storage import MemoryStorage
-from limits.aio.strategies import FixedWindowRateLimiter
 
+from riot_api.adaptive import AIMDController
+from riot_api.cache import CachedHeaders, ResponseCache
 from riot_api.client import Client
-from riot_api.types.request import HttpRequest
+from riot_api.exceptions import RiotAPIError
+from riot_api.hedge import HedgePolicy, hedge_reserve
+from riot_api.limiter import Limiter, MemoryStorage, Window
+from riot_api.profile import LimitProfile, Limits, to_limit_item, to_rate_limit
+from riot_api.retry import RetryPolicy
+from riot_api.store import MatchStore
+from riot_api.scheduler import DEFAULT_WEIGHTS, Priority, Scheduler
+from riot_api.types.request import HttpRequest, Raw
 from riot_api.types.request.routes import RouteRegion, RoutePlatform
 
 
 class RateLimitExceeded(Exception):
-    def __init__(self, keys: tuple[str, ...], window_stat: WindowStats):
+    def __init__(
+        self,
+        keys: tuple[str, ...],
+        window_stat: WindowStats,
+        limit: Optional[RateLimitItem] = None,
+    ):
         self.keys = keys
         self.window_stat = window_stat
+        self.limit = limit
         now = time.time()
         self.retry_after = max(0, window_stat.reset_time - now)
 
         key_str = ":".join(keys)
+        if limit is not None:
+            key_str = f"{key_str} ({limit})"
         reset_dt = datetime.fromtimestamp(window_stat.reset_time, tz=timezone.utc)
         reset_str = reset_dt.isoformat()
 
@@ -46,43 +62,59 @@ class RateLimitExceeded(Exception):
         super().__init__(message)
 
 
-class LimiterWithDecr(FixedWindowRateLimiter):
-    def __init__(self, storage: MemoryStorage):
-        super().__init__(storage)
-
-    async def decr(self, item: RateLimitItem, *identifiers: str, cost: int = 1):
-        await self.storage.decr(  # type: ignore[reportAttributeAccessIssue]
-            item.key_for(*identifiers),
-            amount=cost,
-        )
-
-
 P = ParamSpec("P")
 RequestFunc = Callable[P, Awaitable[tuple[BaseModel, httpx.Headers]]]
 RequestMethod = Callable[
     Concatenate["RateLimitClient", P], Awaitable[Tuple[BaseModel, httpx.Headers]]
 ]
 
+# windows of the outer decorated methods, acquired together by the innermost one
+pending_windows: ContextVar[tuple[Window, ...]] = ContextVar(
+    "pending_windows", default=()
+)
+
 
 def add_limit(
-    get_limit_info: Callable[[httpx.Headers], RateLimitItem],
+    get_limit_info: Callable[[httpx.Headers], list[RateLimitItem]],
+    get_count_info: Callable[[httpx.Headers], dict[int, int]],
     limit_key: str,
     weight: int = 1,
+    acquire: bool = False,
 ) -> Callable[[RequestMethod[P]], RequestFunc[P]]:
+    """
+    Rate limit a method by the windows of a (route, limit_key) learned from the headers.
+
+    Only the innermost decorated method (acquire=True) takes tokens, for its own windows
+    and those of every outer decorated method at once, so a request never holds tokens
+    of some windows while being rejected by another.
+    """
     assert weight > 0, "Weight must be a positive integer"
 
     def decorator(func: RequestMethod[P]) -> RequestFunc[P]:
         sig = inspect.signature(func)
 
-        block = asyncio.Event()
-        wake = asyncio.Event()
+        async def call(
+            self: "RateLimitClient",
+            windows: list[Window],
+            *args: P.args,
+            **kwargs: P.kwargs,
+        ) -> tuple[BaseModel, httpx.Headers]:
+            if acquire:
+                windows = [*pending_windows.get(), *windows]
+                return await self.send_limited(
+                    windows, functools.partial(func, self, *args, **kwargs)
+                )
+
+            token = pending_windows.set((*pending_windows.get(), *windows))
+            try:
+                return await func(self, *args, **kwargs)
+            finally:
+                pending_windows.reset(token)
 
         @functools.wraps(func)
         async def wrapper(
             self: "RateLimitClient", *args: P.args, **kwargs: P.kwargs
         ) -> tuple[BaseModel, httpx.Headers]:
-            nonlocal block, wake
-
             bound = sig.bind(self, *args, **kwargs)
             bound.apply_defaults()
 
@@ -99,37 +131,59 @@ def add_limit(
             route_key = route.name
             keys = (route_key, limit_key)
 
-            limit = self.limits.get(keys)
-            if limit is None:
-                if not block.is_set():
-                    block.set()
-
-                    res, headers = await func(self, *args, **kwargs)
-                    limit = get_limit_info(headers)
-                    self.limits[keys] = limit
-
-                    wake.set()
-                    await self.limiter.hit(limit, *keys, cost=weight)
-                    return res, headers
-
+            limits = self.limits.get(keys)
+            while limits is None:
+                probe = self.probes.get(keys)
+                if probe is not None:
+                    # another request is discovering this key, retry once it is done
+                    await probe.wait()
+                    limits = self.limits.get(keys)
+                    continue
+
+                # send a single probe request per key to learn the limit from headers
+                probe = self.probes[keys] = asyncio.Event()
+                try:
+                    res, headers = await call(self, [], *args, **kwargs)
+                except RiotAPIError as e:
+                    if isinstance(e.headers, CachedHeaders):
+                        raise e
+                    # error responses carry the rate limit headers as well
+                    await self.update_limit(
+                        get_limit_info, get_count_info, keys, e.headers, weight
+                    )
+                    raise e
                 else:
-                    print("waiting for limit")
-                    await wake.wait()
-                    limit = self.limits.get(keys)
-                    if limit is None:
-                        raise ValueError("")
-
-            available = await self.limiter.hit(limit, *keys, cost=weight)
-            if not available:
-                window_stat = await self.limiter.get_window_stats(limit, *keys)
-                raise RateLimitExceeded(keys, window_stat)
-
+                    if not isinstance(headers, CachedHeaders):
+                        await self.update_limit(
+                            get_limit_info, get_count_info, keys, headers, weight
+                        )
+                finally:
+                    del self.probes[keys]
+                    probe.set()
+
+                return res, headers
+
+            if self.controller is not None:
+                limits = self.controller.scale(keys, limits)
+            windows = [Window(limit, keys, weight) for limit in limits]
             try:
-                res, headers = await func(self, *args, **kwargs)
-            except RateLimitExceeded as e:
-                await self.limiter.decr(limit, *keys, cost=weight)
+                res, headers = await call(self, windows, *args, **kwargs)
+            except RiotAPIError as e:
+                if isinstance(e.headers, CachedHeaders):
+                    # a 404 remembered by the cache, nothing was sent
+                    raise e
+                self.observe(keys, e)
+                await self.update_limit(get_limit_info, get_count_info, keys, e.headers)
+                raise e
+            except httpx.TimeoutException as e:
+                self.observe(keys, e)
                 raise e
 
+            if isinstance(headers, CachedHeaders):
+                # nothing was sent, the headers are those of an earlier response
+                return res, headers
+            self.observe(keys)
+            await self.update_limit(get_limit_info, get_count_info, keys, headers)
             return res, headers
 
         return cast(RequestFunc[P], wrapper)
@@ -138,38 +192,258 @@ def add_limit(
 
 
 class RateLimitClient(Client):
-    limits: dict[tuple[str, str], RateLimitItem] = {}
-    storage: MemoryStorage
-    limiter: LimiterWithDecr
+    limits: dict[tuple[str, str], list[RateLimitItem]] = {}
+    # one per limiter and route, clients with other limiters queue apart
+    schedulers: dict[tuple[Limiter, str], Scheduler] = {}
+    probes: dict[tuple[str, str], asyncio.Event] = {}
+    limiter: Limiter
+    weights: dict[Priority, float] = dict(DEFAULT_WEIGHTS)
+
+    def __init__(
+        self,
+        api_key: str,
+        wait: bool = False,
+        limiter: Optional[Limiter] = None,
+        priority: Priority = Priority.NORMAL,
+        tenant: Optional[str] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        controller: Optional[AIMDController] = None,
+        limits: Optional[Limits] = None,
+        profile: Optional[LimitProfile] = None,
+        raw: Optional[Raw] = None,
+        coalesce: bool = False,
+        cache: Optional[ResponseCache] = None,
+        store: Optional[MatchStore] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+    ):
+        """
+        Parameters:
+            api_key (str): Riot API key.
+            wait (bool): Defaults to False. If set, requests over the limit are queued
+                per route and released once the windows have room instead of raising
+                RateLimitExceeded.
+            limiter (Optional[Limiter]): Defaults to the limiter shared by every
+                RateLimitClient of the process (fixed windows in memory). Pass e.g.
+                Limiter(strategy=GCRA()) to spread requests evenly over the windows, or
+                Limiter(SQLiteStorage(path)) / Limiter(RedisStorage(url)) to share the
+                budget with other processes and hosts using the same API key.
+                Limiter(reserve=0.2) leaves a fifth of every window to INTERACTIVE
+                clients, whatever the other clients sharing it do.
+            priority (Priority): Defaults to NORMAL. Queued requests of each
+                (priority, tenant) flow are released in proportion to the weight of
+                the priority (see RateLimitClient.weights), so INTERACTIVE lookups get
+                ahead of a long BATCH backlog without starving it.
+            tenant (Optional[str]): Defaults to None. Clients of the same priority but
+                different tenants share its turns fairly.
+            retry_policy (Optional[RetryPolicy]): Defaults to None, no retries. Every
+                retry takes tokens of the windows again.
+            controller (Optional[AIMDController]): Defaults to None, the full limits
+                are used. Lowers the limits of a route and endpoint after service 429s
+                and timeouts and raises them back as requests succeed; share one
+                between clients to share what it learned.
+            limits (Optional[dict[tuple[str, str], list[RateLimit]]]): Defaults to
+                None. Limits per (route, limit_key), e.g. ("EUROPE", "route") or
+                ("EUROPE", "get_match_by_match_id"), used until the headers tell
+                otherwise, so those keys need no discovery probe.
+            profile (Optional[LimitProfile]): Defaults to None. Loads limits like the
+                limits parameter, which overrides it, and stores every limit learned
+                from the headers that differs from the known one.
+            raw (Optional[Raw]): Defaults to None. Returns the bodies unvalidated, see
+                Client.
+            coalesce (bool): Defaults to False. Identical requests in flight share
+                one upstream request and its tokens, see Client.
+            cache (Optional[ResponseCache]): Defaults to None. Responses served from
+                the cache take no tokens, see Client.
+            store (Optional[MatchStore]): Defaults to None. Matches and timelines
+                found on disk take no tokens, see Client.
+            hedge_policy (Optional[HedgePolicy]): Defaults to None. Hedges only take
+                tokens the windows can spare, see HedgePolicy.
+        """
+        super().__init__(
+            api_key, retry_policy, raw, coalesce, cache, store, hedge_policy
+        )
+        self.wait = wait
+        if limiter is not None:
+            self.limiter = limiter
+        self.priority = priority
+        self.tenant = tenant
+        self.controller = controller
+        self.profile = profile
+
+        known = profile.load() if profile is not None else {}
+        known.update(limits or {})
+        for keys, rate_limits in known.items():
+            # limits learned from the headers are newer than any supplied
+            self.limits.setdefault(
+                keys, [to_limit_item(limit) for limit in rate_limits]
+            )
+
+    def observe(
+        self, keys: tuple[str, str], error: Optional[BaseException] = None
+    ) -> None:
+        if self.controller is not None:
+            self.controller.observe(keys, error)
+
+    async def update_limit(
+        self,
+        get_limit_info: Callable[[httpx.Headers], list[RateLimitItem]],
+        get_count_info: Callable[[httpx.Headers], dict[int, int]],
+        keys: tuple[str, str],
+        headers: httpx.Headers,
+        cost: int = 0,
+    ) -> None:
+        try:
+            limits = get_limit_info(headers)
+        except KeyError:
+            # no rate limit headers (e.g. rejected before reaching the API), probe again later
+            return
+
+        # limits can change at any time, always keep the latest ones
+        previous = self.limits.get(keys)
+        self.limits[keys] = limits
+        if self.profile is not None and limits != previous:
+            rate_limits = [to_rate_limit(limit) for limit in limits]
+            await asyncio.to_thread(self.profile.save, {keys: rate_limits})
+        windows = [Window(limit, keys, cost) for limit in limits]
+        if cost:
+            await self.limiter.acquire(windows)
+
+        # correct local windows with the server's view, which also sees other clients
+        counts = get_count_info(headers)
+        for window in windows:
+            count = counts.get(window.limit.multiples)
+            if count is not None:
+                await self.limiter.sync(window, count)
+
+    async def send_limited(
+        self,
+        windows: list[Window],
+        send: Callable[[], Awaitable[tuple[BaseModel, httpx.Headers]]],
+    ) -> tuple[BaseModel, httpx.Headers]:
+        # only INTERACTIVE requests may use the part of the windows the limiter reserves
+        reserve = self.limiter.reserve
+        if self.priority == Priority.INTERACTIVE:
+            reserve = 0.0
+        # hedges only take what the windows can spare, and never wait for it
+        hedge = hedge_reserve.get()
+        reserve = max(reserve, hedge)
+        if reserve:
+            windows = [window._replace(reserve=reserve) for window in windows]
+        # acquire either returns owning the tokens or raises having taken none, even
+        # when cancelled while a SQLite or Redis transaction is in flight
+        await self.acquire(windows, wait=self.wait and not hedge)
+        try:
+            return await send()
+        except (httpx.TransportError, asyncio.CancelledError):
+            # no response was seen for the request, hand its tokens back
+            await self.limiter.refund(windows)
+            raise
+
+    async def capacity(
+        self, route: RouteRegion | RoutePlatform, limit_key: str
+    ) -> Optional[tuple[int, float]]:
+        """the room left in the windows of the route and of the endpoint"""
+        reserve = self.limiter.reserve
+        if self.priority == Priority.INTERACTIVE:
+            reserve = 0.0
+
+        windows = []
+        for keys in ((route.name, limit_key), (route.name, "route")):
+            limits = self.limits.get(keys)
+            if limits is None:
+                # not probed yet, the first request learns them
+                continue
+            if self.controller is not None:
+                limits = self.controller.scale(keys, limits)
+            windows += [Window(limit, keys, reserve=reserve) for limit in limits]
+        if not windows:
+            return None
+
+        stats = [await self.limiter.window_stats(window) for window in windows]
+        available = min(window_stat.remaining for window_stat in stats)
+        reset_time = max(
+            window_stat.reset_time
+            for window_stat in stats
+            if window_stat.remaining == available
+        )
+        return available, max(0.0, reset_time - time.time())
+
+    def scheduler(self, route: str) -> Scheduler:
+        key = (self.limiter, route)
+        scheduler = self.schedulers.get(key)
+        if scheduler is None:
+            scheduler = self.schedulers[key] = Scheduler()
+        return scheduler
+
+    async def acquire(self, windows: list[Window], wait: bool) -> None:
+        if not windows:
+            return
+
+        if not wait:
+            window = await self.limiter.acquire(windows)
+            if window is not None:
+                window_stat = await self.limiter.window_stats(window)
+                raise RateLimitExceeded(window.keys, window_stat, window.limit)
+            return
+
+        # the route windows come last, requests of a route share its scheduler
+        await self.scheduler(windows[-1].keys[0]).acquire(
+            self.limiter,
+            windows,
+            (self.priority, self.tenant),
+            self.weights[self.priority],
+        )
+
+
+def parse_rate_limit_header(value: str) -> list[tuple[int, int]]:
+    """parse "20:1,100:120" into [(20, 1), (100, 120)]"""
+    windows = []
+    for window in value.split(","):
+        count, seconds = window.split(":")
+        windows.append((int(count), int(seconds)))
+    return windows
 
 
-def get_limit_info_endpoint(headers: httpx.Headers) -> RateLimitItem:
-    limit_str = headers["X-Method-Rate-Limit"].split(":")
-    amount, multiples = int(limit_str[0]) - 1, int(limit_str[1])
+def get_limit_info_endpoint(headers: httpx.Headers) -> list[RateLimitItem]:
+    windows = parse_rate_limit_header(headers["X-Method-Rate-Limit"])
+
+    return [
+        RateLimitItemPerSecond(amount, multiples, "RIOT_API")
+        for amount, multiples in windows
+    ]
 
-    return RateLimitItemPerSecond(amount, multiples, "RIOT_API")
 
+def get_limit_info_route(headers: httpx.Headers) -> list[RateLimitItem]:
+    windows = parse_rate_limit_header(headers["X-App-Rate-Limit"])
+
+    return [
+        RateLimitItemPerSecond(amount, multiples, "RIOT_API")
+        for amount, multiples in windows
+    ]
 
-def get_limit_info_route_long(headers: httpx.Headers) -> RateLimitItem:
-    limit_str = headers["X-App-Rate-Limit"].split(",")[0].split(":")
-    amount, multiples = int(limit_str[0]) - 1, int(limit_str[1])
 
-    return RateLimitItemPerSecond(amount, multiples, "RIOT_API")
+def get_count_info_endpoint(headers: httpx.Headers) -> dict[int, int]:
+    value = headers.get("X-Method-Rate-Limit-Count")
+    if value is None:
+        return {}
 
+    return {multiples: count for count, multiples in parse_rate_limit_header(value)}
 
-def get_limit_info_route_short(headers: httpx.Headers) -> RateLimitItem:
-    limit_str = headers["X-App-Rate-Limit"].split(",")[1].split(":")
-    amount, multiples = int(limit_str[0]) - 1, int(limit_str[1])
 
-    return RateLimitItemPerSecond(amount, multiples, "RIOT_API")
+def get_count_info_route(headers: httpx.Headers) -> dict[int, int]:
+    value = headers.get("X-App-Rate-Limit-Count")
+    if value is None:
+        return {}
+
+    return {multiples: count for count, multiples in parse_rate_limit_header(value)}
 
 
 def reset_rate_limited_client():
-    # initialize limits, storage, limiter
-    storage = MemoryStorage()
-    RateLimitClient.storage = storage
-    RateLimitClient.limiter = LimiterWithDecr(storage)
+    # initialize limits, limiter
+    RateLimitClient.limiter = Limiter(MemoryStorage())
     RateLimitClient.limits.clear()
+    RateLimitClient.schedulers.clear()
+    RateLimitClient.probes.clear()
 
     # apply rate limit to endpoints
     endpoint_methods = [
@@ -190,17 +464,19 @@ def reset_rate_limited_client():
     ]
     for name in endpoint_methods:
         method = getattr(Client, name)
-        limited_method = add_limit(get_limit_info_endpoint, name)(method)
+        limited_method = add_limit(
+            get_limit_info_endpoint, get_count_info_endpoint, name
+        )(method)
         setattr(RateLimitClient, name, limited_method)
 
-    route_methods = ["send_request"]
+    # each attempt of send_request is limited, retries included
+    route_methods = ["send"]
     for name in route_methods:
         method = getattr(Client, name)
-        limited_method_long = add_limit(get_limit_info_route_long, "route_long")(method)
-        limited_method_short = add_limit(get_limit_info_route_short, "route_short")(
-            limited_method_long
-        )
-        setattr(RateLimitClient, name, limited_method_short)
+        limited_method = add_limit(
+            get_limit_info_route, get_count_info_route, "route", acquire=True
+        )(method)
+        setattr(RateLimitClient, name, limited_method)
 
 
 reset_rate_limited_client()
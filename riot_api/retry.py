@@ -0,0 +1,130 @@
+"""
+Retrying requests that failed for reasons that go away on their own.
+"""
+
+import random
+import time
+from typing import Collection, Optional
+
+import httpx
+
+from riot_api.error_handler import parse_retry_after
+from riot_api.exceptions import RateLimitError, ServerError
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of the requests, so a failing API is not hit by more
+    and more retries.
+
+    Every request deposits ratio tokens and every retry withdraws one. The bucket also
+    refills by min_per_second, so clients with little traffic can still retry, and it
+    holds at most max_tokens so a quiet period does not allow a retry storm.
+    """
+
+    def __init__(
+        self, ratio: float = 0.1, min_per_second: float = 1.0, max_tokens: float = 10.0
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated = time.monotonic()
+
+    def refill(self, tokens: float) -> None:
+        now = time.monotonic()
+        tokens += (now - self.updated) * self.min_per_second
+        self.tokens = min(self.max_tokens, self.tokens + tokens)
+        self.updated = now
+
+    def deposit(self) -> None:
+        self.refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        self.refill(0)
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed request is sent again.
+
+    - 429 of the application or method limit: the window of the key is full, wait for
+      Retry-After which is when it resets.
+    - 429 of the service (or without X-Rate-Limit-Type, from the edge): the API itself
+      is overloaded, wait for Retry-After if given but at least the backoff.
+    - 5xx, timeouts and network errors: exponential backoff with full jitter.
+
+    Anything else (4xx) is raised right away, as is a Retry-After over max_retry_after.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        max_retry_after: float = 60.0,
+        rate_limit_types: Collection[str] = ("application", "method", "service"),
+        budget: Optional[RetryBudget] = None,
+    ):
+        """
+        Parameters:
+            max_attempts (int): Defaults to 3. Attempts per request, including the first.
+            backoff (float): Defaults to 0.5. Upper bound in seconds of the first
+                backoff, doubling every attempt.
+            max_backoff (float): Defaults to 30. Upper bound in seconds of any backoff.
+            max_retry_after (float): Defaults to 60. Longest Retry-After in seconds
+                worth waiting for, longer ones are raised to the caller.
+            rate_limit_types (Collection[str]): Defaults to all. Values of the
+                X-Rate-Limit-Type header whose 429 responses are retried.
+            budget (Optional[RetryBudget]): Defaults to RetryBudget(). Shared by every
+                request sent with this policy.
+        """
+        assert max_attempts > 0, "Max attempts must be a positive integer"
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.rate_limit_types = frozenset(rate_limit_types)
+        self.budget = budget if budget is not None else RetryBudget()
+
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        )
+
+    def delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """seconds to wait after the given failed attempt, None to give up"""
+        if attempt >= self.max_attempts:
+            return None
+
+        delay: Optional[float] = None
+        if isinstance(error, RateLimitError):
+            limit_type = error.headers.get("X-Rate-Limit-Type", "service").lower()
+            if limit_type not in self.rate_limit_types:
+                return None
+            if error.retry_after is None:
+                delay = self.backoff_delay(attempt)
+            elif error.retry_after > self.max_retry_after:
+                return None
+            elif limit_type == "service":
+                delay = max(error.retry_after, self.backoff_delay(attempt))
+            else:
+                # spread the callers waiting for the same reset a little
+                delay = error.retry_after + random.uniform(0, self.backoff)
+        elif isinstance(error, ServerError):
+            delay = self.backoff_delay(attempt)
+            retry_after = parse_retry_after(error.headers)
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    return None
+                delay = max(delay, retry_after)
+        elif isinstance(error, (httpx.TimeoutException, httpx.NetworkError)):
+            delay = self.backoff_delay(attempt)
+
+        if delay is None or not self.budget.withdraw():
+            return None
+        return delay
@@ -0,0 +1,202 @@
+"""
+Weighted fair queueing of rate limited requests waiting for room in their windows.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from enum import StrEnum
+from typing import Hashable, Optional, Sequence
+
+from riot_api.limiter import Limiter, Window
+
+
+class Priority(StrEnum):
+    INTERACTIVE = "interactive"
+    NORMAL = "normal"
+    BATCH = "batch"
+
+
+DEFAULT_WEIGHTS: dict[Priority, float] = {
+    Priority.INTERACTIVE: 16,
+    Priority.NORMAL: 4,
+    Priority.BATCH: 1,
+}
+
+
+class Waiter:
+    __slots__ = ("tag", "limiter", "windows", "future")
+
+    def __init__(
+        self,
+        tag: float,
+        limiter: Limiter,
+        windows: Sequence[Window],
+        future: asyncio.Future,
+    ):
+        self.tag = tag
+        self.limiter = limiter
+        self.windows = windows
+        self.future = future
+
+
+class Scheduler:
+    """
+    Releases the waiting requests of a route as their windows get room.
+
+    Each flow (e.g. priority and tenant) gets turns in proportion to its weight by
+    self-clocked fair queueing: a request is tagged with the virtual time its flow
+    would finish it, and the smallest tag that fits goes first. Requests of a flow
+    to the same limit key stay FIFO, while a request blocked by a full method window
+    or by the reserved part of a window does not hold up the others.
+    """
+
+    # finish tags of idle flows are dropped once there are more flows than this
+    max_flows = 1024
+    # least time to wait when nothing fits, a request that can never fit must not spin
+    min_delay = 0.01
+
+    def __init__(self):
+        self.queues: dict[Hashable, deque[Waiter]] = {}
+        self.virtual_time = 0.0
+        self.finish: dict[Hashable, float] = {}
+        self.wakeup: Optional[asyncio.Future] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def acquire(
+        self,
+        limiter: Limiter,
+        windows: Sequence[Window],
+        flow: Hashable = None,
+        weight: float = 1.0,
+    ) -> None:
+        cost = max(window.cost for window in windows)
+        tag = max(self.virtual_time, self.finish.get(flow, 0.0)) + cost / weight
+        self.finish[flow] = tag
+
+        # nobody is waiting, no need to queue
+        if not self.queues and await limiter.acquire(windows) is None:
+            return
+
+        waiter = Waiter(
+            tag, limiter, windows, asyncio.get_running_loop().create_future()
+        )
+        queue = self.queues.setdefault((flow, windows[0].keys), deque())
+        queue.append(waiter)
+        if len(queue) == 1:
+            # a new head may fit or go before the others
+            self.wake()
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # granted while being cancelled, hand the tokens back
+                await limiter.refund(windows)
+            raise
+
+    def wake(self) -> None:
+        if self.wakeup is not None and not self.wakeup.done():
+            self.wakeup.set_result(None)
+
+    async def sleep(self, delay: float) -> None:
+        """sleep until delay passed or a new request arrives"""
+        loop = asyncio.get_running_loop()
+        self.wakeup = loop.create_future()
+        handle = loop.call_later(max(0.0, delay), self.wake)
+        try:
+            await self.wakeup
+        finally:
+            handle.cancel()
+            self.wakeup = None
+
+    def heads(self) -> list[tuple[Hashable, Waiter]]:
+        heads = []
+        for key, queue in list(self.queues.items()):
+            while queue and queue[0].future.done():
+                queue.popleft()
+            if queue:
+                heads.append((key, queue[0]))
+            else:
+                del self.queues[key]
+        heads.sort(key=lambda head: head[1].tag)
+        return heads
+
+    async def grant_next(self) -> Optional[float]:
+        """
+        Grant the first request in tag order that fits, else returns when to retry.
+        A request whose limiter raises is failed with the error instead.
+        """
+        retry_at = math.inf
+        # windows found full in this round, with the reserve they were full for
+        full: dict[str, float] = {}
+
+        for key, waiter in self.heads():
+            if any(full.get(w.key, math.inf) <= w.reserve for w in waiter.windows):
+                continue
+
+            try:
+                window = await waiter.limiter.acquire(waiter.windows)
+                if window is not None:
+                    window_stat = await waiter.limiter.window_stats(window)
+            except Exception as e:
+                # e.g. the storage is unreachable, fail this request and go on
+                self.queues[key].popleft()
+                if not waiter.future.done():
+                    waiter.future.set_exception(e)
+                return None
+
+            if waiter.future.done():
+                # cancelled in the meantime
+                if window is None:
+                    await waiter.limiter.refund(waiter.windows)
+                continue
+
+            if window is None:
+                self.queues[key].popleft()
+                self.virtual_time = waiter.tag
+                waiter.future.set_result(None)
+                return None
+
+            full[window.key] = min(full.get(window.key, math.inf), window.reserve)
+            retry_at = min(retry_at, window_stat.reset_time)
+
+        return retry_at
+
+    async def run(self) -> None:
+        try:
+            await self.serve()
+        except BaseException as e:
+            # nobody is left to release the waiting requests
+            for queue in self.queues.values():
+                for waiter in queue:
+                    if waiter.future.done():
+                        continue
+                    if isinstance(e, Exception):
+                        waiter.future.set_exception(e)
+                    else:
+                        waiter.future.cancel()
+            self.queues.clear()
+            raise
+
+    async def serve(self) -> None:
+        while self.queues:
+            retry_at = await self.grant_next()
+            if retry_at is None:
+                # granted one, let it run before looking for the next
+                await asyncio.sleep(0)
+            else:
+                delay = retry_at - time.time()
+                await self.sleep(
+                    max(self.min_delay, delay) if delay != math.inf else 1.0
+                )
+
+            if len(self.finish) > self.max_flows:
+                self.finish = {
+                    flow: tag
+                    for flow, tag in self.finish.items()
+                    if tag > self.virtual_time
+                }
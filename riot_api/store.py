@@ -0,0 +1,124 @@
+"""
+Match and timeline bodies kept on disk, so restarted crawls do not download them again.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import httpx
+
+from riot_api.cache import CachedHeaders, compile_template
+from riot_api.types.request import Match_v5
+
+# a finished match never changes
+STORED_ENDPOINTS = [Match_v5.match_by_matchId, Match_v5.match_timeline]
+
+
+class MatchStore:
+    """
+    Bodies of match and timeline responses in a SQLite database, compressed with zlib
+    and keyed by their endpoint, e.g. "/lol/match/v5/matches/KR_1/timeline", which
+    holds the match id.
+
+    In WAL mode readers never wait for the writer, nor the writer for readers. Lookups
+    run on a pool of threads with a connection each, writes on a single thread, and
+    processes sharing the file queue their writes on its lock.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        readers: int = 4,
+        level: int = 6,
+        timeout: float = 10.0,
+    ):
+        """
+        Parameters:
+            path (str | os.PathLike): SQLite database, created if missing.
+            readers (int): Defaults to 4. Threads looking bodies up concurrently.
+            level (int): Defaults to 6. zlib compression level of the bodies.
+            timeout (float): Defaults to 10. Seconds to wait for the write lock.
+        """
+        self.path = path
+        self.level = level
+        self.timeout = timeout
+        self.patterns = [compile_template(template) for template in STORED_ENDPOINTS]
+        self.local = threading.local()
+        self.connections: list[sqlite3.Connection] = []
+        self.lock = threading.Lock()
+        # sqlite3 blocks, lookups and writes run on their own threads
+        self.read_executor = ThreadPoolExecutor(max_workers=readers)
+        self.write_executor = ThreadPoolExecutor(max_workers=1)
+
+        connection = self.connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS response "
+            "(endpoint TEXT PRIMARY KEY, body BLOB NOT NULL) WITHOUT ROWID"
+        )
+
+    def connect(self) -> sqlite3.Connection:
+        """the connection of the calling thread"""
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            # durable once the WAL is written, without syncing on every commit
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def accepts(self, endpoint: str) -> bool:
+        return any(pattern.fullmatch(endpoint) for pattern in self.patterns)
+
+    def _get(self, endpoint: str) -> Optional[bytes]:
+        row = (
+            self.connect()
+            .execute("SELECT body FROM response WHERE endpoint = ?", (endpoint,))
+            .fetchone()
+        )
+        return None if row is None else zlib.decompress(row[0])
+
+    def _put(self, endpoint: str, content: bytes) -> None:
+        body = zlib.compress(content, self.level)
+        self.connect().execute(
+            "INSERT OR REPLACE INTO response (endpoint, body) VALUES (?, ?)",
+            (endpoint, body),
+        )
+
+    async def get(
+        self, endpoint: str
+    ) -> Optional[tuple[httpx.Response, CachedHeaders]]:
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(self.read_executor, self._get, endpoint)
+        if content is None:
+            return None
+        headers = CachedHeaders({"content-type": "application/json"})
+        return httpx.Response(200, content=content, headers=headers), headers
+
+    async def put(self, endpoint: str, content: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.write_executor, self._put, endpoint, content)
+
+    def __len__(self) -> int:
+        return self.connect().execute("SELECT COUNT(*) FROM response").fetchone()[0]
+
+    def close(self) -> None:
+        self.read_executor.shutdown()
+        self.write_executor.shutdown()
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections.clear()
+        self.local = threading.local()
@@ -0,0 +1,140 @@
+"""
+Incremental match histories, listing only the matches played since the last sync.
+"""
+
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from typing import AsyncIterator, Iterable, NamedTuple, Optional
+
+from riot_api.client import Client
+from riot_api.types.request import Raw, RouteRegion
+
+# the matchlist stores timestamps since June 16th, 2021, a startTime drops older matches
+MATCHLIST_TIMESTAMPS = 1623801600
+
+
+class Watermark(NamedTuple):
+    timestamp: int
+    match_id: str
+
+
+class MatchSync:
+    """
+    Lists the match IDs of players played since their last sync, keeping for each PUUID
+    its newest match and when it ended (the watermark) in a SQLite database.
+
+    A sync asks get_match_ids_by_puuid for the matches since the watermark with
+    startTime and stops at the watermarked match, so a player with no new match costs a
+    single request. The newest new match is requested once to read its end; with a
+    MatchStore on the client, fetching the delta afterwards finds it on disk.
+
+    The watermark is saved before the delta is returned, store the delta before
+    syncing the player again.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        path: str | os.PathLike,
+        queue: Optional[int] = None,
+        type: Optional[str] = None,
+        timeout: float = 10.0,
+    ):
+        """
+        Parameters:
+            client (Client): Lists the match IDs, any Client or RateLimitClient.
+            path (str | os.PathLike): SQLite database, created if missing.
+            queue (Optional[int]): Filter of every sync, see get_match_ids_by_puuid.
+                Watermarks only hold for the filters they were synced with, use a
+                database per filter.
+            type (Optional[str]): Filter of every sync, like queue.
+            timeout (float): Defaults to 10. Seconds to wait for the write lock.
+        """
+        self.client = client
+        self.queue = queue
+        self.type = type
+        # sqlite3 blocks, a single thread owns the connection
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.connection = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS watermark (puuid TEXT PRIMARY KEY, "
+            "timestamp INTEGER NOT NULL, match_id TEXT NOT NULL) WITHOUT ROWID"
+        )
+
+    def _get(self, puuid: str) -> Optional[Watermark]:
+        row = self.connection.execute(
+            "SELECT timestamp, match_id FROM watermark WHERE puuid = ?", (puuid,)
+        ).fetchone()
+        return None if row is None else Watermark(*row)
+
+    def _put(self, puuid: str, watermark: Watermark) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO watermark (puuid, timestamp, match_id) "
+            "VALUES (?, ?, ?)",
+            (puuid, *watermark),
+        )
+
+    async def watermark(self, puuid: str) -> Optional[Watermark]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._get, puuid)
+
+    async def advance(self, puuid: str, watermark: Watermark) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._put, puuid, watermark)
+
+    async def sync(self, region: RouteRegion, puuid: str) -> list[str]:
+        """the match IDs of a player since the last sync, newest first"""
+        watermark = await self.watermark(puuid)
+        start_time = None
+        if watermark is not None and watermark.timestamp >= MATCHLIST_TIMESTAMPS:
+            # a player plays one match at a time, the next starts after this one ended
+            start_time = watermark.timestamp
+
+        match_ids = []
+        pages = self.client.iter_match_ids_by_puuid(
+            region, puuid, startTime=start_time, queue=self.queue, type=self.type
+        )
+        # closed at the watermark, so the prefetched page is cancelled
+        async with aclosing(pages):
+            async for match_id in pages:
+                if watermark is not None and match_id == watermark.match_id:
+                    # older ones were synced before
+                    break
+                match_ids.append(match_id)
+
+        if match_ids:
+            match, _ = await self.client.get_match_by_match_id(
+                region, match_ids[0], response_model=Raw.JSON
+            )
+            info = match["info"]
+            # matches before patch 11.20 have no end, their creation is earlier
+            ended = info.get("gameEndTimestamp") or info["gameCreation"]
+            await self.advance(puuid, Watermark(ended // 1000, match_ids[0]))
+        return match_ids
+
+    async def sync_many(
+        self, region: RouteRegion, puuids: Iterable[str], concurrency: int = 20
+    ) -> AsyncIterator[tuple[str, list[str] | Exception]]:
+        """
+        Sync many players, yielding (puuid, match IDs) in completion order, see
+        BaseClient.as_completed.
+        """
+        async for item in self.client.as_completed(
+            region,
+            "get_match_ids_by_puuid",
+            puuids,
+            lambda puuid: self.sync(region, puuid),
+            concurrency,
+        ):
+            yield item
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        self.connection.close()
@@ -1,4 +1,10 @@
-from riot_api.types.request.http_types import HttpMethod, HttpRequest, RateLimit
+from riot_api.types.request.http_types import (
+    HttpMethod,
+    HttpRequest,
+    PoolConfig,
+    RateLimit,
+    Raw,
+)
 from riot_api.types.request.routes import RoutePlatform, RouteRegion
 from riot_api.types.request.endpoints import (
     RankedTier,
@@ -9,7 +15,6 @@ from riot_api.types.request.endpoints import (
     League_v4,
 )
 
-
 __all__ = [
     "RankedTier",
     "RankedDivision",
@@ -22,4 +27,6 @@ __all__ = [
     "HttpMethod",
     "HttpRequest",
     "RateLimit",
+    "PoolConfig",
+    "Raw",
 ]
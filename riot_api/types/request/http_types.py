@@ -2,6 +2,7 @@ from enum import Enum
 from dataclasses import dataclass, field
 from typing import Union, Dict, Optional, Any, Type
 
+import httpx
 from pydantic import BaseModel
 
 from riot_api.types.request.routes import RoutePlatform, RouteRegion
@@ -12,12 +13,20 @@ class HttpMethod(Enum):
     POST = "POST"
 
 
+class Raw(Enum):
+    """Response models skipping validation, for the body as received or its JSON."""
+
+    BYTES = "bytes"
+    JSON = "json"
+
+
 @dataclass
 class HttpRequest:
     method: HttpMethod
     route: Union[RoutePlatform, RouteRegion]
     endpoint: str
-    response_model: type[BaseModel]
+    # None for Raw.BYTES
+    response_model: type[BaseModel] | Raw | None
     params: Dict[str, Any] = field(default_factory=dict)
     headers: Dict[str, str] = field(default_factory=dict)
     timeout: Optional[float] = 3.0
@@ -27,3 +36,24 @@ class HttpRequest:
 class RateLimit:
     max_rate: int
     time_period: int
+
+
+@dataclass
+class PoolConfig:
+    """Connection pool of a host, see httpx.Limits."""
+
+    max_connections: Optional[int] = 100
+    max_keepalive_connections: Optional[int] = 20
+    keepalive_expiry: Optional[float] = 5.0
+    http1: bool = True
+    # negotiated by TLS ALPN, or prior knowledge over plain http when http1 is off
+    http2: bool = True
+    # requests in flight per host, None leaves it to the streams the server allows
+    max_concurrent_streams: Optional[int] = None
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
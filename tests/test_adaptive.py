@@ -0,0 +1,97 @@
+import httpx
+import pytest
+import respx
+from limits.limits import RateLimitItemPerSecond
+
+from riot_api.adaptive import AIMDController
+from riot_api.exceptions import RateLimitError
+from riot_api.rate_limit_client import (
+    RateLimitClient,
+    RateLimitExceeded,
+    reset_rate_limited_client,
+)
+from riot_api.types.request.routes import RouteRegion
+
+ROUTE = RouteRegion.ASIA
+PUUID = "l51rA9uBuXO1Zokld038OVu0aRhDKA2NcE5J5Ng2LmMxzZ2gJArIa5v_UaiEmHSDdSyKsbiiawWX_w"
+ACCOUNT = {"puuid": PUUID, "gameName": "summer", "tagLine": "pado"}
+LIMIT_HEADERS = {"X-App-Rate-Limit": "100:120,50:1", "X-Method-Rate-Limit": "10:10"}
+METHOD = ("ASIA", "get_account_by_puuid")
+
+
+def rate_limit_error(limit_type: str) -> RateLimitError:
+    headers = httpx.Headers({"X-Rate-Limit-Type": limit_type})
+    return RateLimitError(429, headers, {}, "Rate limit exceeded", None)
+
+
+def test_aimd_decreases_on_overload_and_probes_back_up():
+    controller = AIMDController(decrease=0.5, increase=0.1, cooldown=60)
+    route = ("ASIA", "route")
+
+    controller.observe(METHOD, rate_limit_error("method"))
+    controller.observe(route, rate_limit_error("service"))
+    assert controller.factor(METHOD) == 1
+    assert controller.factor(route) == 1
+
+    controller.observe(METHOD, rate_limit_error("service"))
+    # requests in flight at the same time count as one signal
+    controller.observe(METHOD, httpx.ReadTimeout("timeout"))
+    assert controller.factor(METHOD) == 0.5
+
+    limits = [RateLimitItemPerSecond(20, 1), RateLimitItemPerSecond(3, 10)]
+    assert [limit.amount for limit in controller.scale(METHOD, limits)] == [10, 2]
+    assert controller.scale(route, limits) is limits
+
+    for _ in range(5):
+        controller.observe(METHOD)
+    assert controller.factor(METHOD) == 1
+    assert METHOD not in controller.factors
+
+
+def test_aimd_timeouts_lower_the_route():
+    controller = AIMDController(decrease=0.5, min_factor=0.3, cooldown=0)
+    route = ("ASIA", "route")
+
+    for _ in range(3):
+        controller.observe(route, httpx.ConnectTimeout("timeout"))
+    assert controller.factor(route) == 0.3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_client_uses_lowered_limits():
+    reset_rate_limited_client()
+    controller = AIMDController(decrease=0.5, increase=0)
+    client = RateLimitClient("api-key", controller=controller)
+    respx.route(
+        method="GET",
+        host="asia.api.riotgames.com",
+        path=f"/riot/account/v1/accounts/by-puuid/{PUUID}",
+    ).mock(
+        side_effect=[
+            httpx.Response(200, json=ACCOUNT, headers=LIMIT_HEADERS),
+            httpx.Response(
+                429,
+                json={"status": {"message": "Rate limit exceeded"}},
+                headers={**LIMIT_HEADERS, "X-Rate-Limit-Type": "service"},
+            ),
+            *(
+                httpx.Response(200, json=ACCOUNT, headers=LIMIT_HEADERS)
+                for _ in range(10)
+            ),
+        ]
+    )
+
+    await client.get_account_by_puuid(ROUTE, PUUID)
+    with pytest.raises(RateLimitError):
+        await client.get_account_by_puuid(ROUTE, PUUID)
+    assert controller.factor(METHOD) == 0.5
+
+    # 5 of the 10 method requests, one below the limit, two sent already
+    sent = 2
+    with pytest.raises(RateLimitExceeded) as limit_exceeded:
+        while True:
+            await client.get_account_by_puuid(ROUTE, PUUID)
+            sent += 1
+    assert sent == 4
+    assert limit_exceeded.value.keys == METHOD
@@ -0,0 +1,275 @@
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+import respx
+
+from riot_api.base_client import BaseClient
+from riot_api.client import Client
+from riot_api.exceptions import NotFoundError
+from riot_api.limiter import Window
+from riot_api.rate_limit_client import RateLimitClient, reset_rate_limited_client
+from riot_api.types.request import PoolConfig, Raw, RoutePlatform, RouteRegion
+
+PUUID = "l51rA9uBuXO1Zokld038OVu0aRhDKA2NcE5J5Ng2LmMxzZ2gJArIa5v_UaiEmHSDdSyKsbiiawWX_w"
+ACCOUNT = {"puuid": PUUID, "gameName": "summer", "tagLine": "pado"}
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def pools():
+    # other test modules leave pools open
+    await BaseClient.close_session()
+    yield
+    await BaseClient.close_session()
+    BaseClient.configure_pools(PoolConfig(), {})
+
+
+@pytest.mark.asyncio
+async def test_pools_per_host():
+    BaseClient.configure_pools(
+        PoolConfig(max_connections=50),
+        {RoutePlatform.KR: PoolConfig(keepalive_expiry=30, http2=False)},
+    )
+    client = Client("api-key")
+    assert not hasattr(client, "session")
+
+    asia = client.get_session(RouteRegion.ASIA)
+    kr = client.get_session(RoutePlatform.KR)
+    assert asia is client.get_session(RouteRegion.ASIA)
+    assert asia is not kr
+    assert asia._transport._pool._max_connections == 50
+    assert asia._transport._pool._http2
+    assert kr._transport._pool._keepalive_expiry == 30
+    assert not kr._transport._pool._http2
+
+    await Client.close_session()
+    assert asia.is_closed and kr.is_closed
+    assert client.get_session(RouteRegion.ASIA) is not asia
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_max_concurrent_streams():
+    BaseClient.configure_pools(
+        routes={RouteRegion.ASIA: PoolConfig(max_concurrent_streams=2)}
+    )
+    client = Client("api-key")
+    in_flight = 0
+    most_in_flight = 0
+
+    async def side_effect(request: httpx.Request):
+        nonlocal in_flight, most_in_flight
+        in_flight += 1
+        most_in_flight = max(most_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json=ACCOUNT)
+
+    respx.route(path__startswith="/riot/account/v1/accounts/by-puuid/").mock(
+        side_effect=side_effect
+    )
+
+    await asyncio.gather(
+        *(client.get_account_by_puuid(RouteRegion.ASIA, PUUID) for _ in range(10))
+    )
+    assert most_in_flight == 2
+
+    most_in_flight = 0
+    await asyncio.gather(
+        *(client.get_account_by_puuid(RouteRegion.EUROPE, PUUID) for _ in range(10))
+    )
+    assert most_in_flight == 10
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_warmup():
+    respx.head(url="https://kr.api.riotgames.com/").mock(
+        side_effect=httpx.ConnectError("unreachable")
+    )
+    warm = respx.head(path="/").mock(return_value=httpx.Response(403))
+    client = Client("api-key")
+
+    failed = await client.warmup()
+
+    assert failed == [RoutePlatform.KR]
+    hosts = [call.request.url.host for call in warm.calls]
+    assert len(hosts) == len(RouteRegion) + len(RoutePlatform) - 1
+    assert all("X-Riot-Token" not in call.request.headers for call in warm.calls)
+
+    warm.reset()
+    await client.warmup([RouteRegion.ASIA, RoutePlatform.JP1], connections=3)
+    assert warm.call_count == 6
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_warmup_interval():
+    warm = respx.head(path="/").mock(return_value=httpx.Response(403))
+    client = Client("api-key")
+
+    await client.warmup([RouteRegion.ASIA], interval=0.01)
+    await asyncio.sleep(0.05)
+    assert warm.call_count > 2
+
+    await client.close_session()
+    count = warm.call_count
+    await asyncio.sleep(0.03)
+    assert warm.call_count == count
+
+
+def mock_account(status_code: int = 200):
+    return respx.get(
+        f"https://asia.api.riotgames.com/riot/account/v1/accounts/by-puuid/{PUUID}"
+    ).mock(
+        return_value=httpx.Response(
+            status_code,
+            json=ACCOUNT,
+            headers={"X-App-Rate-Limit": "20:1", "X-Method-Rate-Limit": "50:10"},
+        )
+    )
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_raw_per_call():
+    mock_account()
+    client = Client("api-key")
+
+    body, headers = await client.get_account_by_puuid(
+        RouteRegion.ASIA, PUUID, response_model=None
+    )
+    assert body == httpx.Response(200, json=ACCOUNT).content
+    assert headers["X-App-Rate-Limit"] == "20:1"
+
+    body, _ = await client.get_account_by_puuid(
+        RouteRegion.ASIA, PUUID, response_model=Raw.JSON
+    )
+    assert body == ACCOUNT
+
+    account, _ = await client.get_account_by_puuid(RouteRegion.ASIA, PUUID)
+    assert account.puuid == PUUID
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_raw_per_client():
+    reset_rate_limited_client()
+    route = mock_account()
+    client = RateLimitClient("api-key", raw=Raw.JSON)
+
+    body, _ = await client.get_account_by_puuid(RouteRegion.ASIA, PUUID)
+    assert body == ACCOUNT
+    # still counted by the limiter
+    assert route.call_count == 1
+    assert set(client.limits) == {("ASIA", "route"), ("ASIA", "get_account_by_puuid")}
+
+    mock_account(404)
+    with pytest.raises(NotFoundError):
+        await client.get_account_by_puuid(RouteRegion.ASIA, PUUID)
+
+
+def mock_slow_account(delay: float = 0.05):
+    async def side_effect(request: httpx.Request):
+        await asyncio.sleep(delay)
+        return httpx.Response(
+            200,
+            json=ACCOUNT,
+            headers={"X-App-Rate-Limit": "20:1", "X-Method-Rate-Limit": "50:10"},
+        )
+
+    return respx.get(
+        f"https://asia.api.riotgames.com/riot/account/v1/accounts/by-puuid/{PUUID}"
+    ).mock(side_effect=side_effect)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_coalesce():
+    route = mock_slow_account()
+    client = Client("api-key", coalesce=True)
+
+    results = await asyncio.gather(
+        *(client.get_account_by_puuid(RouteRegion.ASIA, PUUID) for _ in range(9)),
+        client.get_account_by_puuid(RouteRegion.ASIA, PUUID, response_model=Raw.JSON),
+    )
+
+    assert route.call_count == 1
+    accounts = [account for account, _ in results[:-1]]
+    assert all(account.puuid == PUUID for account in accounts)
+    # every caller gets its own model
+    assert len({id(account) for account in accounts}) == 9
+    assert results[-1][0] == ACCOUNT
+    assert client.metrics.coalesced == 9
+    assert not client.flights
+
+    # only requests in flight are shared
+    await client.get_account_by_puuid(RouteRegion.ASIA, PUUID)
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_coalesce_errors_fan_out():
+    route = respx.get(
+        f"https://asia.api.riotgames.com/riot/account/v1/accounts/by-puuid/{PUUID}"
+    ).mock(return_value=httpx.Response(404, json={}))
+    client = Client("api-key", coalesce=True)
+
+    results = await asyncio.gather(
+        *(client.get_account_by_puuid(RouteRegion.ASIA, PUUID) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert route.call_count == 1
+    assert all(isinstance(result, NotFoundError) for result in results)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_coalesce_cancellation():
+    route = mock_slow_account()
+    client = Client("api-key", coalesce=True)
+
+    first = asyncio.create_task(client.get_account_by_puuid(RouteRegion.ASIA, PUUID))
+    second = asyncio.create_task(client.get_account_by_puuid(RouteRegion.ASIA, PUUID))
+    await asyncio.sleep(0.01)
+
+    # the other caller still gets the response
+    first.cancel()
+    account, _ = await second
+    assert account.puuid == PUUID
+    assert first.cancelled()
+    assert route.call_count == 1
+
+    # once every caller is cancelled, so is the upstream request
+    task = asyncio.create_task(client.get_account_by_puuid(RouteRegion.ASIA, PUUID))
+    await asyncio.sleep(0.01)
+    (flight,) = client.flights.values()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(0)
+    assert flight.task.cancelled()
+    assert not client.flights
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_coalesce_takes_tokens_once():
+    reset_rate_limited_client()
+    mock_slow_account()
+    client = RateLimitClient("api-key", coalesce=True)
+    # learn the limits first
+    await client.get_account_by_puuid(RouteRegion.ASIA, PUUID)
+
+    await asyncio.gather(
+        *(client.get_account_by_puuid(RouteRegion.ASIA, PUUID) for _ in range(10))
+    )
+
+    for keys in (("ASIA", "route"), ("ASIA", "get_account_by_puuid")):
+        (limit,) = client.limits[keys]
+        window_stat = await client.limiter.window_stats(Window(limit, keys))
+        # the probe and one coalesced request, fixed windows stay one below
+        assert window_stat.remaining == limit.amount - 1 - 2
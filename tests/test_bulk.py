@@ -0,0 +1,173 @@
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from riot_api.client import Client
+from riot_api.exceptions import NotFoundError
+from riot_api.limiter import Window
+from riot_api.rate_limit_client import RateLimitClient, reset_rate_limited_client
+from riot_api.types.dto import MatchDTO, TimelineDTO
+from riot_api.types.request import RateLimit, RouteRegion
+
+from conftest import load_test_json
+
+ROUTE = RouteRegion.ASIA
+MATCHES = r"https://asia\.api\.riotgames\.com/lol/match/v5/matches/(?P<match_id>KR_\d+)"
+HEADERS = {"X-App-Rate-Limit": "20:10", "X-Method-Rate-Limit": "20:10"}
+
+
+def mock_matches(delays: dict[str, float] = {}, missing: set[str] = set()):
+    body = load_test_json("get_match_by_match_id.json")
+    in_flight = 0
+    peak = 0
+
+    async def side_effect(request: httpx.Request, match_id: str):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(delays.get(match_id, 0.001))
+        finally:
+            in_flight -= 1
+        if match_id in missing:
+            return httpx.Response(404, headers=HEADERS)
+        return httpx.Response(200, content=body, headers=HEADERS)
+
+    route = respx.get(url__regex=MATCHES + "$").mock(side_effect=side_effect)
+    return route, lambda: peak
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_completion_order():
+    mock_matches(delays={"KR_1": 0.2, "KR_2": 0.1, "KR_3": 0.001})
+
+    results = [
+        item
+        async for item in Client("api-key").get_matches(ROUTE, ["KR_1", "KR_2", "KR_3"])
+    ]
+
+    assert [match_id for match_id, _ in results] == ["KR_3", "KR_2", "KR_1"]
+    assert all(isinstance(match, MatchDTO) for _, match in results)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_errors_per_item():
+    mock_matches(missing={"KR_2"})
+
+    results = dict(
+        [
+            item
+            async for item in Client("api-key").get_matches(
+                ROUTE, ["KR_1", "KR_2", "KR_3"]
+            )
+        ]
+    )
+
+    assert isinstance(results.pop("KR_2"), NotFoundError)
+    assert all(isinstance(match, MatchDTO) for match in results.values())
+    assert len(results) == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_timelines():
+    respx.get(url__regex=MATCHES + "/timeline$").mock(
+        return_value=httpx.Response(
+            200, content=load_test_json("get_match_timeline.json"), headers=HEADERS
+        )
+    )
+
+    results = [
+        item async for item in Client("api-key").get_timelines(ROUTE, ["KR_1", "KR_2"])
+    ]
+
+    assert sorted(match_id for match_id, _ in results) == ["KR_1", "KR_2"]
+    assert all(isinstance(timeline, TimelineDTO) for _, timeline in results)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_concurrency_bound():
+    _, peak = mock_matches(delays={f"KR_{i}": 0.01 for i in range(50)})
+
+    match_ids = (f"KR_{i}" for i in range(50))
+    results = [
+        item
+        async for item in Client("api-key").get_matches(ROUTE, match_ids, concurrency=5)
+    ]
+
+    assert len(results) == 50
+    assert peak() == 5
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_backpressure():
+    route, _ = mock_matches()
+    read = 0
+
+    def match_ids():
+        nonlocal read
+        for i in range(100):
+            read += 1
+            yield f"KR_{i}"
+
+    matches = Client("api-key").get_matches(ROUTE, match_ids(), concurrency=4)
+    await anext(matches)
+    # a consumer that stops taking results stops the requests
+    await asyncio.sleep(0.1)
+    assert read == route.call_count == 4
+
+    # each result taken lets at most one more request start
+    await anext(matches)
+    await asyncio.sleep(0.1)
+    assert read == route.call_count <= 5
+    await asyncio.sleep(0.1)
+    assert read == route.call_count <= 5
+
+    await matches.aclose()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_bounded_by_capacity():
+    reset_rate_limited_client()
+    route, _ = mock_matches()
+    keys = ("ASIA", "get_match_by_match_id")
+    client = RateLimitClient(
+        "api-key",
+        limits={("ASIA", "route"): [RateLimit(100, 10)], keys: [RateLimit(10, 1)]},
+    )
+
+    # twice the window without wait, and yet no RateLimitExceeded
+    results = [
+        item
+        async for item in client.get_matches(
+            ROUTE, (f"KR_{i}" for i in range(18)), concurrency=20
+        )
+    ]
+
+    assert all(isinstance(match, MatchDTO) for _, match in results)
+    assert route.call_count == 18
+    assert await client.capacity(ROUTE, "get_match_by_match_id") is not None
+
+
+@pytest.mark.asyncio
+async def test_capacity():
+    reset_rate_limited_client()
+    keys = ("ASIA", "get_match_by_match_id")
+    client = RateLimitClient("api-key", limits={keys: [RateLimit(10, 10)]})
+    assert await client.capacity(ROUTE, "get_account_by_puuid") is None
+
+    (limit,) = client.limits[keys]
+    for _ in range(3):
+        assert await client.limiter.acquire([Window(limit, keys)]) is None
+
+    available, reset_in = await client.capacity(ROUTE, "get_match_by_match_id")
+    # one below the limit, three taken
+    assert available == 10 - 1 - 3
+    assert 0 < reset_in <= 10
@@ -0,0 +1,263 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+import respx
+
+from riot_api.cache import CachedHeaders, ResponseCache
+from riot_api.client import Client
+from riot_api.exceptions import NotFoundError
+from riot_api.limiter import Window
+from riot_api.rate_limit_client import RateLimitClient, reset_rate_limited_client
+from riot_api.types.request import (
+    HttpMethod,
+    HttpRequest,
+    League_v4,
+    Match_v5,
+    RankedQueue,
+    Raw,
+    RoutePlatform,
+    RouteRegion,
+)
+from riot_api.types.dto import AccountDTO
+
+from conftest import load_test_json
+
+ROUTE = RouteRegion.ASIA
+PUUID = "l51rA9uBuXO1Zokld038OVu0aRhDKA2NcE5J5Ng2LmMxzZ2gJArIa5v_UaiEmHSDdSyKsbiiawWX_w"
+ACCOUNT = {"puuid": PUUID, "gameName": "summer", "tagLine": "pado"}
+HEADERS = {"X-App-Rate-Limit": "20:1", "X-Method-Rate-Limit": "50:10"}
+
+
+def request(endpoint: str) -> HttpRequest:
+    return HttpRequest(HttpMethod.GET, ROUTE, endpoint, AccountDTO)
+
+
+def response(size: int) -> httpx.Response:
+    return httpx.Response(200, content=b"x" * size)
+
+
+def test_ttl_per_endpoint():
+    cache = ResponseCache(ttls={League_v4.challenger_league_by_queue: 300})
+
+    assert cache.ttl("/lol/match/v5/matches/KR_1") == float("inf")
+    assert cache.ttl("/lol/match/v5/matches/KR_1/timeline") == float("inf")
+    assert cache.ttl(f"/riot/account/v1/accounts/by-puuid/{PUUID}") == 3600
+    assert cache.ttl("/lol/league/v4/challengerleagues/by-queue/RANKED_SOLO_5x5") == 300
+    # new matches are played all the time
+    assert cache.ttl(f"/lol/match/v5/matches/by-puuid/{PUUID}/ids") is None
+
+
+def test_lru_by_size():
+    cache = ResponseCache(max_bytes=3000)
+    first, second, third = (request(f"/lol/match/v5/matches/KR_{i}") for i in range(3))
+
+    cache.put(first, response(1000))
+    cache.put(second, response(1000))
+    assert cache.get(first) is not None
+    cache.put(third, response(1000))
+
+    # headers count as well, the least recently used goes
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+    assert cache.get(third) is not None
+    assert cache.size <= 3000
+
+    # too large to keep at all
+    cache.put(second, response(5000))
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+
+
+def test_expiry():
+    cache = ResponseCache(ttls={Match_v5.match_by_matchId: 0.01})
+    req = request("/lol/match/v5/matches/KR_1")
+
+    cache.put(req, response(10))
+    res, headers = cache.get(req)
+    assert res.content == b"x" * 10
+    assert isinstance(headers, CachedHeaders)
+
+    time.sleep(0.02)
+    assert cache.get(req) is None
+    assert cache.size == 0
+
+
+def mock_account():
+    return respx.get(
+        f"https://asia.api.riotgames.com/riot/account/v1/accounts/by-puuid/{PUUID}"
+    ).mock(return_value=httpx.Response(200, json=ACCOUNT, headers=HEADERS))
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_client_cache():
+    route = mock_account()
+    client = Client("api-key", cache=ResponseCache())
+
+    account, headers = await client.get_account_by_puuid(ROUTE, PUUID)
+    assert not isinstance(headers, CachedHeaders)
+    cached, headers = await client.get_account_by_puuid(ROUTE, PUUID)
+    assert isinstance(headers, CachedHeaders)
+    assert cached == account
+    # the bytes are cached, any response model can use them
+    body, _ = await client.get_account_by_puuid(ROUTE, PUUID, response_model=Raw.JSON)
+    assert body == ACCOUNT
+
+    assert route.call_count == 1
+    assert client.metrics.cache_hits == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_cache_hits_take_no_tokens():
+    reset_rate_limited_client()
+    route = mock_account()
+    cache = ResponseCache()
+    client = RateLimitClient("api-key", cache=cache)
+    await client.get_account_by_puuid(ROUTE, PUUID)
+    cache.clear()
+    await client.get_account_by_puuid(ROUTE, PUUID)
+
+    for _ in range(100):
+        await client.get_account_by_puuid(ROUTE, PUUID)
+
+    assert route.call_count == 2
+    for keys in (("ASIA", "route"), ("ASIA", "get_account_by_puuid")):
+        (limit,) = client.limits[keys]
+        window_stat = await client.limiter.window_stats(Window(limit, keys))
+        # the probe and one request, fixed windows stay one below
+        assert window_stat.remaining == limit.amount - 1 - 2
+
+
+def not_found() -> NotFoundError:
+    return NotFoundError(404, httpx.Headers(HEADERS), {}, "Data not found")
+
+
+def test_not_found_ttl():
+    cache = ResponseCache(
+        not_found_ttl=0.01, not_found_ttls={Match_v5.match_timeline: 300}
+    )
+    match = request("/lol/match/v5/matches/KR_1")
+    timeline = request("/lol/match/v5/matches/KR_1/timeline")
+    cache.put_not_found(match, not_found())
+    cache.put_not_found(timeline, not_found())
+
+    with pytest.raises(NotFoundError) as e:
+        cache.get(match)
+    assert isinstance(e.value.headers, CachedHeaders)
+    assert e.value.msg == "Data not found"
+
+    time.sleep(0.02)
+    assert cache.get(match) is None
+    with pytest.raises(NotFoundError):
+        cache.get(timeline)
+
+    cache = ResponseCache(not_found_ttl=0)
+    cache.put_not_found(match, not_found())
+    assert cache.get(match) is None
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_not_found_fails_fast():
+    reset_rate_limited_client()
+    route = respx.get(
+        "https://asia.api.riotgames.com/riot/account/v1/accounts/by-riot-id/nobody/0000"
+    ).mock(
+        return_value=httpx.Response(
+            404, json={"status": {"message": "Data not found"}}, headers=HEADERS
+        )
+    )
+    client = RateLimitClient("api-key", cache=ResponseCache())
+
+    for _ in range(100):
+        with pytest.raises(NotFoundError):
+            await client.get_account_by_riot_id(ROUTE, "nobody", "0000")
+
+    assert route.call_count == 1
+    assert client.metrics.not_found_hits == 99
+    for keys in (("ASIA", "route"), ("ASIA", "get_account_by_riot_id")):
+        (limit,) = client.limits[keys]
+        window_stat = await client.limiter.window_stats(Window(limit, keys))
+        # only the probe, fixed windows stay one below
+        assert window_stat.remaining == limit.amount - 1 - 1
+
+
+def league(name: str) -> dict:
+    return {**json.loads(load_test_json("get_challenger_league.json")), "name": name}
+
+
+CHALLENGER = "https://kr.api.riotgames.com/lol/league/v4/challengerleagues/by-queue/RANKED_SOLO_5x5"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stale_while_revalidate():
+    responses = iter(["first", "second"])
+
+    async def side_effect(request: httpx.Request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=league(next(responses)))
+
+    route = respx.get(CHALLENGER).mock(side_effect=side_effect)
+    cache = ResponseCache(ttls={League_v4.challenger_league_by_queue: 0.01})
+    client = Client("api-key", cache=cache)
+    queue = RankedQueue.RANKED_SOLO_5x5
+
+    ladder, headers = await client.get_challenger_league(RoutePlatform.KR, queue)
+    assert ladder.name == "first"
+    assert not isinstance(headers, CachedHeaders)
+    await asyncio.sleep(0.02)
+
+    # served without waiting for the refresh, a single one for every stale hit
+    results = await asyncio.gather(
+        *(client.get_challenger_league(RoutePlatform.KR, queue) for _ in range(10))
+    )
+    assert all(ladder.name == "first" and headers.stale for ladder, headers in results)
+    (refresh,) = cache.refreshes.values()
+    assert not refresh.done()
+    await refresh
+
+    ladder, headers = await client.get_challenger_league(RoutePlatform.KR, queue)
+    assert ladder.name == "second"
+    assert not headers.stale
+    assert route.call_count == 2
+    assert client.metrics.stale_hits == 10
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stale_error_grace():
+    respx.get(CHALLENGER).mock(
+        side_effect=[
+            httpx.Response(200, json=league("first")),
+            httpx.Response(503, json={}),
+            httpx.Response(200, json=league("second")),
+        ]
+    )
+    cache = ResponseCache(
+        ttls={League_v4.challenger_league_by_queue: 0.01},
+        stale_ttls={League_v4.challenger_league_by_queue: 0.05},
+        error_grace=0.2,
+    )
+    client = Client("api-key", cache=cache)
+    queue = RankedQueue.RANKED_SOLO_5x5
+    await client.get_challenger_league(RoutePlatform.KR, queue)
+    await asyncio.sleep(0.02)
+
+    # the refresh fails
+    await client.get_challenger_league(RoutePlatform.KR, queue)
+    await asyncio.gather(*cache.refreshes.values())
+
+    # past the stale TTL, still served within the grace
+    await asyncio.sleep(0.06)
+    ladder, headers = await client.get_challenger_league(RoutePlatform.KR, queue)
+    assert ladder.name == "first"
+    assert headers.stale
+    await asyncio.gather(*cache.refreshes.values())
+
+    ladder, _ = await client.get_challenger_league(RoutePlatform.KR, queue)
+    assert ladder.name == "second"
@@ -0,0 +1,137 @@
+import json
+import random
+
+import httpx
+import pytest
+import respx
+
+from riot_api.client import Client
+from riot_api.crawler import BloomFilter, Frontier, GraphCrawler
+from riot_api.types.request import RoutePlatform, RouteRegion
+
+from conftest import load_test_json
+
+HOST = "https://asia.api.riotgames.com"
+MATCH = json.loads(load_test_json("get_match_by_match_id.json"))
+CHALLENGER = json.loads(load_test_json("get_challenger_league.json"))
+EPOCH = 1_700_000_000
+
+
+def test_bloom_filter():
+    seen = BloomFilter(10_000, error_rate=0.01)
+    assert seen.add("KR_1")
+    assert not seen.add("KR_1")
+    assert "KR_1" in seen
+
+    for i in range(2, 10_000):
+        seen.add(f"KR_{i}")
+    false_positives = sum(f"EUW1_{i}" in seen for i in range(10_000))
+    assert false_positives < 300
+    assert len(seen.bits) < 15_000
+
+
+def test_frontier():
+    frontier = Frontier(maxsize=8)
+    for priority in [3, 1, 2, 3]:
+        frontier.push(priority, f"p{priority}")
+    assert [frontier.pop() for _ in range(4)] == [
+        (3, "p3"),
+        (3, "p3"),
+        (2, "p2"),
+        (1, "p1"),
+    ]
+
+    for priority in random.sample(range(100), 100):
+        frontier.push(priority, priority)
+    # the lowest priorities are dropped
+    assert len(frontier) <= 8
+    assert frontier.dropped == 100 - len(frontier)
+    assert frontier.pop() == (99, 99)
+
+
+class Graph:
+    """players and matches of five players each, the newer matches last"""
+
+    def __init__(self, players: int, matches: int):
+        random.seed(0)
+        self.participants = {
+            f"KR_{i}": random.sample([f"player-{j}" for j in range(players)], 5)
+            for i in range(matches)
+        }
+
+    def match_ids(self, request: httpx.Request, puuid: str):
+        match_ids = [
+            match_id
+            for match_id, participants in reversed(self.participants.items())
+            if puuid in participants
+        ]
+        return httpx.Response(200, json=match_ids[: int(request.url.params["count"])])
+
+    def match(self, request: httpx.Request, match_id: str):
+        match = json.loads(json.dumps(MATCH))
+        match["metadata"]["matchId"] = match_id
+        match["metadata"]["participants"] = self.participants[match_id]
+        match["info"]["gameEndTimestamp"] = (EPOCH + int(match_id[3:])) * 1000
+        return httpx.Response(200, json=match)
+
+    def mock(self, seeds: list[str]):
+        league = dict(
+            CHALLENGER, entries=[dict(CHALLENGER["entries"][0], puuid=p) for p in seeds]
+        )
+        respx.get(
+            "https://kr.api.riotgames.com/lol/league/v4/challengerleagues/by-queue/"
+            "RANKED_SOLO_5x5"
+        ).mock(return_value=httpx.Response(200, json=league))
+        players = respx.get(
+            url__regex=HOST + r"/lol/match/v5/matches/by-puuid/(?P<puuid>[\w-]+)/ids"
+        ).mock(side_effect=self.match_ids)
+        matches = respx.get(
+            url__regex=HOST + r"/lol/match/v5/matches/(?P<match_id>KR_\d+)$"
+        ).mock(side_effect=self.match)
+        return players, matches
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_crawl():
+    graph = Graph(players=50, matches=100)
+    players, matches = graph.mock(seeds=["player-0", "player-1"])
+    crawled = []
+
+    async def sink(region, match):
+        assert region == RouteRegion.ASIA
+        crawled.append(match.metadata.matchId)
+
+    crawler = GraphCrawler(Client("api-key"), [sink], workers=4, count=100)
+    stats = await crawler.crawl()
+
+    # the whole graph, each player and match once
+    reached = {p for participants in graph.participants.values() for p in participants}
+    assert sorted(crawled) == sorted(graph.participants)
+    assert stats.matches == matches.call_count == 100
+    assert stats.players == players.call_count == len(reached)
+    assert stats.errors == stats.dropped == 0
+    assert all(call.request.url.params["queue"] == "420" for call in players.calls)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_crawl_stops_at_max_matches():
+    graph = Graph(players=50, matches=100)
+    graph.mock(seeds=["player-0"])
+
+    async def sink(region, match):
+        pass
+
+    crawler = GraphCrawler(
+        Client("api-key"),
+        [sink],
+        platforms=[RoutePlatform.KR],
+        workers=1,
+        max_matches=10,
+        frontier_size=16,
+    )
+    stats = await crawler.crawl()
+
+    assert stats.matches == 10
+    assert len(crawler.players[RouteRegion.ASIA]) <= 16
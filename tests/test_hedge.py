@@ -0,0 +1,129 @@
+import asyncio
+import statistics
+import time
+
+import httpx
+import pytest
+import respx
+
+from riot_api.client import Client
+from riot_api.hedge import HedgePolicy, endpoint_template
+from riot_api.limiter import Window
+from riot_api.rate_limit_client import RateLimitClient, reset_rate_limited_client
+from riot_api.retry import RetryBudget
+from riot_api.types.request import RateLimit, RouteRegion
+
+ROUTE = RouteRegion.ASIA
+PUUID = "l51rA9uBuXO1Zokld038OVu0aRhDKA2NcE5J5Ng2LmMxzZ2gJArIa5v_UaiEmHSDdSyKsbiiawWX_w"
+ACCOUNT = {"puuid": PUUID, "gameName": "summer", "tagLine": "pado"}
+HEADERS = {"X-App-Rate-Limit": "20:10", "X-Method-Rate-Limit": "20:10"}
+REQUESTS = 100
+
+
+def mock_account(slow_every: int, slow: float = 0.3, fast: float = 0.002):
+    calls = 0
+
+    async def side_effect(request: httpx.Request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(slow if (calls + 1) % slow_every == 0 else fast)
+        return httpx.Response(200, json=ACCOUNT, headers=HEADERS)
+
+    return respx.get(
+        f"https://asia.api.riotgames.com/riot/account/v1/accounts/by-puuid/{PUUID}"
+    ).mock(side_effect=side_effect)
+
+
+async def p99(client: Client) -> float:
+    latencies = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        account, _ = await client.get_account_by_puuid(ROUTE, PUUID)
+        latencies.append(time.perf_counter() - start)
+        assert account.puuid == PUUID
+    return statistics.quantiles(latencies, n=100)[98]
+
+
+def test_endpoint_template():
+    assert endpoint_template("/lol/match/v5/matches/KR_1") == (
+        "/lol/match/v5/matches/{matchId}"
+    )
+    assert endpoint_template("/lol/match/v5/matches/KR_1/timeline") == (
+        "/lol/match/v5/matches/{matchId}/timeline"
+    )
+    assert endpoint_template("/unknown") == "/unknown"
+
+
+def test_delay_percentile():
+    policy = HedgePolicy(percentile=0.9, min_samples=10)
+    key = ("asia.api.riotgames.com", "/riot/account/v1/accounts/by-puuid/{puuid}")
+    for latency in range(9):
+        policy.observe(key, latency / 10)
+    assert policy.delay(key) is None
+
+    policy.observe(key, 5.0)
+    assert policy.delay(key) == 5.0
+
+    # never sooner than min_delay
+    policy = HedgePolicy(min_samples=10, min_delay=0.01)
+    for _ in range(10):
+        policy.observe(key, 0.001)
+    assert policy.delay(key) == 0.01
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_hedging_cuts_p99():
+    # one request in twenty takes 0.3 s, past the warm up
+    mock_account(slow_every=20)
+    unhedged = await p99(Client("api-key"))
+
+    route = mock_account(slow_every=20)
+    route.reset()
+    client = Client("api-key", hedge_policy=HedgePolicy(min_samples=10))
+    hedged = await p99(client)
+    await asyncio.gather(*client.stragglers)
+
+    assert unhedged >= 0.3
+    assert hedged < 0.1
+    assert client.metrics.hedge_wins >= 3
+    # within the budget of a twentieth of the requests and its initial burst
+    assert route.call_count - REQUESTS == client.metrics.hedges <= 15
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_hedges_use_spare_capacity_only():
+    reset_rate_limited_client()
+    # every other call is slow, so hedges of slow requests answer first
+    route = mock_account(slow_every=2, slow=0.05)
+    policy = HedgePolicy(
+        percentile=0.01,
+        min_samples=1,
+        reserve=0.5,
+        budget=RetryBudget(ratio=1, max_tokens=100),
+    )
+    client = RateLimitClient(
+        "api-key",
+        limits={
+            ("ASIA", "route"): [RateLimit(20, 10)],
+            ("ASIA", "get_account_by_puuid"): [RateLimit(20, 10)],
+        },
+        hedge_policy=policy,
+    )
+    policy.observe((str(ROUTE), "/riot/account/v1/accounts/by-puuid/{puuid}"), 0.001)
+
+    for _ in range(12):
+        await client.get_account_by_puuid(ROUTE, PUUID)
+
+    await asyncio.gather(*client.stragglers)
+
+    hedges = route.call_count - 12
+    # some were dropped for lack of spare tokens
+    assert 0 < hedges < client.metrics.hedges
+    for keys in (("ASIA", "route"), ("ASIA", "get_account_by_puuid")):
+        (limit,) = client.limits[keys]
+        window_stat = await client.limiter.window_stats(Window(limit, keys))
+        # hedges stopped at half of the window, the first attempts went on
+        assert window_stat.remaining == limit.amount - 1 - 12 - hedges
+        assert hedges <= limit.amount * 0.5
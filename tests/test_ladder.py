@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import respx
+
+from riot_api.client import Client
+from riot_api.exceptions import ServerError
+from riot_api.ladder import Division, LadderCrawler
+from riot_api.types.dto.league_dto import LeagueEntryDTO
+from riot_api.types.request import (
+    RankedDivision,
+    RankedQueue,
+    RankedTier,
+    RoutePlatform,
+)
+
+from conftest import load_test_json
+
+QUEUE = RankedQueue.RANKED_SOLO_5x5
+PAGE = 205
+ENTRY = json.loads(load_test_json("get_league_entry_by_tier.json"))[0]
+CHALLENGER = json.loads(load_test_json("get_challenger_league.json"))
+ENTRIES = (
+    r"https://(?P<host>\w+)\.api\.riotgames\.com/lol/league/v4/entries/"
+    r"(?P<queue>\w+)/(?P<tier>\w+)/(?P<division>\w+)"
+)
+APEX = (
+    r"https://(?P<host>\w+)\.api\.riotgames\.com/lol/league/v4/"
+    r"(?P<tier>\w+)leagues/by-queue/(?P<queue>\w+)"
+)
+
+
+def mock_ladder(sizes: dict[tuple[str, str], int], failing: set = set()):
+    """entries of each (tier, division), 30 otherwise"""
+    in_flight: dict[str, int] = {}
+    peaks: dict[str, int] = {}
+
+    async def entries(request, host, queue, tier, division):
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peaks[host] = max(peaks.get(host, 0), in_flight[host])
+        await asyncio.sleep(0.001)
+        in_flight[host] -= 1
+        if (tier, division) in failing:
+            return httpx.Response(500)
+        page = int(request.url.params["page"])
+        size = sizes.get((tier, division), 30)
+        count = max(0, min(PAGE, size - PAGE * (page - 1)))
+        return httpx.Response(200, json=[ENTRY] * count)
+
+    async def apex(request, host, tier, queue):
+        league = dict(CHALLENGER, tier=tier.upper(), queue=queue)
+        return httpx.Response(200, json=league)
+
+    route = respx.get(url__regex=ENTRIES).mock(side_effect=entries)
+    respx.get(url__regex=APEX).mock(side_effect=apex)
+    return route, peaks
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_crawl():
+    # the first division crawled shows what a full page is
+    route, _ = mock_ladder({("IRON", "I"): 2 * PAGE + 10, ("IRON", "II"): 2 * PAGE})
+    crawler = LadderCrawler(
+        Client("api-key"), platforms=[RoutePlatform.KR], queues=[QUEUE], concurrency=1
+    )
+    sunk: list[LeagueEntryDTO] = []
+
+    async def sink(platform, entries):
+        assert platform == RoutePlatform.KR
+        sunk.extend(entries)
+
+    results = await crawler.crawl(sink)
+
+    apex = len(CHALLENGER["entries"])
+    assert results[Division(RoutePlatform.KR, QUEUE, RankedTier.CHALLENGER)] == apex
+    iron_i = Division(RoutePlatform.KR, QUEUE, RankedTier.IRON, RankedDivision.I)
+    assert results[iron_i] == 2 * PAGE + 10
+    assert len(results) == 3 + 7 * 4
+    assert len(sunk) == sum(results.values())
+    assert all(isinstance(entry, LeagueEntryDTO) for entry in sunk)
+    assert {entry.tier for entry in sunk[:apex]} == {"CHALLENGER"}
+
+    # short pages end a division, a full last page costs an empty one
+    assert route.call_count == 3 + 3 + (7 * 4 - 2)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_platforms_side_by_side():
+    _, peaks = mock_ladder({})
+    platforms = [RoutePlatform.KR, RoutePlatform.EUW1, RoutePlatform.NA1]
+    crawler = LadderCrawler(Client("api-key"), platforms=platforms, concurrency=4)
+    counts: dict[RoutePlatform, int] = {}
+
+    async def sink(platform, entries):
+        counts[platform] = counts.get(platform, 0) + len(entries)
+
+    results = await crawler.crawl(sink)
+
+    assert len(results) == 3 * 2 * (3 + 7 * 4)
+    assert set(counts) == set(platforms)
+    assert len(set(counts.values())) == 1
+    # each platform bounded on its own
+    assert peaks == {"kr": 4, "euw1": 4, "na1": 4}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_errors_per_division():
+    mock_ladder({}, failing={("GOLD", "II")})
+    crawler = LadderCrawler(
+        Client("api-key"), platforms=[RoutePlatform.KR], queues=[QUEUE]
+    )
+
+    async def sink(platform, entries):
+        pass
+
+    results = await crawler.crawl(sink)
+
+    gold_ii = Division(RoutePlatform.KR, QUEUE, RankedTier.GOLD, RankedDivision.II)
+    assert isinstance(results.pop(gold_ii), ServerError)
+    assert all(isinstance(result, int) for result in results.values())
@@ -0,0 +1,227 @@
+import asyncio
+import multiprocessing
+import sqlite3
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from limits.limits import RateLimitItemPerSecond
+
+from riot_api.limiter import (
+    Limiter,
+    Window,
+    FixedWindow,
+    SlidingWindowCounter,
+    GCRA,
+    MemoryStorage,
+    SQLiteStorage,
+    RedisStorage,
+)
+
+LIMIT = RateLimitItemPerSecond(100, 60)
+WINDOWS = [
+    Window(LIMIT, ("KR", "route")),
+    Window(RateLimitItemPerSecond(1000, 60), ("KR", "get_match_by_match_id")),
+]
+
+
+@pytest_asyncio.fixture(params=["memory", "sqlite", "redis"])
+async def storage(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryStorage()
+    elif request.param == "sqlite":
+        storage = SQLiteStorage(tmp_path / "limits.db")
+        yield storage
+        storage.close()
+    else:
+        storage = RedisStorage(fakeredis.FakeAsyncRedis())
+        yield storage
+        await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_limiter_acquire_all_or_nothing(storage):
+    limiter = Limiter(storage, FixedWindow(margin=0))
+    wide = Window(RateLimitItemPerSecond(10, 1), ("KR", "route"))
+    narrow = Window(RateLimitItemPerSecond(1, 1), ("KR", "get_match_by_match_id"))
+
+    assert await limiter.acquire([wide, narrow]) is None
+    assert await limiter.acquire([wide, narrow]) == narrow
+
+    assert (await limiter.window_stats(wide)).remaining == 9
+    assert (await limiter.window_stats(narrow)).remaining == 0
+
+    await limiter.refund([wide, narrow])
+    assert (await limiter.window_stats(wide)).remaining == 10
+
+    await limiter.sync(wide, 4)
+    assert (await limiter.window_stats(wide)).remaining == 6
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "strategy", [FixedWindow(), SlidingWindowCounter(), GCRA(burst=5)]
+)
+async def test_strategies_agree_across_storages(storage, strategy):
+    """the Lua strategies of RedisStorage behave like the Python ones"""
+    window = Window(RateLimitItemPerSecond(10, 60), ("KR", "route"))
+
+    async def run(limiter: Limiter) -> list:
+        steps = []
+        while await limiter.acquire([window]) is None:
+            steps.append("acquired")
+        steps.append((await limiter.window_stats(window)).remaining)
+        await limiter.refund([window])
+        steps.append((await limiter.window_stats(window)).remaining)
+        await limiter.sync(window, 9)
+        steps.append((await limiter.window_stats(window)).remaining)
+        return steps
+
+    expected = await run(Limiter(MemoryStorage(), strategy))
+    assert await run(Limiter(storage, strategy)) == expected
+
+
+@pytest.mark.asyncio
+async def test_sqlite_reads_do_not_wait_for_writers(tmp_path):
+    path = tmp_path / "limits.db"
+    storage = SQLiteStorage(path, timeout=0.1)
+    limiter = Limiter(storage)
+    window = WINDOWS[0]
+    await limiter.acquire([window])
+
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        assert (await limiter.window_stats(window)).remaining == LIMIT.amount - 2
+        with pytest.raises(sqlite3.OperationalError):
+            await limiter.acquire([window])
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+        storage.close()
+
+
+@pytest.mark.asyncio
+async def test_limiter_acquire_cancelled_in_flight(storage):
+    limiter = Limiter(storage, FixedWindow(margin=0))
+    window = Window(RateLimitItemPerSecond(10, 60), ("KR", "route"))
+
+    task = asyncio.create_task(limiter.acquire([window]))
+    await asyncio.sleep(0)
+    cancelled = task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    # let the transaction commit and the abandoned tokens be refunded
+    await asyncio.sleep(0.1)
+
+    # memory transactions complete before the cancel arrives
+    assert cancelled != isinstance(storage, MemoryStorage)
+    expected = 10 if cancelled else 9
+    assert (await limiter.window_stats(window)).remaining == expected
+
+
+def acquire_in_process(path: str, attempts: int) -> int:
+    async def run() -> int:
+        storage = SQLiteStorage(path)
+        limiter = Limiter(storage, FixedWindow(margin=0))
+        results = await asyncio.gather(
+            *(limiter.acquire(WINDOWS) for _ in range(attempts))
+        )
+        storage.close()
+        return sum(result is None for result in results)
+
+    return asyncio.run(run())
+
+
+def test_sqlite_storage_shared_between_processes(tmp_path):
+    path = str(tmp_path / "limits.db")
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        acquired = pool.starmap(acquire_in_process, [(path, 50)] * 4)
+
+    assert sum(acquired) == LIMIT.amount
+
+
+@pytest.mark.asyncio
+async def test_redis_storage_shared_between_clients():
+    server = fakeredis.FakeServer()
+    storages = [RedisStorage(fakeredis.FakeAsyncRedis(server=server)) for _ in range(4)]
+    limiters = [Limiter(storage, FixedWindow(margin=0)) for storage in storages]
+
+    results = await asyncio.gather(
+        *(limiter.acquire(WINDOWS) for limiter in limiters for _ in range(50))
+    )
+
+    assert sum(result is None for result in results) == LIMIT.amount
+    stats = await limiters[0].window_stats(WINDOWS[1])
+    assert stats.remaining == 1000 - LIMIT.amount
+
+    for storage in storages:
+        await storage.close()
+
+
+def test_sliding_window_counter():
+    strategy = SlidingWindowCounter()
+    limit = RateLimitItemPerSecond(10, 10)
+
+    state = None
+    for _ in range(10):
+        state = strategy.acquire(state, limit, 1, 105.0)
+        assert state is not None
+    assert strategy.acquire(state, limit, 1, 105.0) is None
+
+    # no burst across the period edge, hits count for a full period after their bucket
+    assert strategy.acquire(state, limit, 1, 110.0) is None
+    assert strategy.stats(state, limit, 110.0) == (116.0, 0)
+    assert strategy.stats(state, limit, 115.9).remaining == 0
+    assert strategy.stats(state, limit, 116.0).remaining == 10
+
+    # the server saw more requests than we did
+    state = strategy.sync(strategy.refund(state, limit, 4, 105.0), limit, 8, 105.0)
+    assert strategy.stats(state, limit, 105.0).remaining == 2
+
+
+def test_sliding_window_counter_rolling_maximum():
+    strategy = SlidingWindowCounter()
+    limit = RateLimitItemPerSecond(10, 10)
+
+    # a burst right before a bucket edge, then acquire whenever possible
+    hits = []
+    state = None
+    for _ in range(10):
+        state = strategy.acquire(state, limit, 1, 109.9)
+        hits.append(109.9)
+    for step in range(1, 2000):
+        now = 109.9 + step * 0.01
+        new_state = strategy.acquire(state, limit, 1, now)
+        if new_state is not None:
+            state = new_state
+            hits.append(now)
+
+    busiest = max(sum(start <= hit < start + 10 for hit in hits) for start in hits)
+    assert busiest == limit.amount
+    # at most one bucket of the limit is left unused
+    assert len(hits) >= 2 * limit.amount
+
+
+def test_gcra():
+    strategy = GCRA()
+    limit = RateLimitItemPerSecond(10, 1)
+
+    state = strategy.acquire(None, limit, 1, 100.0)
+    assert state is not None
+    assert strategy.acquire(state, limit, 1, 100.0) is None
+    assert strategy.stats(state, limit, 100.0).reset_time == pytest.approx(100.1)
+
+    # evenly spaced requests always fit
+    for i in range(1, 100):
+        state = strategy.acquire(state, limit, 1, 100.0 + i * 0.1)
+        assert state is not None
+
+    strategy = GCRA(burst=5)
+    state = None
+    for _ in range(5):
+        state = strategy.acquire(state, limit, 1, 100.0)
+        assert state is not None
+    assert strategy.acquire(state, limit, 1, 100.0) is None
+    # never more than the limit in one period
+    assert strategy.stats(state, limit, 100.9).remaining == 5
+    assert strategy.acquire(state, limit, 6, 100.99) is None
@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import respx
+
+from riot_api.client import Client
+from riot_api.types.request import RouteRegion
+
+ROUTE = RouteRegion.ASIA
+PUUID = "l51rA9uBuXO1Zokld038OVu0aRhDKA2NcE5J5Ng2LmMxzZ2gJArIa5v_UaiEmHSDdSyKsbiiawWX_w"
+IDS = f"https://asia.api.riotgames.com/lol/match/v5/matches/by-puuid/{PUUID}/ids"
+EPOCH = 1_700_000_000
+
+
+def mock_history(matches: int, delay: float = 0.001):
+    # a match every minute, newest first like the API
+    history = [(f"KR_{i}", EPOCH + 60 * i) for i in reversed(range(matches))]
+    in_flight = 0
+    peak = 0
+
+    async def side_effect(request: httpx.Request):
+        nonlocal in_flight, peak
+        params = request.url.params
+        start_time = int(params.get("startTime", 0))
+        end_time = int(params.get("endTime", 2**31))
+        start = int(params.get("start", 0))
+        count = int(params.get("count", 20))
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            in_flight -= 1
+        match_ids = [
+            match_id
+            for match_id, timestamp in history
+            if start_time <= timestamp <= end_time
+        ][start : start + count]
+        return httpx.Response(200, content=json.dumps(match_ids))
+
+    route = respx.get(IDS).mock(side_effect=side_effect)
+    return route, [match_id for match_id, _ in history], lambda: peak
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_pages_until_short_page():
+    route, history, _ = mock_history(250)
+
+    match_ids = [
+        match_id
+        async for match_id in Client("api-key").iter_match_ids_by_puuid(ROUTE, PUUID)
+    ]
+
+    assert match_ids == history
+    assert route.call_count == 3
+    assert [call.request.url.params["start"] for call in route.calls] == [
+        "0",
+        "100",
+        "200",
+    ]
+    assert all(call.request.url.params["count"] == "100" for call in route.calls)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_full_last_page():
+    route, history, _ = mock_history(200)
+
+    match_ids = [
+        match_id
+        async for match_id in Client("api-key").iter_match_ids_by_puuid(ROUTE, PUUID)
+    ]
+
+    # the empty page ends it
+    assert match_ids == history
+    assert route.call_count == 3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_prefetches_next_page():
+    route, _, _ = mock_history(250)
+
+    match_ids = Client("api-key").iter_match_ids_by_puuid(ROUTE, PUUID)
+    assert await anext(match_ids) == "KR_249"
+    await asyncio.sleep(0.05)
+
+    # requested while the first page is consumed, and no further
+    assert route.call_count == 2
+    await match_ids.aclose()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_windows():
+    route, history, peak = mock_history(1000, delay=0.01)
+
+    match_ids = [
+        match_id
+        async for match_id in Client("api-key").iter_match_ids_by_puuid(
+            ROUTE, PUUID, startTime=EPOCH, endTime=EPOCH + 60 * 1000, windows=4
+        )
+    ]
+
+    # in order, the bounds shared by two windows do not repeat their matches
+    assert match_ids == history
+    assert peak() >= 4
+    # each window ends on its own short page
+    assert route.call_count == 4 * 3
@@ -0,0 +1,88 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from riot_api.limiter import Window
+from riot_api.profile import LimitProfile
+from riot_api.rate_limit_client import RateLimitClient, reset_rate_limited_client
+from riot_api.types.request import RateLimit
+from riot_api.types.request.routes import RouteRegion
+
+ROUTE = RouteRegion.ASIA
+PUUID = "l51rA9uBuXO1Zokld038OVu0aRhDKA2NcE5J5Ng2LmMxzZ2gJArIa5v_UaiEmHSDdSyKsbiiawWX_w"
+ACCOUNT = {"puuid": PUUID, "gameName": "summer", "tagLine": "pado"}
+APP = ("ASIA", "route")
+METHOD = ("ASIA", "get_account_by_puuid")
+LIMITS = {
+    APP: [RateLimit(20, 1), RateLimit(100, 120)],
+    METHOD: [RateLimit(50, 10)],
+}
+
+
+def mock_account(app_limit: str = "20:1,100:120"):
+    return respx.route(
+        method="GET",
+        host="asia.api.riotgames.com",
+        path=f"/riot/account/v1/accounts/by-puuid/{PUUID}",
+    ).mock(
+        return_value=httpx.Response(
+            200,
+            json=ACCOUNT,
+            headers={"X-App-Rate-Limit": app_limit, "X-Method-Rate-Limit": "50:10"},
+        )
+    )
+
+
+def test_profiles_per_key_type(tmp_path):
+    path = tmp_path / "limits.json"
+    production = LimitProfile(path, "production")
+    development = LimitProfile(path, "development")
+    assert production.load() == {}
+
+    production.save(LIMITS)
+    development.save({APP: [RateLimit(20, 1)]})
+    production.save({METHOD: [RateLimit(2000, 10)]})
+
+    assert production.load() == {**LIMITS, METHOD: [RateLimit(2000, 10)]}
+    assert development.load() == {APP: [RateLimit(20, 1)]}
+    assert set(json.loads(path.read_text())) == {"production", "development"}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_warm_start_skips_discovery(tmp_path):
+    reset_rate_limited_client()
+    profile = LimitProfile(tmp_path / "limits.json")
+    profile.save(LIMITS)
+    client = RateLimitClient("api-key", profile=profile)
+    route = mock_account()
+
+    await client.get_account_by_puuid(ROUTE, PUUID)
+
+    # the first request already took tokens, no probe was needed
+    assert route.call_count == 1
+    for keys in (APP, METHOD):
+        for limit in client.limits[keys]:
+            window_stat = await client.limiter.window_stats(Window(limit, keys))
+            # fixed windows stay one request below the limit
+            assert window_stat.remaining == limit.amount - 1 - 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_learned_limits_refresh_the_profile(tmp_path):
+    reset_rate_limited_client()
+    path = tmp_path / "limits.json"
+    profile = LimitProfile(path, "production")
+    client = RateLimitClient("api-key", limits=LIMITS, profile=profile)
+    mock_account("500:10,30000:600")
+
+    await client.get_account_by_puuid(ROUTE, PUUID)
+    modified = path.stat().st_mtime_ns
+    await client.get_account_by_puuid(ROUTE, PUUID)
+
+    assert profile.load() == {APP: [RateLimit(500, 10), RateLimit(30000, 600)]}
+    # unchanged limits are not written again
+    assert path.stat().st_mtime_ns == modified
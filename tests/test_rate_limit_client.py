@@ -1,3 +1,5 @@
+import asyncio
+
 import httpx
 import pytest
 import pytest_asyncio
@@ -9,11 +11,16 @@ from limits.limits import RateLimitItem, RateLimitItemPerSecond
 from limits.aio.storage import MemoryStorage
 
 import riot_api
+from riot_api.limiter import Limiter, GCRA, Window
+from riot_api.scheduler import DEFAULT_WEIGHTS, Priority
+from riot_api.exceptions import NotFoundError
 from riot_api.rate_limit_client import (
     reset_rate_limited_client,
-    LimiterWithDecr,
     RateLimitExceeded,
     RateLimitClient,
+    get_limit_info_route,
+    get_count_info_route,
+    get_count_info_endpoint,
 )
 from riot_api.types.request.routes import RouteRegion
 
@@ -26,7 +33,7 @@ class DummyModel(BaseModel):
     value: int
 
 
-def mock_get_account_by_puuid():
+def mock_get_account_by_puuid(app_limit: str = "100:120,2:1"):
     route = respx.route(
         method="GET",
         host="asia.api.riotgames.com",
@@ -36,7 +43,7 @@ def mock_get_account_by_puuid():
             200,
             json={"value": 123},
             headers={
-                "X-App-Rate-Limit": "100:120,2:1",
+                "X-App-Rate-Limit": app_limit,
                 "X-Method-Rate-Limit": "50:10",
             },
         )
@@ -61,11 +68,13 @@ async def test_limit_info_extraction(client: RateLimitClient):
     res, headers = await client.get_account_by_puuid(ROUTE, PUUID, DummyModel)
 
     expected_limits = {
-        ("ASIA", "route_long"): RateLimitItemPerSecond(100 - 1, 120, "RIOT_API"),
-        ("ASIA", "route_short"): RateLimitItemPerSecond(2 - 1, 1, "RIOT_API"),
-        ("ASIA", "get_account_by_puuid"): RateLimitItemPerSecond(
-            50 - 1, 10, "RIOT_API"
-        ),
+        ("ASIA", "route"): [
+            RateLimitItemPerSecond(100, 120, "RIOT_API"),
+            RateLimitItemPerSecond(2, 1, "RIOT_API"),
+        ],
+        ("ASIA", "get_account_by_puuid"): [
+            RateLimitItemPerSecond(50, 10, "RIOT_API"),
+        ],
     }
     assert client.limits == expected_limits
 
@@ -84,22 +93,284 @@ async def test_rate_limit_exceeded(client: RateLimitClient):
     expected_reset_time = time.time() + expected_retry_after
 
     window = limit_exceeded.value.window_stat
-    assert limit_exceeded.value.keys == ("ASIA", "route_short")
+    assert limit_exceeded.value.keys == ("ASIA", "route")
+    assert limit_exceeded.value.limit == RateLimitItemPerSecond(2, 1, "RIOT_API")
     assert limit_exceeded.value.retry_after == pytest.approx(expected_retry_after, 1e-2)
     assert window.remaining == 0
     assert window.reset_time == pytest.approx(expected_reset_time, 1e-2)
 
-    keys = ("ASIA", "route_long")
-    limits_long = client.limits.get(keys)
-    assert limits_long is not None
-    window_long = await client.limiter.get_window_stats(limits_long, *keys)
-    assert window_long.remaining == limits_long.amount - 1
+    keys = ("ASIA", "route")
+    limits_long = client.limits[keys][0]
+    window_long = await client.limiter.window_stats(Window(limits_long, keys))
+    # fixed windows stay one request below the limit
+    assert window_long.remaining == limits_long.amount - 1 - 1
+
+    keys = ("ASIA", "get_account_by_puuid")
+    limits_endpoint = client.limits[keys][0]
+    window_endpoint = await client.limiter.window_stats(Window(limits_endpoint, keys))
+    assert window_endpoint.remaining == limits_endpoint.amount - 1 - 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_wait_mode_queues_requests():
+    client = RateLimitClient("api-key", wait=True)
+    route = mock_get_account_by_puuid("100:120,3:1")
+    await client.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+
+    order = []
+
+    async def call(i: int):
+        await client.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+        order.append(i)
+
+    start = time.monotonic()
+    await asyncio.gather(*(call(i) for i in range(3)))
+    elapsed = time.monotonic() - start
+
+    # 2 requests per second, the probe used one slot of the first window
+    assert route.call_count == 4
+    assert order == [0, 1, 2]
+    assert elapsed == pytest.approx(1, abs=0.2)
+
+    keys = ("ASIA", "route")
+    limit_short = client.limits[keys][1]
+    window_short = await client.limiter.window_stats(Window(limit_short, keys))
+    assert window_short.remaining == 0
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_discovery_per_key(client: RateLimitClient):
+    events = []
+
+    async def side_effect(request: httpx.Request):
+        host = request.url.host
+        events.append(("start", host))
+        await asyncio.sleep(0.05)
+        events.append(("end", host))
+        return httpx.Response(
+            200,
+            json={"value": 123},
+            headers={
+                "X-App-Rate-Limit": "100:120,20:1",
+                "X-Method-Rate-Limit": "50:10",
+            },
+        )
+
+    respx.route(
+        method="GET", path__startswith="/riot/account/v1/accounts/by-puuid/"
+    ).mock(side_effect=side_effect)
+
+    routes = [RouteRegion.ASIA, RouteRegion.EUROPE]
+    await asyncio.gather(
+        *(
+            client.get_account_by_puuid(route, PUUID, DummyModel)
+            for route in routes
+            for _ in range(3)
+        )
+    )
+
+    # both routes probe in parallel, one probe in flight per route
+    assert set(events[:2]) == {
+        ("start", RouteRegion.ASIA.value),
+        ("start", RouteRegion.EUROPE.value),
+    }
+    for route in routes:
+        host_events = [event for event, host in events if host == route.value]
+        assert host_events[:3] == ["start", "end", "start"]
+    assert len(events) == 12
+    for route in routes:
+        assert (route.name, "get_account_by_puuid") in client.limits
+        assert (route.name, "route") in client.limits
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_discovery_from_error_response(client: RateLimitClient):
+    route = respx.route(
+        method="GET",
+        host="asia.api.riotgames.com",
+        path=f"/riot/account/v1/accounts/by-puuid/{PUUID}",
+    ).mock(
+        return_value=httpx.Response(
+            404,
+            json={"status": {"message": "Data not found", "status_code": 404}},
+            headers={
+                "X-App-Rate-Limit": "100:120,20:1",
+                "X-Method-Rate-Limit": "50:10",
+            },
+        )
+    )
+
+    results = await asyncio.gather(
+        *(client.get_account_by_puuid(ROUTE, PUUID, DummyModel) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, NotFoundError) for r in results)
+    assert route.call_count == 3
+    assert client.limits[("ASIA", "get_account_by_puuid")] == [
+        RateLimitItemPerSecond(50, 10, "RIOT_API")
+    ]
+
+
+def test_parse_all_windows():
+    headers = httpx.Headers(
+        {
+            "X-App-Rate-Limit": "20:1,100:120,5000:3600",
+            "X-App-Rate-Limit-Count": "3:1,7:120,9:3600",
+        }
+    )
+
+    assert get_limit_info_route(headers) == [
+        RateLimitItemPerSecond(20, 1, "RIOT_API"),
+        RateLimitItemPerSecond(100, 120, "RIOT_API"),
+        RateLimitItemPerSecond(5000, 3600, "RIOT_API"),
+    ]
+    assert get_count_info_route(headers) == {1: 3, 120: 7, 3600: 9}
+    assert get_count_info_endpoint(headers) == {}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_sync_with_count_headers(client: RateLimitClient):
+    respx.route(
+        method="GET",
+        host="asia.api.riotgames.com",
+        path=f"/riot/account/v1/accounts/by-puuid/{PUUID}",
+    ).mock(
+        return_value=httpx.Response(
+            200,
+            json={"value": 123},
+            headers={
+                "X-App-Rate-Limit": "20:1,100:120",
+                "X-App-Rate-Limit-Count": "1:1,40:120",
+                "X-Method-Rate-Limit": "50:10",
+                "X-Method-Rate-Limit-Count": "12:10",
+            },
+        )
+    )
+    await client.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+    await client.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+
+    # other clients used the key, local counters are raised to the server's counts
+    # and never lowered (the mock keeps reporting the counts of the first request)
+    keys = ("ASIA", "route")
+    limit_short, limit_long = client.limits[keys]
+    window_short = await client.limiter.window_stats(Window(limit_short, keys))
+    window_long = await client.limiter.window_stats(Window(limit_long, keys))
+    assert window_short.remaining == limit_short.amount - 1 - 2
+    assert window_long.remaining == limit_long.amount - 1 - 41
 
     keys = ("ASIA", "get_account_by_puuid")
-    limits_endpoint = client.limits.get(keys)
-    assert limits_endpoint is not None
-    window_endpoint = await client.limiter.get_window_stats(limits_endpoint, *keys)
-    assert window_endpoint.remaining == limits_endpoint.amount - 1
+    limit_endpoint = client.limits[keys][0]
+    window_endpoint = await client.limiter.window_stats(Window(limit_endpoint, keys))
+    assert window_endpoint.remaining == limit_endpoint.amount - 1 - 13
+
+
+async def remaining(client: RateLimitClient) -> list[int]:
+    stats = []
+    for keys in [("ASIA", "route"), ("ASIA", "get_account_by_puuid")]:
+        for limit in client.limits[keys]:
+            window_stat = await client.limiter.window_stats(Window(limit, keys))
+            # used requests, fixed windows stay one request below the limit
+            stats.append(limit.amount - 1 - window_stat.remaining)
+    return stats
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_method_window_rejection_keeps_route_windows(client: RateLimitClient):
+    respx.route(
+        method="GET",
+        host="asia.api.riotgames.com",
+        path=f"/riot/account/v1/accounts/by-puuid/{PUUID}",
+    ).mock(
+        return_value=httpx.Response(
+            200,
+            json={"value": 123},
+            headers={"X-App-Rate-Limit": "100:120,20:1", "X-Method-Rate-Limit": "2:10"},
+        )
+    )
+    await client.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+
+    with pytest.raises(RateLimitExceeded) as limit_exceeded:
+        await client.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+
+    assert limit_exceeded.value.keys == ("ASIA", "get_account_by_puuid")
+    assert await remaining(client) == [1, 1, 1]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_refund_on_transport_error_and_cancellation(client: RateLimitClient):
+    gate = asyncio.Event()
+    responses = iter(["ok", "error", "hang"])
+
+    async def side_effect(request: httpx.Request):
+        response = next(responses)
+        if response == "error":
+            raise httpx.ConnectError("connection refused", request=request)
+        if response == "hang":
+            await gate.wait()
+        return httpx.Response(
+            200,
+            json={"value": 123},
+            headers={
+                "X-App-Rate-Limit": "100:120,20:1",
+                "X-Method-Rate-Limit": "50:10",
+            },
+        )
+
+    respx.route(
+        method="GET",
+        host="asia.api.riotgames.com",
+        path=f"/riot/account/v1/accounts/by-puuid/{PUUID}",
+    ).mock(side_effect=side_effect)
+    await client.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+
+    with pytest.raises(httpx.ConnectError):
+        await client.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+    assert await remaining(client) == [1, 1, 1]
+
+    task = asyncio.create_task(client.get_account_by_puuid(ROUTE, PUUID, DummyModel))
+    await asyncio.sleep(0.01)
+    assert await remaining(client) == [2, 2, 2]
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert await remaining(client) == [1, 1, 1]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_gcra_spreads_requests():
+    client = RateLimitClient("api-key", wait=True, limiter=Limiter(strategy=GCRA()))
+    sent = []
+
+    def side_effect(request: httpx.Request):
+        sent.append(time.monotonic())
+        return httpx.Response(
+            200,
+            json={"value": 123},
+            headers={"X-App-Rate-Limit": "10:1", "X-Method-Rate-Limit": "100:10"},
+        )
+
+    respx.route(
+        method="GET",
+        host="asia.api.riotgames.com",
+        path=f"/riot/account/v1/accounts/by-puuid/{PUUID}",
+    ).mock(side_effect=side_effect)
+    await client.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+    await asyncio.gather(
+        *(client.get_account_by_puuid(ROUTE, PUUID, DummyModel) for _ in range(5))
+    )
+
+    # the full limit of 10 per second, one request every 0.1s
+    gaps = [b - a for a, b in zip(sent[1:], sent[2:])]
+    assert gaps == pytest.approx([0.1] * 4, abs=0.03)
 
 
 # @pytest.mark.asyncio
@@ -136,3 +407,53 @@ async def test_rate_limit_exceeded(client: RateLimitClient):
 #     # Second call should exceed
 #     with pytest.raises(RateLimitExceeded):
 #         await rate_limit_client.test_method(route)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_interactive_client_goes_before_batch_clients():
+    batch = RateLimitClient("api-key", wait=True, priority=Priority.BATCH)
+    interactive = RateLimitClient("api-key", wait=True, priority=Priority.INTERACTIVE)
+    mock_get_account_by_puuid("100:120,3:1")
+    await batch.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+
+    order = []
+
+    async def call(client: RateLimitClient, name: str):
+        await client.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+        order.append(name)
+
+    tasks = [asyncio.create_task(call(batch, f"batch{i}")) for i in range(3)]
+    await asyncio.sleep(0.05)
+    await call(interactive, "interactive")
+    await asyncio.gather(*tasks)
+
+    # 2 requests per second, the probe used one slot of the first window
+    assert order == ["batch0", "interactive", "batch1", "batch2"]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_limiter_reserve_applies_to_every_other_client():
+    limiter = Limiter(reserve=0.5)
+    normal = RateLimitClient("api-key", limiter=limiter)
+    interactive = RateLimitClient(
+        "api-key", limiter=limiter, priority=Priority.INTERACTIVE
+    )
+    mock_get_account_by_puuid("100:120,5:1")
+    await normal.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+
+    # 4 usable, 2.5 of them reserved
+    with pytest.raises(RateLimitExceeded):
+        await normal.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+    await interactive.get_account_by_puuid(ROUTE, PUUID, DummyModel)
+
+
+def test_schedulers_and_weights_are_not_shared_by_accident():
+    shared = RateLimitClient("api-key")
+    other = RateLimitClient("api-key", limiter=Limiter())
+    assert shared.scheduler("ASIA") is RateLimitClient("api-key").scheduler("ASIA")
+    assert shared.scheduler("ASIA") is not other.scheduler("ASIA")
+
+    assert RateLimitClient.weights == DEFAULT_WEIGHTS
+    assert RateLimitClient.weights is not DEFAULT_WEIGHTS
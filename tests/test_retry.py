@@ -0,0 +1,165 @@
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+import respx
+
+from riot_api.client import Client
+from riot_api.exceptions import NotFoundError, RateLimitError, ServerError
+from riot_api.limiter import Window
+from riot_api.rate_limit_client import RateLimitClient, reset_rate_limited_client
+from riot_api.retry import RetryBudget, RetryPolicy
+from riot_api.types.request.routes import RouteRegion
+
+ROUTE = RouteRegion.ASIA
+PUUID = "l51rA9uBuXO1Zokld038OVu0aRhDKA2NcE5J5Ng2LmMxzZ2gJArIa5v_UaiEmHSDdSyKsbiiawWX_w"
+ACCOUNT = {"puuid": PUUID, "gameName": "summer", "tagLine": "pado"}
+LIMIT_HEADERS = {"X-App-Rate-Limit": "100:120,20:1", "X-Method-Rate-Limit": "50:10"}
+
+
+def mock_account(*responses):
+    return respx.route(
+        method="GET",
+        host="asia.api.riotgames.com",
+        path=f"/riot/account/v1/accounts/by-puuid/{PUUID}",
+    ).mock(side_effect=list(responses))
+
+
+def ok() -> httpx.Response:
+    return httpx.Response(200, json=ACCOUNT, headers=LIMIT_HEADERS)
+
+
+def error(status_code: int, headers: dict[str, str] = {}) -> httpx.Response:
+    return httpx.Response(
+        status_code,
+        json={"status": {"message": "error", "status_code": status_code}},
+        headers={**LIMIT_HEADERS, **headers},
+    )
+
+
+@pytest_asyncio.fixture
+async def client():
+    client = Client("api-key", RetryPolicy(backoff=0.01))
+    yield client
+
+    await client.close_session()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit_type", ["application", "method"])
+@respx.mock
+async def test_rate_limit_waits_retry_after(client: Client, limit_type: str):
+    route = mock_account(
+        error(429, {"Retry-After": "1", "X-Rate-Limit-Type": limit_type}), ok()
+    )
+
+    start = time.monotonic()
+    await client.get_account_by_puuid(ROUTE, PUUID)
+    elapsed = time.monotonic() - start
+
+    assert route.call_count == 2
+    assert elapsed == pytest.approx(1, abs=0.1)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_service_rate_limit_without_retry_after_backs_off(client: Client):
+    route = mock_account(error(429, {"X-Rate-Limit-Type": "service"}), ok())
+
+    start = time.monotonic()
+    await client.get_account_by_puuid(ROUTE, PUUID)
+    elapsed = time.monotonic() - start
+
+    assert route.call_count == 2
+    assert elapsed < 0.1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_long_retry_after_is_raised(client: Client):
+    route = mock_account(
+        error(429, {"Retry-After": "120", "X-Rate-Limit-Type": "application"}), ok()
+    )
+
+    with pytest.raises(RateLimitError) as e:
+        await client.get_account_by_puuid(ROUTE, PUUID)
+
+    assert e.value.retry_after == 120
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "failure, error_type",
+    [
+        (lambda: error(503), ServerError),
+        (lambda: httpx.ReadTimeout("timeout"), httpx.ReadTimeout),
+    ],
+)
+@respx.mock
+async def test_server_errors_and_timeouts_give_up_after_max_attempts(
+    client: Client, failure, error_type: type[Exception]
+):
+    route = mock_account(*(failure() for _ in range(4)))
+
+    with pytest.raises(error_type):
+        await client.get_account_by_puuid(ROUTE, PUUID)
+    assert route.call_count == 3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_not_found_is_not_retried(client: Client):
+    route = mock_account(error(404), ok())
+
+    with pytest.raises(NotFoundError):
+        await client.get_account_by_puuid(ROUTE, PUUID)
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_budget_stops_retries():
+    budget = RetryBudget(ratio=0, min_per_second=0, max_tokens=1)
+    client = Client("api-key", RetryPolicy(backoff=0.01, budget=budget))
+    route = mock_account(*(error(503) for _ in range(4)))
+
+    for _ in range(2):
+        with pytest.raises(ServerError):
+            await client.get_account_by_puuid(ROUTE, PUUID)
+
+    # the only token went to the first request
+    assert route.call_count == 3
+
+
+def test_policies_do_not_share_budgets():
+    client = Client("api-key")
+    assert client.retry_policy is None
+
+    first = RetryPolicy(budget=RetryBudget(min_per_second=0, max_tokens=1))
+    second = RetryPolicy(budget=RetryBudget(min_per_second=0, max_tokens=1))
+    timeout = httpx.ReadTimeout("timeout")
+    assert first.delay(1, timeout) is not None
+    assert first.delay(1, timeout) is None
+    assert second.delay(1, timeout) is not None
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_each_attempt_takes_window_tokens():
+    reset_rate_limited_client()
+    client = RateLimitClient("api-key", retry_policy=RetryPolicy(backoff=0.01))
+    route = mock_account(ok(), error(503), ok())
+
+    await client.get_account_by_puuid(ROUTE, PUUID)
+    await client.get_account_by_puuid(ROUTE, PUUID)
+    assert route.call_count == 3
+
+    used = []
+    for keys in [("ASIA", "route"), ("ASIA", "get_account_by_puuid")]:
+        for limit in client.limits[keys]:
+            window_stat = await client.limiter.window_stats(Window(limit, keys))
+            # fixed windows stay one request below the limit
+            used.append(limit.amount - 1 - window_stat.remaining)
+    assert used == [3, 3, 3]
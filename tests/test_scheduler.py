@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from limits.limits import RateLimitItemPerSecond
+
+from riot_api.limiter import Limiter, Storage, Window
+from riot_api.scheduler import DEFAULT_WEIGHTS, Priority, Scheduler
+
+# fixed windows keep one request below the limit
+LIMIT = RateLimitItemPerSecond(11, 1)
+ROUTE = Window(LIMIT, ("KR", "route"))
+
+
+async def fill(limiter: Limiter, windows: list[Window]):
+    while await limiter.acquire(windows) is None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_interactive_goes_before_batch_backlog():
+    limiter = Limiter()
+    scheduler = Scheduler()
+    await fill(limiter, [ROUTE])
+    order = []
+
+    async def call(name: str, priority: Priority):
+        await scheduler.acquire(
+            limiter, [ROUTE], (priority, None), DEFAULT_WEIGHTS[priority]
+        )
+        order.append(name)
+
+    batch = [asyncio.create_task(call(f"batch{i}", Priority.BATCH)) for i in range(5)]
+    await asyncio.sleep(0)
+    await call("interactive", Priority.INTERACTIVE)
+    await asyncio.gather(*batch)
+
+    assert order == ["interactive", *(f"batch{i}" for i in range(5))]
+
+
+@pytest.mark.asyncio
+async def test_tenants_share_turns():
+    limiter = Limiter()
+    scheduler = Scheduler()
+    await fill(limiter, [ROUTE])
+    order = []
+
+    async def call(tenant: str):
+        await scheduler.acquire(limiter, [ROUTE], (Priority.BATCH, tenant))
+        order.append(tenant)
+
+    tasks = [asyncio.create_task(call("a")) for _ in range(6)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(call("b")) for _ in range(3)]
+    await asyncio.gather(*tasks)
+
+    assert order == ["a", "b", "a", "b", "a", "b", "a", "a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_reserve_leaves_room_for_interactive():
+    limiter = Limiter()
+    scheduler = Scheduler()
+    batch_window = ROUTE._replace(reserve=0.5)
+
+    async def call(windows: list[Window], priority: Priority):
+        await scheduler.acquire(
+            limiter, windows, (priority, None), DEFAULT_WEIGHTS[priority]
+        )
+
+    batch = [
+        asyncio.create_task(call([batch_window], Priority.BATCH)) for _ in range(10)
+    ]
+    await asyncio.sleep(0.1)
+    # 10 usable, 5.5 of them reserved
+    assert sum(task.done() for task in batch) == 4
+
+    interactive = [call([ROUTE], Priority.INTERACTIVE) for _ in range(6)]
+    await asyncio.wait_for(asyncio.gather(*interactive), 0.5)
+    assert sum(task.done() for task in batch) == 4
+
+    for task in batch:
+        task.cancel()
+    await asyncio.gather(*batch, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_full_method_window_does_not_block_route():
+    limiter = Limiter()
+    scheduler = Scheduler()
+    full_method = [Window(RateLimitItemPerSecond(2, 10), ("KR", "full")), ROUTE]
+    other_method = [Window(RateLimitItemPerSecond(50, 10), ("KR", "other")), ROUTE]
+    await fill(limiter, full_method[:1])
+
+    blocked = asyncio.create_task(scheduler.acquire(limiter, full_method))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(scheduler.acquire(limiter, other_method), 0.5)
+    assert not blocked.done()
+
+    blocked.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await blocked
+
+
+class BrokenStorage(Storage):
+    async def execute(self, strategy, op, windows, count=0):
+        raise ConnectionError("storage unreachable")
+
+
+@pytest.mark.asyncio
+async def test_storage_errors_fail_waiting_requests():
+    limiter = Limiter()
+    scheduler = Scheduler()
+    await fill(limiter, [ROUTE])
+
+    waiting = asyncio.create_task(scheduler.acquire(limiter, [ROUTE]))
+    await asyncio.sleep(0.05)
+    storage, limiter.storage = limiter.storage, BrokenStorage()
+    scheduler.wake()
+
+    with pytest.raises(ConnectionError):
+        await asyncio.wait_for(waiting, 0.5)
+
+    # the scheduler keeps serving once the storage is back
+    limiter.storage = storage
+    await asyncio.wait_for(scheduler.acquire(limiter, [ROUTE]), 1.5)
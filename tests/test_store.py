@@ -0,0 +1,132 @@
+import sqlite3
+import threading
+import zlib
+
+import httpx
+import pytest
+import respx
+
+from riot_api.client import Client
+from riot_api.rate_limit_client import RateLimitClient, reset_rate_limited_client
+from riot_api.store import MatchStore
+from riot_api.types.dto import MatchDTO
+from riot_api.types.request import Raw, RouteRegion
+
+from conftest import load_test_json
+
+ROUTE = RouteRegion.ASIA
+MATCH_ID = "KR_7707189479"
+MATCH = f"/lol/match/v5/matches/{MATCH_ID}"
+TIMELINE = f"/lol/match/v5/matches/{MATCH_ID}/timeline"
+HEADERS = {"X-App-Rate-Limit": "20:1", "X-Method-Rate-Limit": "50:10"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MatchStore(tmp_path / "matches.db")
+    yield store
+    store.close()
+
+
+def test_accepts():
+    store = MatchStore(":memory:")
+    assert store.accepts(MATCH)
+    assert store.accepts(TIMELINE)
+    assert not store.accepts(f"/lol/match/v5/matches/by-puuid/{MATCH_ID}/ids")
+    assert not store.accepts("/riot/account/v1/accounts/by-puuid/puuid")
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_persists_compressed(tmp_path):
+    path = tmp_path / "matches.db"
+    body = load_test_json("get_match_timeline.json").encode()
+    store = MatchStore(path)
+    assert await store.get(TIMELINE) is None
+
+    await store.put(TIMELINE, body)
+    store.close()
+
+    store = MatchStore(path)
+    res, _ = await store.get(TIMELINE)
+    assert res.content == body
+    assert len(store) == 1
+    store.close()
+
+    (stored,) = sqlite3.connect(path).execute("SELECT body FROM response").fetchone()
+    assert len(stored) < len(body) / 5
+    assert zlib.decompress(stored) == body
+
+
+@pytest.mark.asyncio
+async def test_reads_during_writes(store):
+    body = b'{"metadata": {}}'
+    await store.put(MATCH, body)
+    stop = threading.Event()
+
+    def write():
+        # another connection, as another process would
+        writer = sqlite3.connect(store.path, isolation_level=None)
+        i = 0
+        while not stop.is_set():
+            writer.execute(
+                "INSERT OR REPLACE INTO response (endpoint, body) VALUES (?, ?)",
+                (f"/lol/match/v5/matches/KR_{i}", zlib.compress(body)),
+            )
+            i += 1
+        writer.close()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        for _ in range(200):
+            res, _ = await store.get(MATCH)
+            assert res.content == body
+    finally:
+        stop.set()
+        thread.join()
+
+
+def mock_match():
+    return respx.get(f"https://asia.api.riotgames.com{MATCH}").mock(
+        return_value=httpx.Response(
+            200, content=load_test_json("get_match_by_match_id.json"), headers=HEADERS
+        )
+    )
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_client_store(store):
+    route = mock_match()
+    match, _ = await Client("api-key", store=store).get_match_by_match_id(
+        ROUTE, MATCH_ID
+    )
+
+    # a restarted client finds it on disk
+    client = Client("api-key", store=store)
+    stored, _ = await client.get_match_by_match_id(ROUTE, MATCH_ID)
+    body, _ = await client.get_match_by_match_id(
+        ROUTE, MATCH_ID, response_model=Raw.BYTES
+    )
+
+    assert route.call_count == 1
+    assert isinstance(stored, MatchDTO)
+    assert stored == match
+    assert MatchDTO.model_validate_json(body) == match
+    assert client.metrics.store_hits == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_store_hits_take_no_tokens(store):
+    reset_rate_limited_client()
+    route = mock_match()
+    await store.put(MATCH, load_test_json("get_match_by_match_id.json").encode())
+    client = RateLimitClient("api-key", store=store)
+
+    for _ in range(100):
+        await client.get_match_by_match_id(ROUTE, MATCH_ID)
+
+    assert route.call_count == 0
+    assert not client.limits
@@ -0,0 +1,125 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from riot_api.client import Client
+from riot_api.sync import MATCHLIST_TIMESTAMPS, MatchSync, Watermark
+from riot_api.types.request import RouteRegion
+
+ROUTE = RouteRegion.ASIA
+PUUID = "l51rA9uBuXO1Zokld038OVu0aRhDKA2NcE5J5Ng2LmMxzZ2gJArIa5v_UaiEmHSDdSyKsbiiawWX_w"
+HOST = "https://asia.api.riotgames.com"
+MATCHES = HOST + r"/lol/match/v5/matches/(?P<match_id>KR_\d+)$"
+EPOCH = 1_700_000_000
+
+
+class History:
+    """matches of players an hour apart, each lasting half an hour"""
+
+    def __init__(self, matches: int, epoch: int = EPOCH):
+        self.epoch = epoch
+        self.matches = 0
+        self.play(matches)
+
+    def play(self, matches: int) -> None:
+        self.matches += matches
+
+    def start(self, i: int) -> int:
+        return self.epoch + 3600 * i
+
+    def match_ids(self, request: httpx.Request, puuid: str):
+        params = request.url.params
+        start_time = int(params.get("startTime", 0))
+        start = int(params.get("start", 0))
+        count = int(params.get("count", 20))
+        match_ids = [
+            f"KR_{i}"
+            for i in reversed(range(self.matches))
+            if self.start(i) >= start_time
+        ][start : start + count]
+        return httpx.Response(200, content=json.dumps(match_ids))
+
+    def match(self, request: httpx.Request, match_id: str):
+        i = int(match_id.removeprefix("KR_"))
+        info = {
+            "gameCreation": self.start(i) * 1000,
+            "gameEndTimestamp": (self.start(i) + 1800) * 1000,
+        }
+        return httpx.Response(200, json={"info": info})
+
+    def mock(self):
+        ids = respx.get(
+            url__regex=HOST + r"/lol/match/v5/matches/by-puuid/(?P<puuid>[\w-]+)/ids"
+        ).mock(side_effect=self.match_ids)
+        match = respx.get(url__regex=MATCHES).mock(side_effect=self.match)
+        return ids, match
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_sync_delta(tmp_path):
+    history = History(150)
+    ids, match = history.mock()
+    sync = MatchSync(Client("api-key"), tmp_path / "watermarks.db")
+
+    match_ids = await sync.sync(ROUTE, PUUID)
+    assert match_ids == [f"KR_{i}" for i in reversed(range(150))]
+    assert "startTime" not in ids.calls[0].request.url.params
+    assert await sync.watermark(PUUID) == Watermark(history.start(149) + 1800, "KR_149")
+    sync.close()
+
+    # after a restart, only the new matches are listed
+    history.play(3)
+    ids.reset()
+    match.reset()
+    sync = MatchSync(Client("api-key"), tmp_path / "watermarks.db")
+    assert await sync.sync(ROUTE, PUUID) == ["KR_152", "KR_151", "KR_150"]
+    assert ids.call_count == 1
+    assert ids.calls[0].request.url.params["startTime"] == str(
+        history.start(149) + 1800
+    )
+    assert await sync.watermark(PUUID) == Watermark(history.start(152) + 1800, "KR_152")
+
+    # nothing new, a single request
+    ids.reset()
+    match.reset()
+    assert await sync.sync(ROUTE, PUUID) == []
+    assert ids.call_count == 1
+    assert match.call_count == 0
+    sync.close()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_sync_before_matchlist_timestamps(tmp_path):
+    # startTime would drop the matches played before June 16th, 2021
+    history = History(120, epoch=MATCHLIST_TIMESTAMPS - 3600 * 130)
+    ids, _ = history.mock()
+    sync = MatchSync(Client("api-key"), tmp_path / "watermarks.db")
+    await sync.advance(PUUID, Watermark(history.start(100), "KR_100"))
+
+    match_ids = await sync.sync(ROUTE, PUUID)
+
+    assert match_ids == [f"KR_{i}" for i in reversed(range(101, 120))]
+    assert "startTime" not in ids.calls[0].request.url.params
+    assert (await sync.watermark(PUUID)).match_id == "KR_119"
+    sync.close()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_sync_many(tmp_path):
+    History(5).mock()
+    sync = MatchSync(Client("api-key"), tmp_path / "watermarks.db")
+    puuids = [f"puuid-{i}" for i in range(10)]
+
+    results = dict([item async for item in sync.sync_many(ROUTE, puuids)])
+
+    assert sorted(results) == puuids
+    assert all(
+        match_ids == [f"KR_{i}" for i in range(4, -1, -1)]
+        for match_ids in results.values()
+    )
+    sync.close()